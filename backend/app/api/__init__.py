@@ -1,10 +1,12 @@
 # API package 
 from fastapi import APIRouter
-from app.api import auth, incidents, units, logs
+from app.api import auth, incidents, units, logs, sync, websocket
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(incidents.router, prefix="/incidents", tags=["incidents"])
 api_router.include_router(units.router, prefix="/units", tags=["units"])
-api_router.include_router(logs.router, prefix="/logs", tags=["logs"]) 
\ No newline at end of file
+api_router.include_router(logs.router, prefix="/logs", tags=["logs"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+api_router.include_router(websocket.router, tags=["websocket"]) 
\ No newline at end of file
@@ -1,30 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
-from app.core.auth import get_current_user, require_role
+from app.core.auth import get_current_user, principal_claims, require_role
+from app.core.passwords import password_executor
 
 router = APIRouter(tags=["authentication"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -38,11 +31,12 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     user: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user"""
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    result = await db.execute(select(User).where(User.username == user.username))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -50,26 +44,27 @@ async def register_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_executor.hash(user.password)
     db_user = User(
         username=user.username,
         password_hash=hashed_password,
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login user and return access token"""
     # Find user by username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    result = await db.execute(select(User).where(User.username == form_data.username))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,7 +73,7 @@ async def login(
         )
     
     # Verify password
-    if not verify_password(form_data.password, user.password_hash):
+    if not await password_executor.verify(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -88,7 +83,7 @@ async def login(
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=principal_claims(user), expires_delta=access_token_expires
     )
     
     return {
@@ -105,7 +100,7 @@ async def get_current_user_info(
     return current_user
 
 @router.get("/users", response_model=List[UserResponse])
-async def list_users(
+def list_users(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
 ):
@@ -114,7 +109,7 @@ async def list_users(
     return users
 
 @router.get("/users/responders", response_model=List[UserResponse])
-async def list_responders(
+def list_responders(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
 ):
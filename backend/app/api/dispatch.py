@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_active_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_results, set_next_cursor
 from app.models.user import User
 from app.models.incident import Incident, IncidentStatus
 from app.models.unit import Unit, UnitStatus
@@ -15,7 +18,7 @@ from app.services.logging import create_log
 router = APIRouter()
 
 @router.post("/", response_model=DispatchResponse)
-async def create_dispatch(
+def create_dispatch(
     dispatch: DispatchCreate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -65,7 +68,7 @@ async def create_dispatch(
     db.refresh(db_dispatch)
     
     # Log the dispatch
-    await create_log(
+    create_log(
         db=db,
         log_type="unit_dispatched",
         message=f"Unit {unit.unit_number} dispatched to incident {incident.incident_number} by {current_user.username}",
@@ -84,23 +87,35 @@ async def create_dispatch(
 @router.get("/incident/{incident_id}", response_model=List[DispatchResponse])
 async def get_incident_dispatches(
     incident_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all dispatches for a specific incident"""
-    dispatches = db.query(Dispatch).filter(Dispatch.incident_id == incident_id).all()
+    """Get dispatches for a specific incident, newest first"""
+    query = select(Dispatch).where(Dispatch.incident_id == incident_id)
+    result = await db.execute(paginate(query, Dispatch.dispatch_time, Dispatch.id, cursor, limit))
+    dispatches, next_cursor = page_results(result.scalars().all(), limit, "dispatch_time")
+    set_next_cursor(response, next_cursor)
     return [DispatchResponse.from_orm(dispatch) for dispatch in dispatches]
 
 @router.get("/unit/{unit_id}", response_model=List[DispatchResponse])
 async def get_unit_dispatches(
     unit_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all dispatches for a specific unit"""
-    dispatches = db.query(Dispatch).filter(Dispatch.unit_id == unit_id).all()
+    """Get dispatches for a specific unit, newest first"""
+    query = select(Dispatch).where(Dispatch.unit_id == unit_id)
+    result = await db.execute(paginate(query, Dispatch.dispatch_time, Dispatch.id, cursor, limit))
+    dispatches, next_cursor = page_results(result.scalars().all(), limit, "dispatch_time")
+    set_next_cursor(response, next_cursor)
     return [DispatchResponse.from_orm(dispatch) for dispatch in dispatches]
 
 @router.patch("/{dispatch_id}", response_model=DispatchResponse)
-async def update_dispatch(
+def update_dispatch(
     dispatch_id: int,
     dispatch_update: DispatchUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -144,7 +159,7 @@ async def update_dispatch(
     
     # Log the status update
     if dispatch_update.status:
-        await create_log(
+        create_log(
             db=db,
             log_type="unit_status_changed",
             message=f"Dispatch status changed from {old_status.value} to {dispatch_update.status.value} by {current_user.username}",
@@ -161,7 +176,7 @@ async def update_dispatch(
     return DispatchResponse.from_orm(db_dispatch)
 
 @router.delete("/{dispatch_id}")
-async def cancel_dispatch(
+def cancel_dispatch(
     dispatch_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -186,7 +201,7 @@ async def cancel_dispatch(
     db.commit()
     
     # Log the cancellation
-    await create_log(
+    create_log(
         db=db,
         log_type="unit_dispatched",
         message=f"Dispatch cancelled by {current_user.username}",
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_active_user, require_role
+from app.core.http_cache import conditional_response, latest, make_etag, row_versions
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_results, set_next_cursor
 from app.models.user import User, UserRole
 from app.models.incident import Incident, IncidentStatus, IncidentType, IncidentPriority
 from app.models.unit import Unit, UnitStatus
@@ -13,6 +17,7 @@ from app.models.log import Log, LogType
 from app.schemas.incident import IncidentCreate, IncidentUpdate, IncidentResponse, IncidentList, IncidentResolve
 from app.schemas.unit import UnitAssignment
 from app.schemas.log import LogCreate, TimelineEntry
+from app.services.live_state import OPEN_INCIDENT_STATUSES, live_state
 from app.services.logging import create_log
 
 router = APIRouter(tags=["incidents"])
@@ -24,7 +29,7 @@ def generate_incident_number() -> str:
     return f"INC-{timestamp}-{unique_id}"
 
 @router.post("/", response_model=IncidentResponse)
-async def create_incident(
+def create_incident(
     incident: IncidentCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
@@ -44,48 +49,68 @@ async def create_incident(
     db.refresh(db_incident)
     
     # Create initial log entry
-    log = Log(
-        incident_id=db_incident.id,
-        type=LogType.status,
-        message=f"Incident created: {incident.type} at {incident.address}"
+    create_log(
+        db=db,
+        log_type=LogType.status,
+        message=f"Incident created: {incident.type} at {incident.address}",
+        incident_id=db_incident.id
     )
-    db.add(log)
-    db.commit()
     
     return db_incident
 
 @router.get("/", response_model=List[IncidentList])
 async def list_incidents(
+    request: Request,
+    response: Response,
     status: Optional[IncidentStatus] = None,
     priority: Optional[int] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """List incidents with optional filtering"""
-    query = db.query(Incident)
+    """List incidents with optional filtering, newest first
     
-    if status:
-        query = query.filter(Incident.status == status)
-    if priority:
-        query = query.filter(Incident.priority == priority)
+    Open statuses (new, dispatched, on_scene) are served from the in-memory
+    live state; other queries read the database.
+    """
+    if status in OPEN_INCIDENT_STATUSES and live_state.ready:
+        incidents, next_cursor = live_state.list_incidents(status, priority, cursor, limit)
+        live_state.set_version_header(response)
+    else:
+        query = select(Incident)
+        
+        if status:
+            query = query.where(Incident.status == status)
+        if priority:
+            query = query.where(Incident.priority == priority)
+        
+        result = await db.execute(paginate(query, Incident.created_at, Incident.id, cursor, limit))
+        incidents, next_cursor = page_results(result.scalars().all(), limit, "created_at")
+    set_next_cursor(response, next_cursor)
     
-    incidents = query.order_by(Incident.created_at.desc()).all()
-    return incidents
+    etag = make_etag("incidents", row_versions(incidents), next_cursor)
+    not_modified = conditional_response(request, response, etag, latest(incidents), collection=True)
+    return not_modified or incidents
 
 @router.get("/{incident_id}", response_model=IncidentResponse)
 async def get_incident(
     incident_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get incident details"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = await db.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
-    return incident
+    
+    etag = make_etag("incident", incident.id, incident.updated_at)
+    return conditional_response(request, response, etag, incident.updated_at) or incident
 
 @router.patch("/{incident_id}", response_model=IncidentResponse)
-async def update_incident(
+def update_incident(
     incident_id: int,
     incident_update: IncidentUpdate,
     db: Session = Depends(get_db),
@@ -107,7 +132,7 @@ async def update_incident(
     return db_incident
 
 @router.post("/{incident_id}/assign", response_model=IncidentResponse)
-async def assign_unit(
+def assign_unit(
     incident_id: int,
     assignment: UnitAssignment,
     db: Session = Depends(get_db),
@@ -158,7 +183,7 @@ async def assign_unit(
     return incident
 
 @router.post("/{incident_id}/resolve", response_model=IncidentResponse)
-async def resolve_incident(
+def resolve_incident(
     incident_id: int,
     resolution: IncidentResolve,
     db: Session = Depends(get_db),
@@ -192,38 +217,51 @@ async def resolve_incident(
     
     return incident
 
+def timeline_query(incident_id: int):
+    """An incident's log entries in order, with unit names resolved in the same query"""
+    return (
+        select(Log.id, Log.type, Log.message, Log.timestamp, Unit.unit_number)
+        .outerjoin(Unit, Log.unit_id == Unit.id)
+        .where(Log.incident_id == incident_id)
+        .order_by(Log.timestamp)
+    )
+
 @router.get("/{incident_id}/timeline", response_model=List[TimelineEntry])
 async def get_incident_timeline(
     incident_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get incident timeline/logs"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = await db.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    logs = db.query(Log).filter(Log.incident_id == incident_id).order_by(Log.timestamp).all()
+    result = await db.execute(timeline_query(incident_id))
     
-    timeline = []
-    for log in logs:
-        unit_name = None
-        if log.unit_id:
-            unit = db.query(Unit).filter(Unit.id == log.unit_id).first()
-            unit_name = unit.unit_number if unit else None
-        
-        timeline.append(TimelineEntry(
-            id=log.id,
-            type=log.type,
-            message=log.message,
-            timestamp=log.timestamp,
-            unit_name=unit_name
-        ))
+    rows = result.all()
     
-    return timeline
+    # Log entries never change, so ids and unit names identify the timeline
+    etag = make_etag("timeline", incident_id, [(row[0], row[4]) for row in rows])
+    not_modified = conditional_response(request, response, etag, rows[-1].timestamp if rows else None, collection=True)
+    if not_modified:
+        return not_modified
+    
+    return [
+        TimelineEntry(
+            id=log_id,
+            type=log_type,
+            message=message,
+            timestamp=timestamp,
+            unit_name=unit_number
+        )
+        for log_id, log_type, message, timestamp, unit_number in rows
+    ]
 
 @router.post("/{incident_id}/notes")
-async def add_incident_note(
+def add_incident_note(
     incident_id: int,
     note: LogCreate,
     db: Session = Depends(get_db),
@@ -234,19 +272,20 @@ async def add_incident_note(
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    log = Log(
+    # The user is told the note was saved, so it is committed before replying
+    create_log(
+        db=db,
+        log_type=LogType.note,
+        message=note.message,
         incident_id=incident_id,
         unit_id=note.unit_id,
-        type=LogType.note,
-        message=note.message
+        durable=True
     )
-    db.add(log)
-    db.commit()
     
     return {"message": "Note added successfully"}
 
 @router.delete("/{incident_id}")
-async def delete_incident(
+def delete_incident(
     incident_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -261,7 +300,7 @@ async def delete_incident(
     db.commit()
     
     # Log the cancellation
-    await create_log(
+    create_log(
         db=db,
         log_type="incident_updated",
         message=f"Incident {db_incident.incident_number} cancelled by {current_user.username}",
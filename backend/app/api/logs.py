@@ -1,69 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_user, require_role
+from app.core.http_cache import conditional_response, latest, make_etag, row_versions
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_results, set_next_cursor
 from app.models.user import User, UserRole
 from app.models.log import Log, LogType
-from app.models.incident import Incident, IncidentStatus
+from app.models.incident import Incident, IncidentStatus, IncidentPriority
+from app.models.dispatch import Dispatch
 from app.models.unit import Unit, UnitStatus
 from app.schemas.log import LogResponse, TimelineEntry
+from app.services.analytics import GROUP_BY_OPTIONS, average_response_time, response_time_report
+from app.services.log_archive import archived_incident_logs
+from app.services.rollups import incident_totals, response_time_totals
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
+def not_modified_logs(request: Request, response: Response, logs: List[Log], next_cursor: Optional[str] = None):
+    """Validators for a page of logs; log rows are never updated, so ids and timestamps identify it"""
+    etag = make_etag("logs", row_versions(logs, "timestamp"), next_cursor)
+    return conditional_response(request, response, etag, latest(logs, "timestamp"), collection=True)
+
 @router.get("/", response_model=List[LogResponse])
 async def get_logs(
+    request: Request,
+    response: Response,
     incident_id: Optional[int] = None,
     unit_id: Optional[int] = None,
     log_type: Optional[LogType] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get logs with optional filtering"""
-    query = db.query(Log)
+    """Get logs with optional filtering, newest first, in [start_date, end_date)"""
+    query = select(Log)
     
     if incident_id:
-        query = query.filter(Log.incident_id == incident_id)
+        query = query.where(Log.incident_id == incident_id)
     if unit_id:
-        query = query.filter(Log.unit_id == unit_id)
+        query = query.where(Log.unit_id == unit_id)
     if log_type:
-        query = query.filter(Log.type == log_type)
+        query = query.where(Log.type == log_type)
     if start_date:
-        query = query.filter(Log.timestamp >= start_date)
+        query = query.where(Log.timestamp >= start_date)
     if end_date:
-        query = query.filter(Log.timestamp <= end_date)
+        query = query.where(Log.timestamp < end_date)
     
-    logs = query.order_by(Log.timestamp.desc()).all()
-    return logs
+    result = await db.execute(paginate(query, Log.timestamp, Log.id, cursor, limit))
+    logs, next_cursor = page_results(result.scalars().all(), limit, "timestamp")
+    set_next_cursor(response, next_cursor)
+    return not_modified_logs(request, response, logs, next_cursor) or logs
 
 @router.get("/reports/incidents")
-async def get_incident_report(
+def get_incident_report(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    priority: Optional[int] = None,
+    priority: Optional[IncidentPriority] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
 ):
-    """Get incident report statistics (Dispatcher only)"""
-    query = db.query(Incident)
+    """Get incident report statistics for calls in [start_date, end_date) (Dispatcher only)"""
+    # Hour-aligned ranges are served from the hourly rollups
+    totals = incident_totals(db, start_date, end_date, priority)
+    if totals is not None:
+        return {
+            "total_incidents": totals["total"],
+            "resolved_incidents": totals["resolved"],
+            "resolution_rate": (totals["resolved"] / totals["total"] * 100) if totals["total"] > 0 else 0,
+            "avg_response_time": totals["avg_response_time"]
+        }
+    
+    query = db.query(
+        func.count(Incident.id),
+        func.count(Incident.id).filter(Incident.status == IncidentStatus.resolved)
+    )
     
     if start_date:
         query = query.filter(Incident.created_at >= start_date)
     if end_date:
-        query = query.filter(Incident.created_at <= end_date)
+        query = query.filter(Incident.created_at < end_date)
     if priority:
         query = query.filter(Incident.priority == priority)
     
-    incidents = query.all()
-    
-    # Calculate statistics
-    total_incidents = len(incidents)
-    resolved_incidents = len([i for i in incidents if i.status == IncidentStatus.resolved])
-    avg_response_time = None  # TODO: Calculate from logs
+    # Calculate statistics in the database
+    total_incidents, resolved_incidents = query.one()
+    avg_response_time = average_response_time(db, start_date, end_date, priority)
     
     return {
         "total_incidents": total_incidents,
@@ -72,113 +101,172 @@ async def get_incident_report(
         "avg_response_time": avg_response_time
     }
 
+@router.get("/reports/response-times")
+def get_response_time_report(
+    group_by: Optional[str] = Query(None, description=f"One of: {', '.join(GROUP_BY_OPTIONS)}"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    priority: Optional[IncidentPriority] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.dispatcher]))
+):
+    """Response interval statistics in seconds: mean, p50, p90, p99 for calls in [start_date, end_date) (Dispatcher only)"""
+    try:
+        report = None
+        if group_by is None or group_by in GROUP_BY_OPTIONS:
+            # Hour-aligned ranges are served from the hourly histograms where possible
+            report = response_time_totals(db, group_by, start_date, end_date, priority)
+        return report or response_time_report(db, group_by, start_date, end_date, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/reports/units")
-async def get_unit_report(
+def get_unit_report(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
 ):
-    """Get unit performance report (Dispatcher only)"""
-    query = db.query(Unit)
-    units = query.all()
-    
-    unit_stats = []
-    for unit in units:
-        # Count incidents assigned to this unit
-        incident_count = len(unit.incident.units) if unit.incident else 0
-        
-        unit_stats.append({
-            "unit_id": unit.id,
-            "unit_name": unit.name,
+    """Get unit performance report for dispatches in [start_date, end_date) (Dispatcher only)"""
+    # Incidents each unit was dispatched to in the period, counted in one grouped query
+    dispatch_filter = [Dispatch.unit_id == Unit.id]
+    if start_date:
+        dispatch_filter.append(Dispatch.dispatch_time >= start_date)
+    if end_date:
+        dispatch_filter.append(Dispatch.dispatch_time < end_date)
+    
+    rows = db.query(
+        Unit.id,
+        Unit.unit_number,
+        Unit.status,
+        Unit.updated_at,
+        func.count(func.distinct(Dispatch.incident_id))
+    ).outerjoin(Dispatch, and_(*dispatch_filter)).group_by(Unit.id).order_by(Unit.unit_number).all()
+    
+    unit_stats = [
+        {
+            "unit_id": unit_id,
+            "unit_name": unit_number,
             "incident_count": incident_count,
-            "current_status": unit.status,
-            "last_updated": unit.updated_at
-        })
+            "current_status": unit_status,
+            "last_updated": updated_at
+        }
+        for unit_id, unit_number, unit_status, updated_at, incident_count in rows
+    ]
     
     return {
         "units": unit_stats,
-        "total_units": len(units),
-        "available_units": len([u for u in units if u.status == UnitStatus.available])
+        "total_units": len(rows),
+        "available_units": sum(1 for row in rows if row[2] == UnitStatus.available)
     }
 
 @router.get("/incident/{incident_id}", response_model=List[LogResponse])
 async def get_incident_logs(
     incident_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get logs for a specific incident in order (for AAR reporting)"""
+    query = select(Log).where(Log.incident_id == incident_id)
+    result = await db.execute(paginate(query, Log.timestamp, Log.id, cursor, limit, descending=False))
+    logs, next_cursor = page_results(result.scalars().all(), limit, "timestamp")
+    set_next_cursor(response, next_cursor)
+    
+    return not_modified_logs(request, response, logs, next_cursor) or [LogResponse.from_orm(log) for log in logs]
+
+@router.get("/archive/incident/{incident_id}", response_model=List[LogResponse])
+def get_archived_incident_logs(
+    incident_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
-    """Get all logs for a specific incident (for AAR reporting)"""
-    logs = db.query(Log).filter(
-        Log.incident_id == incident_id
-    ).order_by(Log.created_at.asc()).all()
+    """Get logs of a specific incident from archived months (for AAR on old incidents)"""
+    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
     
-    return [LogResponse.from_orm(log) for log in logs]
+    return archived_incident_logs(incident_id, since=incident.created_at)
 
 @router.get("/unit/{unit_id}", response_model=List[LogResponse])
 async def get_unit_logs(
     unit_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all logs for a specific unit"""
-    logs = db.query(Log).filter(
-        Log.unit_id == unit_id
-    ).order_by(Log.created_at.desc()).all()
+    """Get logs for a specific unit, newest first"""
+    query = select(Log).where(Log.unit_id == unit_id)
+    result = await db.execute(paginate(query, Log.timestamp, Log.id, cursor, limit))
+    logs, next_cursor = page_results(result.scalars().all(), limit, "timestamp")
+    set_next_cursor(response, next_cursor)
     
-    return [LogResponse.from_orm(log) for log in logs]
+    return not_modified_logs(request, response, logs, next_cursor) or [LogResponse.from_orm(log) for log in logs]
 
 @router.get("/user/{user_id}", response_model=List[LogResponse])
 async def get_user_logs(
     user_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all logs for a specific user"""
-    logs = db.query(Log).filter(
-        Log.user_id == user_id
-    ).order_by(Log.created_at.desc()).all()
+    """Get logs for a specific user, newest first"""
+    query = select(Log).where(Log.user_id == user_id)
+    result = await db.execute(paginate(query, Log.timestamp, Log.id, cursor, limit))
+    logs, next_cursor = page_results(result.scalars().all(), limit, "timestamp")
+    set_next_cursor(response, next_cursor)
     
-    return [LogResponse.from_orm(log) for log in logs]
+    return not_modified_logs(request, response, logs, next_cursor) or [LogResponse.from_orm(log) for log in logs]
 
 @router.get("/recent", response_model=List[LogResponse])
 async def get_recent_logs(
+    request: Request,
+    response: Response,
     hours: int = Query(24, ge=1, le=168),  # Default to 24 hours, max 1 week
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get recent logs within specified hours"""
     cutoff_time = datetime.utcnow() - timedelta(hours=hours)
     
-    logs = db.query(Log).filter(
-        Log.created_at >= cutoff_time
-    ).order_by(Log.created_at.desc()).limit(100).all()
+    result = await db.execute(
+        select(Log).where(Log.timestamp >= cutoff_time).order_by(Log.timestamp.desc()).limit(100)
+    )
+    logs = result.scalars().all()
     
-    return [LogResponse.from_orm(log) for log in logs]
+    return not_modified_logs(request, response, logs) or [LogResponse.from_orm(log) for log in logs]
 
 @router.get("/summary")
-async def get_log_summary(
+def get_log_summary(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
-    """Get summary statistics for logs (useful for AAR reports)"""
-    query = db.query(Log)
-    
+    """Get summary statistics for logs in [start_date, end_date) (useful for AAR reports)"""
+    date_filter = []
     if start_date:
-        query = query.filter(Log.created_at >= start_date)
+        date_filter.append(Log.timestamp >= start_date)
     if end_date:
-        query = query.filter(Log.created_at <= end_date)
-    
-    # Get total count
-    total_logs = query.count()
+        date_filter.append(Log.timestamp < end_date)
     
-    # Get counts by type
-    type_counts = {}
-    for log_type in LogType:
-        count = query.filter(Log.type == log_type).count()
-        type_counts[log_type.value] = count
+    # Get counts by type, and the total from them
+    type_counts = {log_type.value: 0 for log_type in LogType}
+    type_rows = db.query(Log.type, func.count(Log.id)).filter(*date_filter).group_by(Log.type).all()
+    for log_type, count in type_rows:
+        if log_type is not None:
+            type_counts[log_type.value] = count
+    total_logs = sum(count for _, count in type_rows)
     
     # Get most active users
-    user_activity = db.query(Log.user_id, db.func.count(Log.id).label('count')).filter(
-        Log.user_id.isnot(None)
-    ).group_by(Log.user_id).order_by(db.func.count(Log.id).desc()).limit(10).all()
+    activity = func.count(Log.id).label('count')
+    user_activity = db.query(Log.user_id, activity).filter(
+        Log.user_id.isnot(None), *date_filter
+    ).group_by(Log.user_id).order_by(activity.desc()).limit(10).all()
     
     return {
         "total_logs": total_logs,
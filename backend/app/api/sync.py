@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.core.database import get_async_db
+from app.core.auth import get_current_active_user
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+from app.services.change_journal import changes_since
+
+router = APIRouter(tags=["sync"])
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    since: Optional[int] = Query(None, ge=0, description="Version from the previous poll; omit to start"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Incidents, units and dispatches changed since a version, with tombstones
+    
+    Without ``since``, or with one the journal no longer covers, the response
+    has ``reset`` set: load the full lists, then poll from the returned
+    version. Rows can be sent more than once and should be applied as upserts.
+    """
+    return await changes_since(db, since, limit)
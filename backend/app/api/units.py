@@ -1,21 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_user, require_role
+from app.core.http_cache import conditional_response, latest, make_etag, row_versions
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_results, set_next_cursor
 from app.models.user import User, UserRole
 from app.models.unit import Unit, UnitStatus, UnitType
 from app.models.log import Log, LogType
-from app.schemas.unit import UnitCreate, UnitUpdate, UnitResponse, UnitList, UnitStatusUpdate
+from app.schemas.unit import UnitCreate, UnitUpdate, UnitResponse, UnitList, UnitStatusUpdate, UnitLocationUpdate
 from app.schemas.log import LogCreate
+from app.services.live_state import live_state
 from app.services.logging import create_log
+from app.websocket.manager import manager
 
 router = APIRouter(prefix="/units", tags=["units"])
 
 @router.post("/", response_model=UnitResponse)
-async def create_unit(
+def create_unit(
     unit: UnitCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
@@ -39,53 +45,90 @@ async def create_unit(
 
 @router.get("/", response_model=UnitList)
 async def get_units(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
+    request: Request,
+    response: Response,
     status: Optional[UnitStatus] = None,
     type: Optional[UnitType] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get list of units with optional filtering"""
-    query = db.query(Unit)
-    
-    if status:
-        query = query.filter(Unit.status == status)
-    if type:
-        query = query.filter(Unit.type == type)
+    """Get list of units with optional filtering, by unit number"""
+    if live_state.ready:
+        units, total, next_cursor = live_state.list_units(status, type, cursor, limit)
+        live_state.set_version_header(response)
+        if not include_total:
+            total = None
+    else:
+        query = select(Unit)
+        
+        if status:
+            query = query.where(Unit.status == status)
+        if type:
+            query = query.where(Unit.type == type)
+        
+        # Counting is a full scan of the filtered set, so only on request
+        total = None
+        if include_total:
+            total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        result = await db.execute(paginate(query, Unit.unit_number, Unit.id, cursor, limit, descending=False))
+        units, next_cursor = page_results(result.scalars().all(), limit, "unit_number")
     
-    total = query.count()
-    units = query.offset(skip).limit(limit).all()
+    etag = make_etag("units", row_versions(units), total, limit, next_cursor)
+    not_modified = conditional_response(request, response, etag, latest(units), collection=True)
+    if not_modified:
+        return not_modified
     
     return UnitList(
-        units=[UnitResponse.from_orm(unit) for unit in units],
+        units=[UnitResponse.model_validate(unit) for unit in units],
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        size=limit,
+        next_cursor=next_cursor
     )
 
 @router.get("/available", response_model=List[UnitResponse])
 async def get_available_units(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role([UserRole.dispatcher]))
 ):
     """Get all available units (Dispatcher only)"""
-    units = db.query(Unit).filter(Unit.status == UnitStatus.available).order_by(Unit.name).all()
-    return units
+    units = None
+    if live_state.ready:
+        units, total, _ = live_state.list_units(UnitStatus.available, None, None, MAX_PAGE_SIZE)
+        if total <= MAX_PAGE_SIZE:
+            live_state.set_version_header(response)
+        else:
+            units = None
+    if units is None:
+        result = await db.execute(
+            select(Unit).where(Unit.status == UnitStatus.available).order_by(Unit.unit_number)
+        )
+        units = result.scalars().all()
+    
+    etag = make_etag("available_units", row_versions(units))
+    return conditional_response(request, response, etag, latest(units), collection=True) or units
 
 @router.get("/{unit_id}", response_model=UnitResponse)
 async def get_unit(
     unit_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get unit details"""
-    unit = db.query(Unit).filter(Unit.id == unit_id).first()
+    unit = await db.get(Unit, unit_id)
     if not unit:
         raise HTTPException(status_code=404, detail="Unit not found")
-    return unit
+    
+    etag = make_etag("unit", unit.id, unit.updated_at)
+    return conditional_response(request, response, etag, unit.updated_at) or unit
 
 @router.patch("/{unit_id}", response_model=UnitResponse)
-async def update_unit(
+def update_unit(
     unit_id: int,
     unit_update: UnitUpdate,
     db: Session = Depends(get_db),
@@ -107,7 +150,7 @@ async def update_unit(
     return unit
 
 @router.patch("/{unit_id}/status", response_model=UnitResponse)
-async def update_unit_status(
+def update_unit_status(
     unit_id: int,
     status_update: UnitStatusUpdate,
     db: Session = Depends(get_db),
@@ -150,8 +193,43 @@ async def update_unit_status(
     
     return unit
 
+@router.patch("/{unit_id}/location")
+async def update_unit_location(
+    unit_id: int,
+    location: UnitLocationUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role([UserRole.responder]))
+):
+    """Report the unit's GPS position (Responder only)
+    
+    Positions are broadcast in coalesced ``unit_positions`` batches, so
+    frequent reports only cost one frame per tick per subscriber.
+    """
+    unit = await db.get(Unit, unit_id)
+    if not unit:
+        raise HTTPException(status_code=404, detail="Unit not found")
+    
+    if unit.assigned_user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to update this unit")
+    
+    unit.current_latitude = location.latitude
+    unit.current_longitude = location.longitude
+    unit.last_location_update = datetime.utcnow()
+    await db.commit()
+    
+    manager.send_unit_position({
+        "id": unit.id,
+        "latitude": unit.current_latitude,
+        "longitude": unit.current_longitude,
+        "status": unit.status.value if unit.status else None,
+        "incident_id": unit.assigned_incident_id,
+        "timestamp": unit.last_location_update.isoformat()
+    })
+    
+    return {"message": "Location updated"}
+
 @router.post("/{unit_id}/arrive", response_model=UnitResponse)
-async def unit_arrive_on_scene(
+def unit_arrive_on_scene(
     unit_id: int,
     notes: Optional[str] = None,
     db: Session = Depends(get_db),
@@ -196,7 +274,7 @@ async def unit_arrive_on_scene(
     return unit
 
 @router.post("/{unit_id}/clear", response_model=UnitResponse)
-async def unit_clear_scene(
+def unit_clear_scene(
     unit_id: int,
     resolution_code: str,
     notes: Optional[str] = None,
@@ -243,7 +321,7 @@ async def unit_clear_scene(
     return unit
 
 @router.delete("/{unit_id}")
-async def delete_unit(
+def delete_unit(
     unit_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -258,7 +336,7 @@ async def delete_unit(
     db.commit()
     
     # Log the deletion
-    await create_log(
+    create_log(
         db=db,
         log_type="system_event",
         message=f"Unit {db_unit.name} deactivated by {current_user.username}",
@@ -1,57 +1,94 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from typing import Optional
 from app.websocket.manager import manager
-from app.core.auth import verify_token
-from app.models.user import User
-from app.core.database import SessionLocal
+from app.websocket.codecs import get_codec
+from app.core.auth import Principal, authenticate_token
+from app.core.database import AsyncSessionLocal
 import json
 
 router = APIRouter()
 
-async def get_user_from_token(token: str) -> User:
+async def get_user_from_token(token: str) -> Principal:
     """Get user from JWT token"""
-    payload = verify_token(token)
-    if not payload:
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_token(token, db)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-    username = payload.get("sub")
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
-    finally:
-        db.close()
+    return user
 
 @router.websocket("/ws/{token}")
-async def websocket_endpoint(websocket: WebSocket, token: str):
-    """WebSocket endpoint for real-time updates"""
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: str,
+    last_seq: Optional[int] = None,
+    epoch: Optional[str] = None,
+    encoding: str = "json"
+):
+    """WebSocket endpoint for real-time updates.
+    
+    Reconnecting clients pass the ``last_seq`` and ``epoch`` they last saw to
+    receive only the events they missed. ``encoding=msgpack`` switches the
+    server's frames to binary MessagePack; clients may send either JSON text
+    or MessagePack binary frames.
+    
+    The server sends ``heartbeat`` frames to connections that have been
+    silent for a while, and closes connections that stay silent past the
+    idle timeout. Clients, including listen-only ones, must answer every
+    heartbeat with ``{"type": "heartbeat_ack"}``.
+    """
     try:
         # Validate token and get user
         user = await get_user_from_token(token)
         
         # Connect to WebSocket
-        await manager.connect(websocket, user.role.value, user.id, user.username)
+        await manager.connect(websocket, user.role.value, user.id, user.username, last_seq, epoch, encoding)
         
         # Keep connection alive and handle messages
         while True:
             try:
                 # Wait for messages from client
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                manager.touch(websocket)
+                if frame.get("bytes") is not None:
+                    message = get_codec("msgpack").decode(frame["bytes"])
+                else:
+                    message = json.loads(frame["text"])
                 
                 # Handle different message types
-                if message.get("type") == "ping":
+                if message.get("type") == "heartbeat_ack":
+                    # Receiving it already counted as activity; nothing to send
+                    pass
+                elif message.get("type") == "ping":
                     await manager.send_personal_message({"type": "pong"}, websocket)
                 elif message.get("type") == "subscribe":
                     # Handle subscription to specific updates
+                    accepted, rejected = manager.subscribe(websocket, message.get("channels", []))
                     await manager.send_personal_message({
                         "type": "subscribed",
-                        "channels": message.get("channels", [])
+                        "channels": accepted,
+                        "rejected": rejected
+                    }, websocket)
+                elif message.get("type") == "unsubscribe":
+                    removed = manager.unsubscribe(websocket, message.get("channels"))
+                    await manager.send_personal_message({
+                        "type": "unsubscribed",
+                        "channels": removed
+                    }, websocket)
+                elif message.get("type") == "resume":
+                    # Catch up on missed events, e.g. after re-subscribing
+                    manager.resume(websocket, int(message.get("last_seq", 0)), message.get("epoch"))
+                elif message.get("type") == "subscribe_viewport":
+                    # Only receive located events inside [south, west, north, east]
+                    viewport = manager.set_viewport(websocket, message.get("bbox"))
+                    await manager.send_personal_message({
+                        "type": "viewport_subscribed",
+                        "bbox": list(viewport)
                     }, websocket)
+                elif message.get("type") == "clear_viewport":
+                    manager.clear_viewport(websocket)
+                    await manager.send_personal_message({"type": "viewport_cleared"}, websocket)
                 else:
                     # Echo back unknown messages
                     await manager.send_personal_message({
@@ -83,5 +120,16 @@ async def websocket_status():
     """Get WebSocket connection status"""
     return {
         "connections": manager.get_connection_count(),
-        "total_connections": sum(manager.get_connection_count().values())
+        "total_connections": sum(manager.get_connection_count().values()),
+        "lifecycle": manager.metrics.snapshot(),
+        "queues": manager.get_queue_metrics(),
+        "subscribed_topics": len(manager.subscriptions.subscribers),
+        "viewport_subscriptions": len(manager.viewports.viewports),
+        "event_bus": manager.bus.get_metrics(),
+        "unit_positions": manager.position_coalescer.get_metrics(),
+        "event_log": {
+            "epoch": manager.event_log.epoch,
+            "seq": manager.event_log.seq,
+            "buffered": len(manager.event_log.events)
+        }
     } 
\ No newline at end of file
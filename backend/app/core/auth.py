@@ -1,15 +1,19 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import threading
+import time
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User, UserRole
-from app.schemas.user import TokenData
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -32,15 +36,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             return None
@@ -48,31 +52,168 @@ def verify_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers"""
+    id: int
+    username: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, username=user.username, role=user.role)
+
+def principal_claims(user: User) -> dict:
+    """Token claims for ``user``; ``uid`` and ``role`` are only trusted with settings.auth_token_claims"""
+    return {"sub": user.username, "uid": user.id, "role": user.role.value}
+
+class PrincipalCache:
+    """Process-local cache of decoded tokens and the users they authenticate.
+
+    Tokens map to their subject until the token expires, so a repeated token
+    is not decoded again; subjects map to a Principal for ``ttl`` seconds.
+    Changes to users through the ORM invalidate their entry at once (see the
+    User mapper events below). Bulk UPDATEs and changes made by other workers
+    are only picked up when the entry expires, which ``ttl`` bounds.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.principals: Dict[str, Tuple[Principal, float]] = {}
+        self.lock = threading.Lock()
+        # Bumped by every invalidation so a lookup that raced one is not cached
+        self.generation = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get_subject(self, token: str) -> Optional[str]:
+        entry = self.tokens.get(token)
+        if entry is None:
+            return None
+        subject, expires = entry
+        if expires <= time.time():
+            with self.lock:
+                self.tokens.pop(token, None)
+            return None
+        return subject
+
+    def put_subject(self, token: str, subject: str, expires: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.tokens[token] = (subject, expires)
+            if len(self.tokens) > self.max_size:
+                self.tokens.popitem(last=False)
+
+    def get(self, subject: str) -> Optional[Principal]:
+        entry = self.principals.get(subject)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def put(self, principal: Principal, generation: int):
+        if not self.enabled:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            if len(self.principals) >= self.max_size:
+                self.principals.clear()
+            self.principals[principal.username] = (principal, time.monotonic() + self.ttl)
+
+    def invalidate(self, *subjects: str):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            for subject in subjects:
+                self.principals.pop(subject, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.tokens.clear()
+            self.principals.clear()
+
+    def get_metrics(self) -> dict:
+        return {
+            "tokens": len(self.tokens),
+            "principals": len(self.principals),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+principal_cache = PrincipalCache(ttl=settings.auth_cache_ttl_seconds)
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User):
+    # Covers renames: drop the entry under the old username as well
+    history = inspect(target).attrs.username.history
+    principal_cache.invalidate(target.username, *(history.deleted or ()))
+
+async def authenticate_token(token: str, db: AsyncSession) -> Optional[Principal]:
+    """Resolve a bearer token to its Principal, or None if it is invalid or the user is gone"""
+    username = principal_cache.get_subject(token)
+    if username is None:
+        payload = verify_token(token)
+        if payload is None:
+            return None
+        username = payload["sub"]
+        if settings.auth_token_claims and "uid" in payload and "role" in payload:
+            # Verified claims stand in for the user row until the token expires
+            try:
+                return Principal(id=int(payload["uid"]), username=username, role=UserRole(payload["role"]))
+            except (TypeError, ValueError):
+                return None
+        if "exp" in payload:
+            principal_cache.put_subject(token, username, float(payload["exp"]))
+
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation
+    result = await db.execute(select(User.id, User.username, User.role).where(User.username == username))
+    row = result.first()
+    if row is None:
+        return None
+    principal = Principal(id=row.id, username=row.username, role=row.role)
+    principal_cache.put(principal, generation)
+    return principal
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user from JWT token"""
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Get current user from JWT token.
+
+    Served from the principal cache; the database is only queried when the
+    user's entry is missing or expired.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+    principal = await authenticate_token(token, db)
+    if principal is None:
         raise credentials_exception
     
-    return user
+    return principal
 
 def require_role(allowed_roles: List[UserRole]):
     """Dependency to require specific user roles"""
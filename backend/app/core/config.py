@@ -6,10 +6,22 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./commandflex.db")
     
+    # Connection pool, per engine and per worker (PostgreSQL only; SQLite uses SQLAlchemy defaults)
+    db_pool_size: int = 10  # connections kept open
+    db_max_overflow: int = 20  # extra connections opened under load
+    db_pool_timeout: float = 10.0  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = True  # test connections on checkout
+    db_statement_timeout_ms: int = 30000  # server-side statement timeout
+    
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+    auth_cache_ttl_seconds: float = 30.0  # authenticated users are cached this long per worker; 0 disables
+    auth_token_claims: bool = False  # trust the uid and role claims in tokens instead of loading the user
+    password_hash_workers: int = 4  # threads hashing and verifying passwords; bcrypt runs in parallel
+    password_hash_max_queue: int = 64  # further logins wait for a thread; beyond this they get 503
     
     # Google Maps
     google_maps_api_key: Optional[str] = None
@@ -17,6 +29,41 @@ class Settings(BaseSettings):
     # WebSocket
     websocket_host: str = "0.0.0.0"
     websocket_port: int = 8001
+    websocket_send_timeout: float = 5.0  # seconds per send before a client is dropped
+    websocket_queue_size: int = 256  # outbound messages buffered per connection
+    websocket_overflow_policy: str = "drop_oldest"  # drop_oldest, coalesce or disconnect
+    websocket_geo_cell_degrees: float = 0.05  # grid cell size of the viewport index
+    websocket_position_tick_ms: int = 250  # unit positions are batched once per tick
+    websocket_heartbeat_interval: float = 15.0  # seconds of client silence before a heartbeat
+    websocket_idle_timeout: float = 45.0  # seconds of client silence before the connection is reaped
+    websocket_event_log_size: int = 10000  # events kept for reconnect catch-up
+    websocket_event_log_path: Optional[str] = None  # persist the event log to this JSON lines file
+    
+    # Event bus shared by API workers: memory (single process), unix (one host) or postgres
+    event_bus_backend: str = "memory"
+    event_bus_socket_dir: str = "/tmp/commandflex-bus"
+    event_bus_channel: str = "commandflex_events"
+    
+    # In-memory live state of open incidents, units and active dispatches
+    live_state_resync_seconds: float = 300.0  # full reload from the database; 0 disables
+    
+    # Delta sync change journal
+    sync_settle_seconds: float = 5.0  # sync versions only advance past changes at least this old
+    sync_journal_retention_hours: float = 24.0  # older entries are pruned; clients behind them reset
+    sync_journal_prune_interval_seconds: float = 3600.0  # 0 disables pruning
+    
+    # Reporting rollups
+    rollup_interval_seconds: float = 60.0  # how often hourly rollups are compacted; 0 disables
+    
+    # Log partitioning and archival
+    log_hot_months: int = 3  # months of logs kept in the database, including the current one
+    log_archive_dir: str = ""  # absolute directory closed months are written to as gzip JSON lines
+    log_archive_interval_seconds: float = 0.0  # how often partitions are maintained and closed months archived; 0 disables
+    
+    # Buffered activity log writer
+    log_writer_batch_size: int = 500  # entries per bulk insert; a full batch flushes at once
+    log_writer_flush_ms: int = 200  # pending entries are flushed at least this often
+    log_writer_max_pending: int = 10000  # beyond this, entries are written synchronously
     
     # Logging
     log_level: str = "INFO"
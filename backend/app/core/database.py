@@ -1,23 +1,75 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    return f"{drivers.get(dialect, scheme)}{sep}{rest}"
+
+def get_engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool and connection options for the database backend in ``url``"""
+    if url.startswith("sqlite"):
+        # SQLite is the single-process development database: keep
+        # SQLAlchemy's own pooling and let sessions cross threads
+        return {"connect_args": {"check_same_thread": False}} if not is_async else {}
+
+    if is_async:
+        connect_args = {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+    else:
+        connect_args = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args
+    }
+
 # Create database engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **get_engine_options(SQLALCHEMY_DATABASE_URL))
+
+# Async engine for handlers that must not block the event loop
+async_engine = create_async_engine(
+    get_async_database_url(SQLALCHEMY_DATABASE_URL),
+    **get_engine_options(SQLALCHEMY_DATABASE_URL, is_async=True)
+)
 
-# Create session factory
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Create base class for models
 Base = declarative_base()
 
+def create_missing_indexes(bind):
+    """Create model indexes that are missing from tables created before they were added.
+
+    ``create_all`` only creates indexes together with new tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session, for async def handlers
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,86 @@
+from fastapi import Request, Response
+from typing import Any, Iterable, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+
+# Browsers keep the response but revalidate it on every use, which turns
+# repeat polls into conditional requests
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from the row versions (ids, ``updated_at``, ...) a response was built from"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def row_versions(rows: Iterable[Any], version_attr: str = "updated_at") -> list:
+    return [(row.id, getattr(row, version_attr)) for row in rows]
+
+def latest(rows: Iterable[Any], attr: str = "updated_at") -> Optional[datetime]:
+    values = [value for value in (getattr(row, attr) for row in rows) if value is not None]
+    return max(values, key=_as_utc) if values else None
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive timestamps in this database are UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    use_last_modified: bool = True
+) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when there is none (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: only the opaque tags have to match
+        return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None or not use_last_modified:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    collection: bool = False
+) -> Optional[Response]:
+    """Set ETag and Last-Modified on ``response``; return a 304 to send instead if the client is current.
+
+    Handlers return the 304 as it is, so the body is never serialized. For
+    collections, If-Modified-Since is not trusted: rows leaving the list do
+    not move its latest ``updated_at``, so only the ETag can tell.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+    if not is_not_modified(request, etag, last_modified, use_last_modified=not collection):
+        return None
+    # A 304 carries the headers the full response would have had
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in ("content-length", "content-type")
+    }
+    return Response(status_code=304, headers=headers)
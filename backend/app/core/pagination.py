@@ -0,0 +1,77 @@
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, tuple_
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Opaque cursor pointing just past the row with this sort key"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def paginate(query, sort_column, id_column, cursor: Optional[str], limit: int, descending: bool = True):
+    """Order ``query`` by (sort_column, id_column) and start after ``cursor``.
+
+    NULL sort values order below every other value: last when descending,
+    first when ascending, so rows with a NULL sort key are neither skipped
+    nor repeated across pages. Fetches one row beyond ``limit`` so
+    page_results can tell whether another page exists without a count query.
+    """
+    nullable = getattr(sort_column, "nullable", True)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.where(_after(sort_column, id_column, sort_value, row_id, descending, nullable))
+
+    if descending:
+        sort_order = sort_column.desc().nulls_last() if nullable else sort_column.desc()
+        query = query.order_by(sort_order, id_column.desc())
+    else:
+        sort_order = sort_column.asc().nulls_first() if nullable else sort_column.asc()
+        query = query.order_by(sort_order, id_column.asc())
+    return query.limit(limit + 1)
+
+def _after(sort_column, id_column, sort_value, row_id: int, descending: bool, nullable: bool):
+    """Keyset predicate for rows after (sort_value, row_id) with NULLs lowest"""
+    if sort_value is None:
+        if not nullable:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        if descending:
+            return and_(sort_column.is_(None), id_column < row_id)
+        return or_(sort_column.is_not(None), and_(sort_column.is_(None), id_column > row_id))
+
+    # Row value comparisons are never true against NULL, hence the extra branch
+    key = tuple_(sort_column, id_column)
+    if descending:
+        after = key < tuple_(sort_value, row_id)
+        return or_(after, sort_column.is_(None)) if nullable else after
+    return key > tuple_(sort_value, row_id)
+
+def page_results(rows: Sequence, limit: int, sort_attr: str) -> Tuple[List, Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the next page"""
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    last = items[-1]
+    return items, encode_cursor(getattr(last, sort_attr), last.id)
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """List endpoints return the next page's cursor in a header, absent on the last page"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
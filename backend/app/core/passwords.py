@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional, TypeVar
+from collections import deque
+from fastapi import HTTPException, status
+import asyncio
+import threading
+import time
+
+from app.core.auth import get_password_hash, verify_password
+from app.core.config import settings
+
+T = TypeVar("T")
+
+class PasswordExecutor:
+    """Bounded worker pool for bcrypt hashing and verification.
+
+    Each bcrypt call takes a few hundred milliseconds of CPU; running them on
+    a dedicated pool keeps them off the event loop and out of the threadpool
+    shared by sync handlers. At most ``workers`` hashes run at once and at
+    most ``max_queue`` more wait for a worker. Beyond that, requests are
+    rejected with 503 and a Retry-After instead of piling up behind a login
+    storm.
+    """
+
+    def __init__(self, workers: int, max_queue: int, samples: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+
+        # Operations admitted and not yet finished, running or queued
+        self.in_flight = 0
+        self.running = 0
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.peak_in_flight = 0
+        self.max_wait = 0.0
+        # Recent queue waits and run times in seconds, for percentiles
+        self.waits: Deque[float] = deque(maxlen=samples)
+        self.runs: Deque[float] = deque(maxlen=samples)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def _admit(self):
+        with self.lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many login attempts in progress, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _timed(self, func: Callable[..., T], queued_at: float, *args: Any) -> T:
+        start = time.perf_counter()
+        with self.lock:
+            self.running += 1
+            wait = start - queued_at
+            self.waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return func(*args)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.runs.append(time.perf_counter() - start)
+
+    def _release(self, future):
+        with self.lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        self._admit()
+        future = self.executor.submit(self._timed, func, time.perf_counter(), *args)
+        # Released when the work finishes or is cancelled, even if the caller went away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_metrics(self) -> dict:
+        def ms(samples: Deque[float], pct: float) -> float:
+            values = sorted(samples)
+            if not values:
+                return 0.0
+            return round(values[min(len(values) - 1, int(pct / 100 * len(values)))] * 1000, 2)
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.in_flight - self.running,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": {"p50": ms(self.waits, 50), "p99": ms(self.waits, 99), "max": round(self.max_wait * 1000, 2)},
+            "run_ms": {"p50": ms(self.runs, 50), "p99": ms(self.runs, 99)}
+        }
+
+password_executor = PasswordExecutor(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue
+)
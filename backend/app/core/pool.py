@@ -0,0 +1,80 @@
+from typing import Deque
+from collections import deque
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import time
+
+class PoolMetrics:
+    """Checkout wait times and saturation for one connection pool"""
+
+    def __init__(self, samples: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.max_wait = 0.0
+        # Recent wait times in seconds, for percentiles
+        self.waits: Deque[float] = deque(maxlen=samples)
+
+    def record_wait(self, seconds: float, checked_out: int):
+        self.checkouts += 1
+        self.waits.append(seconds)
+        self.max_wait = max(self.max_wait, seconds)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_timeout(self):
+        self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        waits = sorted(self.waits)
+
+        def wait_ms(pct: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(pct / 100 * len(waits)))] * 1000, 2)
+
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(checked_out / capacity, 2) if capacity else None,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "p50": wait_ms(50),
+                "p99": wait_ms(99),
+                "max": round(self.max_wait * 1000, 2)
+            }
+        }
+
+class InstrumentedPoolMixin:
+    """Times every checkout, including the wait for a free connection"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - start, self.checkedout())
+        return connection
+
+# Metrics live on the class so they survive pool.recreate() on engine.dispose()
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+def get_pool_metrics(engine) -> dict:
+    """Pool metrics for an engine, or just its status line if it is not instrumented"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedPoolMixin):
+        return pool.metrics.snapshot(pool)
+    return {"status": pool.status()}
@@ -2,6 +2,9 @@ from app.models.user import User
 from app.models.incident import Incident
 from app.models.unit import Unit
 from app.models.log import Log
+from app.models.dispatch import Dispatch
+from app.models.rollup import IncidentRollup, ResponseTimeRollup, RollupWatermark
+from app.models.change import ChangeJournal, JournalWatermark
 from app.core.database import Base
 
-__all__ = ["User", "Incident", "Unit", "Dispatch", "Log", "Base"] 
\ No newline at end of file
+__all__ = ["User", "Incident", "Unit", "Dispatch", "Log", "IncidentRollup", "ResponseTimeRollup", "RollupWatermark", "ChangeJournal", "JournalWatermark", "Base"] 
\ No newline at end of file
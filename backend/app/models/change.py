@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.core.database import Base
+from datetime import datetime
+
+class ChangeJournal(Base):
+    """One entry per committed insert, update or delete of a synced row; ``id`` is the sync version"""
+    __tablename__ = "change_journal"
+    __table_args__ = (
+        # Pruning entries past the retention window
+        Index("ix_change_journal_changed_at", "changed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)  # incidents, units or dispatches
+    row_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # upsert or delete
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class JournalWatermark(Base):
+    """Versions recorded about the change journal, e.g. the highest one pruned"""
+    __tablename__ = "change_journal_watermarks"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -13,6 +13,12 @@ class DispatchStatus(str, enum.Enum):
 
 class Dispatch(Base):
     __tablename__ = "dispatches"
+    __table_args__ = (
+        # Dispatches per incident, and the already-dispatched check on create
+        Index("ix_dispatches_incident_id_unit_id_status", "incident_id", "unit_id", "status"),
+        # Dispatches per unit, and a unit's active dispatch
+        Index("ix_dispatches_unit_id_status", "unit_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -26,6 +26,12 @@ class IncidentStatus(str, enum.Enum):
 
 class Incident(Base):
     __tablename__ = "incidents"
+    __table_args__ = (
+        # Incident lists filtered by status, newest first
+        Index("ix_incidents_status_created_at", "status", "created_at"),
+        # Unfiltered incident lists and date-range reports
+        Index("ix_incidents_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     incident_number = Column(String, unique=True, index=True, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -14,6 +14,14 @@ class LogType(str, enum.Enum):
 
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        # Incident timelines and AAR reports, unit and user activity, all time ordered
+        Index("ix_logs_incident_id_timestamp", "incident_id", "timestamp"),
+        Index("ix_logs_unit_id_timestamp", "unit_id", "timestamp"),
+        Index("ix_logs_user_id_timestamp", "user_id", "timestamp"),
+        # Recent activity and date-range summaries
+        Index("ix_logs_timestamp", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
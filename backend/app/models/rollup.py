@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Float, JSON, Index
+from app.core.database import Base
+from app.models.incident import IncidentType, IncidentPriority, IncidentStatus
+
+class IncidentRollup(Base):
+    """Incidents per call hour by type, priority and current status"""
+    __tablename__ = "incident_rollups_hourly"
+    __table_args__ = (
+        Index("ix_incident_rollups_hourly_bucket_priority", "bucket", "priority"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, nullable=False)  # start of the hour, UTC
+    type = Column(Enum(IncidentType), nullable=False)
+    priority = Column(Enum(IncidentPriority), nullable=False)
+    status = Column(Enum(IncidentStatus), nullable=False)
+
+    count = Column(Integer, nullable=False, default=0)
+    # Incidents with a unit on scene, and their summed call-to-first-arrival seconds
+    responded = Column(Integer, nullable=False, default=0)
+    response_seconds = Column(Float, nullable=False, default=0.0)
+    # Dispatch rows of these incidents, as counted by the raw response-time report
+    dispatches = Column(Integer, nullable=False, default=0)
+
+class ResponseTimeRollup(Base):
+    """Histogram of one response interval per call hour, priority and type"""
+    __tablename__ = "response_time_rollups_hourly"
+    __table_args__ = (
+        Index("ix_response_time_rollups_hourly_bucket_priority", "bucket", "priority"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, nullable=False)  # start of the hour, UTC
+    priority = Column(Enum(IncidentPriority), nullable=False)
+    type = Column(Enum(IncidentType), nullable=False)
+    interval = Column(String, nullable=False)  # e.g. call_to_dispatch
+
+    count = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0.0)
+    histogram = Column(JSON, nullable=False)  # counts per bin of rollups.HISTOGRAM_EDGES
+    max_seconds = Column(Float, nullable=False, default=0.0)  # bounds the open-ended top bin
+
+class RollupWatermark(Base):
+    """How far each rollup job has processed changes"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    value = Column(DateTime, nullable=False)
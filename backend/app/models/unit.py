@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Float, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -19,6 +19,10 @@ class UnitStatus(str, enum.Enum):
 
 class Unit(Base):
     __tablename__ = "units"
+    __table_args__ = (
+        # Available units, listed by unit number
+        Index("ix_units_status_unit_number", "status", "unit_number"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     unit_number = Column(String, unique=True, index=True, nullable=False)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+from app.schemas.dispatch import DispatchResponse
+from app.schemas.incident import IncidentResponse
+from app.schemas.unit import UnitResponse
+
+class SyncResponse(BaseModel):
+    version: int = Field(..., description="Pass as ``since`` on the next poll")
+    reset: bool = Field(False, description="The client's version is unknown or expired; reload the full lists")
+    has_more: bool = Field(False, description="More changes are pending; poll again right away")
+    incidents: List[IncidentResponse] = []
+    units: List[UnitResponse] = []
+    dispatches: List[DispatchResponse] = []
+    deleted: Dict[str, List[int]] = Field(default_factory=dict, description="Tombstoned ids by table")
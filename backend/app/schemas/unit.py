@@ -28,22 +28,30 @@ class UnitStatusUpdate(BaseModel):
     status: UnitStatus = Field(..., description="New unit status")
     notes: Optional[str] = Field(None, description="Optional notes about status change")
 
-class UnitResponse(BaseModel):
+class UnitLocationUpdate(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90, description="Current latitude")
+    longitude: float = Field(..., ge=-180, le=180, description="Current longitude")
+
+class UnitResponse(UnitBase):
     id: int
-    name: str
     status: UnitStatus
-    responder_id: Optional[int]
-    incident_id: Optional[int]
-    updated_at: datetime
+    current_latitude: Optional[float] = None
+    current_longitude: Optional[float] = None
+    last_location_update: Optional[datetime] = None
+    assigned_incident_id: Optional[int] = None
+    assigned_user_id: Optional[int] = None
+    is_active: bool = True
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 class UnitList(BaseModel):
     units: List[UnitResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # only with include_total=true
     size: int
+    next_cursor: Optional[str] = None
 
 class UnitAssignment(BaseModel):
     incident_id: int = Field(..., description="ID of incident to assign unit to")
@@ -0,0 +1,174 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import numpy as np
+
+from app.models.dispatch import Dispatch
+from app.models.incident import Incident, IncidentPriority
+
+# Response intervals as (name, start column, end column) in the epoch arrays
+INTERVALS = (
+    ("call_to_dispatch", "created", "dispatched"),
+    ("dispatch_to_enroute", "dispatched", "en_route"),
+    ("enroute_to_scene", "en_route", "on_scene"),
+    ("call_to_scene", "created", "on_scene"),
+)
+
+GROUP_BY_OPTIONS = ("priority", "type", "unit", "hour", "day")
+
+PERCENTILES = (50, 90, 99)
+
+def epoch_seconds(column, dialect: str):
+    """SQL expression for a timestamp column as seconds since the epoch"""
+    if dialect == "sqlite":
+        # julianday keeps sub-second precision, unlike strftime('%s'); rounding to
+        # milliseconds drops its float error, which can push an exact hour into the one before
+        return func.round((func.julianday(column) - 2440587.5) * 86400.0, 3)
+    return func.extract("epoch", column)
+
+def interval_stats(values: np.ndarray) -> Dict[str, Any]:
+    """Mean and percentiles in seconds, ignoring missing and negative intervals"""
+    values = values[~np.isnan(values)]
+    values = values[values >= 0]
+    if values.size == 0:
+        return {"count": 0, "mean": None, **{f"p{pct}": None for pct in PERCENTILES}}
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 1),
+        **{f"p{pct}": round(float(value), 1) for pct, value in zip(PERCENTILES, percentiles)}
+    }
+
+def fetch_dispatch_times(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    priority: Optional[IncidentPriority] = None,
+    group_by: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """Columnar fetch of incident and dispatch timestamps as float epoch seconds.
+
+    Calls in [start_date, end_date) are included, matching the hourly rollups.
+    Only numbers cross the wire; missing timestamps become NaN.
+    """
+    dialect = db.get_bind().dialect.name
+    columns = [
+        epoch_seconds(Incident.created_at, dialect),
+        epoch_seconds(Dispatch.dispatch_time, dialect),
+        epoch_seconds(Dispatch.en_route_time, dialect),
+        epoch_seconds(Dispatch.on_scene_time, dialect),
+    ]
+    key_column = {"priority": Incident.priority, "type": Incident.type, "unit": Dispatch.unit_id}.get(group_by)
+    if key_column is not None:
+        columns.append(key_column)
+
+    query = select(*columns).select_from(Dispatch).join(Incident, Dispatch.incident_id == Incident.id)
+    if start_date:
+        query = query.where(Incident.created_at >= start_date)
+    if end_date:
+        query = query.where(Incident.created_at < end_date)
+    if priority:
+        query = query.where(Incident.priority == priority)
+
+    rows = db.execute(query).all()
+    raw = list(zip(*rows)) if rows else [()] * len(columns)
+
+    data = {
+        name: np.asarray(raw[i], dtype=float)
+        for i, name in enumerate(("created", "dispatched", "en_route", "on_scene"))
+    }
+    if key_column is not None:
+        data["key"] = np.asarray([getattr(key, "value", key) for key in raw[4]])
+    return data
+
+def compute_intervals(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {name: data[end] - data[start] for name, start, end in INTERVALS}
+
+def group_keys(data: Dict[str, np.ndarray], group_by: str) -> np.ndarray:
+    """Grouping key per dispatch; time buckets are taken from the call time"""
+    if group_by == "hour":
+        hours = np.floor(np.mod(data["created"], 86400) / 3600)
+        return np.where(np.isnan(hours), -1, hours).astype(int)
+    if group_by == "day":
+        days = np.floor(data["created"] / 86400)
+        valid = ~np.isnan(days)
+        keys = np.full(days.shape, None, dtype=object)
+        keys[valid] = (days[valid].astype("int64") * 86400).astype("datetime64[s]").astype("datetime64[D]").astype(str)
+        return keys
+    return data["key"]
+
+def response_time_report(
+    db: Session,
+    group_by: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    priority: Optional[IncidentPriority] = None
+) -> Dict[str, Any]:
+    """Response interval statistics overall and, optionally, per group"""
+    if group_by is not None and group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"Unsupported group_by '{group_by}', expected one of {', '.join(GROUP_BY_OPTIONS)}")
+
+    data = fetch_dispatch_times(db, start_date, end_date, priority, group_by)
+    intervals = compute_intervals(data)
+
+    report = {
+        "source": "raw",
+        "dispatches": int(data["created"].size),
+        "overall": {name: interval_stats(values) for name, values in intervals.items()},
+    }
+    if group_by is None:
+        return report
+
+    keys = group_keys(data, group_by)
+    groups: List[Dict[str, Any]] = []
+    if keys.size:
+        # Sort once by group and split every interval array at the group boundaries
+        sortable = keys.astype(str) if keys.dtype == object else keys
+        unique, inverse = np.unique(sortable, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse))[:-1]
+        members = np.split(order, bounds)
+        split_intervals = {name: np.split(values[order], bounds) for name, values in intervals.items()}
+        for i in range(len(unique)):
+            key = keys[members[i][0]]
+            if isinstance(key, np.generic):
+                key = key.item()
+            groups.append({
+                "key": None if key == -1 else key,
+                "dispatches": int(members[i].size),
+                **{name: interval_stats(chunks[i]) for name, chunks in split_intervals.items()}
+            })
+
+    report["group_by"] = group_by
+    report["groups"] = groups
+    return report
+
+def average_response_time(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    priority: Optional[IncidentPriority] = None
+) -> Optional[float]:
+    """Mean seconds from call to the first unit on scene, per incident called in [start_date, end_date)"""
+    dialect = db.get_bind().dialect.name
+    response = (
+        func.min(epoch_seconds(Dispatch.on_scene_time, dialect)) - epoch_seconds(Incident.created_at, dialect)
+    )
+    query = (
+        select(response.label("response"))
+        .select_from(Dispatch)
+        .join(Incident, Dispatch.incident_id == Incident.id)
+        .where(Dispatch.on_scene_time.isnot(None))
+        .group_by(Incident.id, Incident.created_at)
+    )
+    if start_date:
+        query = query.where(Incident.created_at >= start_date)
+    if end_date:
+        query = query.where(Incident.created_at < end_date)
+    if priority:
+        query = query.where(Incident.priority == priority)
+
+    subquery = query.subquery()
+    mean = db.execute(select(func.avg(subquery.c.response)).where(subquery.c.response >= 0)).scalar()
+    return round(float(mean), 1) if mean is not None else None
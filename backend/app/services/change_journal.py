@@ -0,0 +1,161 @@
+"""
+Change journal behind the delta-sync endpoint.
+
+Every flush that inserts, updates or deletes an Incident, Unit or Dispatch
+appends one ``change_journal`` entry per row in the same transaction, so
+an entry exists exactly when its change is committed. Entry ids are the
+sync versions: clients poll ``/api/sync?since=<version>`` and get the
+current state of every row changed after it, plus tombstones for deletes.
+
+Ids are assigned at flush time but transactions commit in any order, so
+an entry can become visible after a higher one. The version returned to
+clients therefore only advances past entries older than
+``settings.sync_settle_seconds``; newer entries are sent again on the next
+poll rather than risk skipping a late commit. For the same reason a GPS
+update of a unit that already has an unsettled entry adds no new one: no
+client can have moved past that entry, so the next poll reads the latest
+position anyway.
+
+Pruning records the highest version it removed; clients behind it are
+told to reset, since the changes they missed are gone.
+"""
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.change import ChangeJournal, JournalWatermark
+from app.models.dispatch import Dispatch
+from app.models.incident import Incident
+from app.models.unit import Unit
+from app.schemas.dispatch import DispatchResponse
+from app.schemas.incident import IncidentResponse
+from app.schemas.unit import UnitResponse
+from app.services.live_state import TRACKED_MODELS
+
+# Journaled tables, with the model and response schema of each
+SYNCED_TABLES = {
+    "incidents": (Incident, IncidentResponse),
+    "units": (Unit, UnitResponse),
+    "dispatches": (Dispatch, DispatchResponse),
+}
+
+PRUNED = "pruned"
+
+# Unit columns a GPS update touches
+LOCATION_ATTRS = {"current_latitude", "current_longitude", "last_location_update", "updated_at"}
+
+def _location_only(obj) -> bool:
+    changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+    return bool(changed) and changed <= LOCATION_ATTRS
+
+@event.listens_for(Session, "after_flush")
+def _journal_changes(session: Session, flush_context):
+    now = datetime.utcnow()
+    rows = []
+    gps_units = set()
+    for objects, op, updated in ((session.new, "upsert", False), (session.dirty, "upsert", True), (session.deleted, "delete", False)):
+        for obj in objects:
+            name = TRACKED_MODELS.get(type(obj))
+            if name is not None and (op == "delete" or session.is_modified(obj)):
+                rows.append({"table_name": name, "row_id": obj.id, "op": op, "changed_at": now})
+                if updated and isinstance(obj, Unit) and _location_only(obj):
+                    gps_units.add(obj.id)
+    if gps_units:
+        # Units whose previous change has not settled yet are already covered by it
+        covered = set(session.connection().execute(
+            select(ChangeJournal.row_id).where(
+                ChangeJournal.table_name == "units",
+                ChangeJournal.op == "upsert",
+                ChangeJournal.row_id.in_(gps_units),
+                ChangeJournal.changed_at > settled_before()
+            )
+        ).scalars())
+        rows = [
+            row for row in rows
+            if not (row["table_name"] == "units" and row["row_id"] in covered and row["row_id"] in gps_units)
+        ]
+    if rows:
+        session.connection().execute(insert(ChangeJournal), rows)
+
+def settled_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.sync_settle_seconds)
+
+async def changes_since(db: AsyncSession, since: Optional[int], limit: int) -> Dict[str, Any]:
+    """Rows changed after version ``since``, or a reset when it is missing or unknown"""
+    cutoff = settled_before()
+    if since is not None:
+        newest = await db.scalar(select(func.max(ChangeJournal.id))) or 0
+        pruned = await db.scalar(select(JournalWatermark.version).where(JournalWatermark.name == PRUNED)) or 0
+        # Pruned past the client's version, or a version from another database
+        if since > max(newest, pruned) or since < pruned:
+            since = None
+    if since is None:
+        version = await db.scalar(select(func.max(ChangeJournal.id)).where(ChangeJournal.changed_at <= cutoff))
+        return {"version": version or 0, "reset": True}
+
+    entries = (await db.execute(
+        select(ChangeJournal).where(ChangeJournal.id > since).order_by(ChangeJournal.id).limit(limit + 1)
+    )).scalars().all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Only advance past the settled prefix; later entries may still have earlier gaps
+    version = since
+    for entry in entries:
+        if entry.changed_at > cutoff:
+            break
+        version = entry.id
+
+    # Latest operation per row
+    latest: Dict[str, Dict[int, str]] = {name: {} for name in SYNCED_TABLES}
+    for entry in entries:
+        latest[entry.table_name][entry.row_id] = entry.op
+
+    result: Dict[str, Any] = {"version": version, "reset": False, "has_more": has_more, "deleted": {}}
+    for name, (model, schema) in SYNCED_TABLES.items():
+        upserted = [row_id for row_id, op in latest[name].items() if op == "upsert"]
+        deleted = {row_id for row_id, op in latest[name].items() if op == "delete"}
+        rows: List[Any] = []
+        if upserted:
+            rows = (await db.execute(select(model).where(model.id.in_(upserted)).order_by(model.id))).scalars().all()
+            # Rows deleted since their entry was read count as deleted
+            deleted.update(set(upserted) - {row.id for row in rows})
+        result[name] = [schema.model_validate(row) for row in rows]
+        if deleted:
+            result["deleted"][name] = sorted(deleted)
+    return result
+
+def prune_journal(now: Optional[datetime] = None, session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """Delete entries past the retention window and advance the pruned watermark.
+
+    The newest entry is always kept, so SQLite cannot hand its id out again.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.sync_journal_retention_hours)
+    db = session_factory()
+    try:
+        newest = db.scalar(select(func.max(ChangeJournal.id)))
+        if newest is None:
+            return 0
+        pruned = db.scalar(
+            select(func.max(ChangeJournal.id)).where(ChangeJournal.changed_at < cutoff, ChangeJournal.id < newest)
+        )
+        if pruned is None:
+            return 0
+        result = db.execute(delete(ChangeJournal).where(ChangeJournal.id <= pruned))
+        watermark = db.get(JournalWatermark, PRUNED)
+        if watermark is None:
+            db.add(JournalWatermark(name=PRUNED, version=pruned))
+        else:
+            watermark.version = max(watermark.version, pruned)
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,80 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def single_runner(bind: Engine, name: str) -> Iterator[bool]:
+    """Try to become the only runner of the job ``name`` against this database.
+
+    Every API worker schedules the same periodic jobs; a run that yields
+    False should be skipped because another worker holds the lock. On
+    PostgreSQL this is a session advisory lock on a connection of its own,
+    so commits inside the job do not release it; other databases get a
+    file lock, which covers the workers of one host.
+    """
+    key = hashlib.sha256(f"{bind.url.render_as_string(hide_password=True)}/{name}".encode()).digest()
+    if bind.dialect.name == "postgresql":
+        lock_id = int.from_bytes(key[:8], "big", signed=True)
+        with bind.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar()
+            conn.commit()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+                    conn.commit()
+        return
+
+    path = os.path.join(tempfile.gettempdir(), f"commandflex-{name}-{key.hex()[:16]}.lock")
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+class PeriodicJob:
+    """Runs a blocking maintenance task on a fixed interval in a worker thread"""
+
+    def __init__(self, name: str, interval: float, task: Callable[[], Any], initial_delay: float = 0.0):
+        self.name = name
+        self.interval = interval
+        self.task = task
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await asyncio.to_thread(self.task)
+            except Exception as e:
+                logger.exception("Error running %s: %r", self.name, e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,433 @@
+"""
+In-memory read model of the live operational picture.
+
+Each worker holds open incidents and all units as response snapshots,
+kept in sorted indexes so the hot list endpoints answer a page in
+O(log n + page) time without touching the database.
+
+The store is loaded at startup and kept current from the ORM: every session
+that commits changes to an Incident or Unit applies their fresh
+snapshots here, whichever handler made them, and publishes them on the
+event bus to the other workers. Bulk UPDATE statements bypass the ORM
+events; the periodic resync (``settings.live_state_resync_seconds``)
+bounds how long such changes, or bus events lost between workers, stay
+invisible.
+
+A change that cannot be snapshotted is logged and triggers an immediate
+reload instead of waiting for the resync.
+
+Every applied change bumps ``version``; together with the per-process
+``epoch`` it is returned in the ``X-Live-Version`` header.
+"""
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+from datetime import datetime
+import asyncio
+import logging
+import threading
+import uuid
+
+from app.core.database import SessionLocal
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.incident import Incident, IncidentStatus
+from app.models.unit import Unit
+from app.schemas.incident import IncidentList
+from app.schemas.unit import UnitResponse
+from app.websocket.manager import manager
+
+logger = logging.getLogger(__name__)
+
+OPEN_INCIDENT_STATUSES = (IncidentStatus.new, IncidentStatus.dispatched, IncidentStatus.on_scene)
+
+# Snapshot schemas declare their own enum classes, so compare by value
+_OPEN_INCIDENT_VALUES = {status.value for status in OPEN_INCIDENT_STATUSES}
+
+LIVE_VERSION_HEADER = "X-Live-Version"
+
+# One (table, id, snapshot) per changed row; a None snapshot removes the row
+Change = Tuple[str, int, Optional[BaseModel]]
+
+def _value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+class SortedIndex:
+    """(sort value, id) keys kept in order for keyset pages"""
+
+    def __init__(self):
+        self.keys: List[tuple] = []
+
+    def add(self, key: tuple):
+        insort(self.keys, key)
+
+    def remove(self, key: tuple):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def page(self, after: Optional[tuple], limit: int, descending: bool) -> List[tuple]:
+        if descending:
+            end = bisect_left(self.keys, after) if after is not None else len(self.keys)
+            return self.keys[max(0, end - limit):end][::-1]
+        start = bisect_right(self.keys, after) if after is not None else 0
+        return self.keys[start:start + limit]
+
+class LiveTable:
+    """Snapshots of one model by id, with a sorted index per filter combination"""
+
+    def __init__(
+        self,
+        schema: Type[BaseModel],
+        sort_attr: str,
+        index_keys: Callable[[Any], List[tuple]],
+        keep: Callable[[Any], bool]
+    ):
+        self.schema = schema
+        self.sort_attr = sort_attr
+        self.index_keys = index_keys
+        self.keep = keep
+        self.items: Dict[int, BaseModel] = {}
+        self.indexes: Dict[tuple, SortedIndex] = {}
+
+    def _keys(self, item) -> Tuple[tuple, List[tuple]]:
+        sort_value = getattr(item, self.sort_attr)
+        if sort_value is None:
+            sort_value = datetime.min
+        return (sort_value, item.id), [()] + self.index_keys(item)
+
+    def put(self, item_id: int, item: Optional[BaseModel]):
+        """Insert or replace a snapshot; None, or one ``keep`` rejects, removes it"""
+        self.remove(item_id)
+        if item is None or not self.keep(item):
+            return
+        self.items[item_id] = item
+        sort_key, index_keys = self._keys(item)
+        for index_key in index_keys:
+            self.indexes.setdefault(index_key, SortedIndex()).add(sort_key)
+
+    def remove(self, item_id: int):
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        sort_key, index_keys = self._keys(item)
+        for index_key in index_keys:
+            index = self.indexes[index_key]
+            index.remove(sort_key)
+            if not index.keys:
+                del self.indexes[index_key]
+
+    def count(self, index_key: tuple = ()) -> int:
+        index = self.indexes.get(index_key)
+        return len(index.keys) if index else 0
+
+    def page(
+        self,
+        index_key: tuple,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool
+    ) -> Tuple[List[BaseModel], Optional[str]]:
+        """Same ordering and cursors as pagination.paginate over the database"""
+        index = self.indexes.get(index_key)
+        if index is None:
+            return [], None
+        after = None
+        if cursor:
+            sort_value, row_id = decode_cursor(cursor)
+            # NULL sort values are indexed as the lowest value, like the database orders them
+            after = (datetime.min if sort_value is None else sort_value, row_id)
+        try:
+            keys = index.page(after, limit + 1, descending)
+        except TypeError:
+            # A cursor from another list, with a sort value of the wrong type
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        items = [self.items[item_id] for _, item_id in keys[:limit]]
+        if len(keys) <= limit:
+            return items, None
+        last = items[-1]
+        return items, encode_cursor(getattr(last, self.sort_attr), last.id)
+
+def _new_tables() -> Dict[str, LiveTable]:
+    return {
+        "incidents": LiveTable(
+            IncidentList,
+            "created_at",
+            lambda incident: [
+                ("status", _value(incident.status)),
+                ("status", _value(incident.status), "priority", incident.priority),
+            ],
+            lambda incident: _value(incident.status) in _OPEN_INCIDENT_VALUES
+        ),
+        "units": LiveTable(
+            UnitResponse,
+            "unit_number",
+            lambda unit: [
+                ("status", _value(unit.status)),
+                ("type", _value(unit.type)),
+                ("status", _value(unit.status), "type", _value(unit.type)),
+            ],
+            lambda unit: True
+        ),
+    }
+
+# Models mirrored in the store, and the table holding each
+TRACKED_MODELS = {
+    Incident: "incidents",
+    Unit: "units",
+}
+
+class LiveState:
+    def __init__(self):
+        self.tables = _new_tables()
+        self.lock = threading.Lock()
+        # Held for a whole load, so the resync and on-demand reloads never overlap
+        self.load_lock = threading.Lock()
+        # Versions are only comparable within one epoch
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.ready = False
+        # Identifies this worker's own events on the bus
+        self.origin = uuid.uuid4().hex
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Changes applied while a reload is reading the database
+        self._replay: Optional[List[Change]] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.session_factory: Callable[[], Session] = SessionLocal
+        # Set when a reload is wanted; one reload task runs at a time
+        self._reload_requested = False
+        self._reload_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.local_changes = 0
+        self.remote_changes = 0
+        self.reloads = 0
+        self.snapshot_errors = 0
+
+    @property
+    def version_tag(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def load(self, session_factory: Callable[[], Session] = SessionLocal):
+        """Rebuild the store from the database without losing changes committed meanwhile"""
+        with self.load_lock:
+            self.session_factory = session_factory
+            self._load(session_factory)
+
+    def _load(self, session_factory: Callable[[], Session]):
+        with self.lock:
+            self._replay = []
+        try:
+            fresh = _new_tables()
+            db = session_factory()
+            try:
+                queries = {
+                    "incidents": select(Incident).where(Incident.status.in_(OPEN_INCIDENT_STATUSES)),
+                    "units": select(Unit),
+                }
+                for name, query in queries.items():
+                    table = fresh[name]
+                    for row in db.execute(query).scalars():
+                        table.put(row.id, table.schema.model_validate(row))
+            finally:
+                db.close()
+        except Exception:
+            with self.lock:
+                self._replay = None
+            raise
+
+        with self.lock:
+            for name, item_id, item in self._replay:
+                fresh[name].put(item_id, item)
+            self._replay = None
+            self.tables = fresh
+            self.version += 1
+            self.reloads += 1
+            self.ready = True
+
+    def apply(self, changes: List[Change]) -> bool:
+        with self.lock:
+            if not self.ready and self._replay is None:
+                return False  # never loaded, e.g. in scripts
+            for name, item_id, item in changes:
+                if self.ready:
+                    self.tables[name].put(item_id, item)
+                if self._replay is not None:
+                    self._replay.append((name, item_id, item))
+            self.version += 1
+            return True
+
+    def commit_changes(self, changes: List[Change]):
+        """Apply changes committed by this worker and publish them to the others"""
+        if not changes or not self.apply(changes):
+            return
+        self.local_changes += len(changes)
+
+        loop = self._loop
+        # Only other workers need the event; the memory bus has none
+        if loop is None or manager.bus.name == "memory":
+            return
+        payload = {
+            "origin": self.origin,
+            "changes": [
+                [name, item_id, item.model_dump(mode="json") if item is not None else None]
+                for name, item_id, item in changes
+            ]
+        }
+        publish = manager.publish_internal("live_state", payload)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            task = loop.create_task(publish)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            # Committed from a threadpool handler
+            asyncio.run_coroutine_threadsafe(publish, loop)
+
+    def request_reload(self):
+        """Reload as soon as possible, e.g. after a committed change could not be snapshotted
+
+        Safe to call from any thread. Without a running loop (scripts) only
+        the periodic resync, if any, picks the change up.
+        """
+        self._reload_requested = True
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._start_reload)
+
+    def _start_reload(self):
+        if self._loop is None or (self._reload_task is not None and not self._reload_task.done()):
+            return  # the running reload checks the flag again when it ends
+        self._reload_task = self._loop.create_task(self._reload())
+
+    async def _reload(self):
+        while self._reload_requested:
+            self._reload_requested = False
+            try:
+                await asyncio.to_thread(self.load, self.session_factory)
+            except Exception as e:
+                logger.exception("Error reloading live state: %r", e)
+                return
+
+    async def _on_bus_event(self, event: dict):
+        data = event["data"]
+        if data["origin"] == self.origin:
+            return
+        changes = []
+        for name, item_id, item in data["changes"]:
+            schema = self.tables[name].schema
+            changes.append((name, item_id, schema.model_validate(item) if item is not None else None))
+        if self.apply(changes):
+            self.remote_changes += len(changes)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        manager.add_internal_handler("live_state", self._on_bus_event)
+        await asyncio.to_thread(self.load)
+
+    async def stop(self):
+        self._loop = None
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            self._reload_task = None
+
+    def list_incidents(
+        self,
+        status: IncidentStatus,
+        priority: Optional[int],
+        cursor: Optional[str],
+        limit: int
+    ) -> Tuple[List[BaseModel], Optional[str]]:
+        """Open incidents with ``status``, newest first"""
+        index_key = ("status", _value(status))
+        if priority:
+            index_key += ("priority", priority)
+        with self.lock:
+            return self.tables["incidents"].page(index_key, cursor, limit, descending=True)
+
+    def list_units(
+        self,
+        status: Optional[str],
+        type: Optional[str],
+        cursor: Optional[str],
+        limit: int
+    ) -> Tuple[List[BaseModel], int, Optional[str]]:
+        """Units by unit number, with the total matching the filters"""
+        index_key: tuple = ()
+        if status:
+            index_key += ("status", _value(status))
+        if type:
+            index_key += ("type", _value(type))
+        with self.lock:
+            table = self.tables["units"]
+            units, next_cursor = table.page(index_key, cursor, limit, descending=False)
+            return units, table.count(index_key), next_cursor
+
+    def set_version_header(self, response: Response):
+        response.headers[LIVE_VERSION_HEADER] = self.version_tag
+
+    def get_metrics(self) -> dict:
+        return {
+            "ready": self.ready,
+            "version": self.version_tag,
+            "incidents": self.tables["incidents"].count(),
+            "units": self.tables["units"].count(),
+            "local_changes": self.local_changes,
+            "remote_changes": self.remote_changes,
+            "reloads": self.reloads,
+            "snapshot_errors": self.snapshot_errors
+        }
+
+live_state = LiveState()
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    # new/dirty/deleted still describe what this flush wrote
+    touched = session.info.setdefault("live_state_touched", {})
+    for obj in session.new | session.dirty:
+        name = TRACKED_MODELS.get(type(obj))
+        if name is not None:
+            touched[(name, obj.id)] = obj
+    for obj in session.deleted:
+        name = TRACKED_MODELS.get(type(obj))
+        if name is not None:
+            touched[(name, obj.id)] = None
+
+@event.listens_for(Session, "after_flush_postexec")
+def _snapshot_changes(session: Session, flush_context):
+    touched = session.info.pop("live_state_touched", None)
+    if not touched:
+        return
+    # Snapshot now, while server defaults can still be loaded in the transaction
+    changes = session.info.setdefault("live_state_changes", {})
+    for (name, item_id), obj in touched.items():
+        if obj is None:
+            changes[(name, item_id)] = None
+            continue
+        try:
+            changes[(name, item_id)] = live_state.tables[name].schema.model_validate(obj)
+        except Exception as e:
+            # The write still succeeds; the store reloads once it is committed
+            logger.exception("Error snapshotting %s %s for live state: %r", name, item_id, e)
+            live_state.snapshot_errors += 1
+            session.info["live_state_stale"] = True
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session):
+    changes = session.info.pop("live_state_changes", None)
+    if changes:
+        live_state.commit_changes([(name, item_id, item) for (name, item_id), item in changes.items()])
+    if session.info.pop("live_state_stale", False):
+        live_state.request_reload()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop("live_state_touched", None)
+    session.info.pop("live_state_changes", None)
+    session.info.pop("live_state_stale", None)
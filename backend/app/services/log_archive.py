@@ -0,0 +1,275 @@
+"""
+Month-partitioned storage for the logs table.
+
+On PostgreSQL ``logs`` is a declaratively partitioned table with one range
+partition per calendar month, created ahead of time, plus a default
+partition for stray timestamps. On SQLite the single ``logs`` table is kept
+to a rolling window of recent months instead.
+
+Archival is opt-in (``settings.log_archive_interval_seconds``). Months older
+than ``settings.log_hot_months`` are then closed: the archive job writes
+each one to ``logs_YYYY_MM.jsonl.gz`` under ``settings.log_archive_dir``,
+which must be an absolute path, and then drops the partition (PostgreSQL)
+or deletes its rows (SQLite, or a closed month's rows in the default
+partition). Only one worker archives at a time, and a month's rows are
+only removed once its file has been read back intact. Archived months
+stay readable for AAR through archived_incident_logs.
+"""
+
+from sqlalchemy import delete, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime, time
+import gzip
+import json
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.database import Base, SessionLocal
+from app.models.log import Log
+from app.services.jobs import single_runner
+
+PARTITIONS_AHEAD = 2  # months of future partitions kept ready
+ARCHIVE_LOCK = "log-archival"
+
+LOG_COLUMNS = ("id", "type", "message", "details", "user_id", "incident_id", "unit_id", "timestamp")
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    return datetime(month.year, month.month, 1), datetime.combine(add_months(month, 1), time())
+
+def partition_name(month: date) -> str:
+    return f"logs_{month:%Y_%m}"
+
+def archive_dir() -> str:
+    """The configured archive directory; archival refuses to guess one"""
+    path = settings.log_archive_dir
+    if not path or not os.path.isabs(path):
+        raise ValueError("LOG_ARCHIVE_DIR must be set to an absolute path to archive logs")
+    return path
+
+def archive_path(month: date) -> str:
+    return os.path.join(archive_dir(), f"{partition_name(month)}.jsonl.gz")
+
+def archive_cutoff(now: Optional[datetime] = None) -> date:
+    """First month still kept in the database; everything before it is archived"""
+    return add_months(month_start(now or datetime.utcnow()), 1 - settings.log_hot_months)
+
+def create_partitioned_logs_table(engine: Engine):
+    """Create ``logs`` as a month-partitioned table on PostgreSQL.
+
+    Runs before ``create_all``, which then leaves the existing table alone.
+    An existing unpartitioned ``logs`` table is kept as it is.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        if inspect(conn).has_table(Log.__tablename__):
+            return
+        # Tables the foreign keys point at, and the enum type of Log.type
+        referenced = [fk.column.table for fk in Log.__table__.foreign_keys]
+        Base.metadata.create_all(bind=conn, tables=referenced)
+        Log.__table__.c.type.type.create(bind=conn, checkfirst=True)
+
+        # The partition key has to be part of the primary key
+        conn.execute(text('''
+            CREATE TABLE logs (
+                id SERIAL,
+                type logtype,
+                message TEXT NOT NULL,
+                details JSON,
+                user_id INTEGER REFERENCES users (id),
+                incident_id INTEGER NOT NULL REFERENCES incidents (id),
+                unit_id INTEGER REFERENCES units (id),
+                "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+                PRIMARY KEY (id, "timestamp")
+            ) PARTITION BY RANGE ("timestamp")
+        '''))
+        conn.execute(text("CREATE TABLE logs_default PARTITION OF logs DEFAULT"))
+        ensure_log_partitions(conn)
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('logs')"
+    )).first() is not None
+
+def list_log_partitions(conn: Connection) -> List[date]:
+    """Months that have their own partition, oldest first"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('logs')"
+    )).scalars().all()
+    months = []
+    for name in names:
+        try:
+            months.append(datetime.strptime(name, "logs_%Y_%m").date())
+        except ValueError:
+            continue  # logs_default
+    return sorted(months)
+
+def default_partition_months(conn: Connection, before: Optional[date] = None) -> List[date]:
+    """Months with rows in the default partition, oldest first"""
+    query, params = "SELECT DISTINCT date_trunc('month', \"timestamp\")::date FROM logs_default", {}
+    if before is not None:
+        query += " WHERE \"timestamp\" < :before"
+        params["before"] = before
+    return sorted(conn.execute(text(query), params).scalars().all())
+
+def ensure_log_partitions(conn: Connection, now: Optional[datetime] = None):
+    """Create monthly partitions from the hot window through PARTITIONS_AHEAD months ahead.
+
+    Months that already have rows in the default partition are skipped,
+    since PostgreSQL refuses to create a partition over them; their rows
+    stay there until the month is archived.
+    """
+    if not is_partitioned(conn):
+        return
+    existing = set(list_log_partitions(conn)) | set(default_partition_months(conn))
+    current = month_start(now or datetime.utcnow())
+    month = archive_cutoff(now)
+    while month <= add_months(current, PARTITIONS_AHEAD):
+        if month not in existing:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF logs "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+        month = add_months(month, 1)
+
+def _serialize(row) -> str:
+    record = dict(zip(LOG_COLUMNS, row))
+    record["type"] = getattr(record["type"], "value", record["type"])
+    if record["timestamp"] is not None:
+        record["timestamp"] = record["timestamp"].isoformat()
+    return json.dumps(record)
+
+def export_month(db: Session, month: date) -> int:
+    """Write one month of logs to its compressed archive file, replacing any earlier one.
+
+    The file is written under a name of its own and checked before it is
+    moved into place, so a crash or a concurrent writer never leaves a
+    truncated archive behind for the rows to be deleted against.
+    """
+    path = archive_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.partial"
+    start, end = month_bounds(month)
+    query = (
+        select(*(getattr(Log, column) for column in LOG_COLUMNS))
+        .where(Log.timestamp >= start, Log.timestamp < end)
+        .order_by(Log.timestamp, Log.id)
+        .execution_options(yield_per=5000)
+    )
+    rows = 0
+    try:
+        with gzip.open(partial, "wt", encoding="utf-8") as archive:
+            for row in db.execute(query):
+                archive.write(_serialize(row) + "\n")
+                rows += 1
+        written = count_archived_records(partial)
+        if written != rows:
+            raise ValueError(f"Archive {partial} holds {written} of {rows} rows")
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return rows
+
+def count_archived_records(path: str) -> int:
+    """Records in an archive file; reading it to the end also checks the gzip CRC"""
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return sum(1 for line in archive if line.strip())
+
+def _closed_months(db: Session, cutoff: date) -> List[date]:
+    conn = db.connection()
+    if is_partitioned(conn):
+        partitions = {month for month in list_log_partitions(conn) if month < cutoff}
+        return sorted(partitions | set(default_partition_months(conn, before=cutoff)))
+    oldest = db.execute(select(Log.timestamp).order_by(Log.timestamp).limit(1)).scalar()
+    if oldest is None:
+        return []
+    months, month = [], month_start(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+def archive_closed_months(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Archive and remove every month older than the hot window. Returns rows archived per month."""
+    archive_dir()
+    cutoff = archive_cutoff(now)
+    archived = {}
+    for month in _closed_months(db, cutoff):
+        archived[partition_name(month)] = export_month(db, month)
+        conn = db.connection()
+        start, end = month_bounds(month)
+        if is_partitioned(conn):
+            name = partition_name(month)
+            if month in list_log_partitions(conn):
+                conn.execute(text(f"ALTER TABLE logs DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+            # Rows of the month that landed in the default partition
+            conn.execute(
+                text('DELETE FROM logs_default WHERE "timestamp" >= :start AND "timestamp" < :end'),
+                {"start": start, "end": end}
+            )
+        else:
+            db.execute(delete(Log).where(Log.timestamp >= start, Log.timestamp < end))
+        # Commit per month so each exported month is removed before the next is read
+        db.commit()
+    return archived
+
+def run_log_maintenance(session_factory: Callable[[], Session] = SessionLocal) -> Optional[Dict[str, int]]:
+    """Create upcoming partitions and archive closed months, for the background job.
+
+    Returns None without doing anything when another worker holds the lock.
+    """
+    db = session_factory()
+    try:
+        with single_runner(db.get_bind(), ARCHIVE_LOCK) as acquired:
+            if not acquired:
+                return None
+            ensure_log_partitions(db.connection())
+            db.commit()
+            return archive_closed_months(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def archived_months() -> List[date]:
+    if not settings.log_archive_dir or not os.path.isdir(settings.log_archive_dir):
+        return []
+    months = []
+    for name in os.listdir(settings.log_archive_dir):
+        try:
+            months.append(datetime.strptime(name, "logs_%Y_%m.jsonl.gz").date())
+        except ValueError:
+            continue
+    return sorted(months)
+
+def iter_archived_logs(since: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """Stream archived log records from the month of ``since`` onwards, oldest first"""
+    first = month_start(since) if since else None
+    for month in archived_months():
+        if first and month < first:
+            continue
+        with gzip.open(archive_path(month), "rt", encoding="utf-8") as archive:
+            for line in archive:
+                yield json.loads(line)
+
+def archived_incident_logs(incident_id: int, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Archived logs of one incident; ``since`` (the incident's creation) skips older months"""
+    return [record for record in iter_archived_logs(since) if record["incident_id"] == incident_id]
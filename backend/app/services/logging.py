@@ -1,30 +1,249 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.models.log import Log, LogType
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import logging
+import threading
+import time
 
-async def create_log(
+logger = logging.getLogger(__name__)
+
+# Errors caused by the entry itself; retrying cannot help
+POISON_ERRORS = (IntegrityError, DataError)
+
+class LogWriter:
+    """Write-behind buffer for activity logs.
+
+    Handlers submit entries without touching the database. A flusher task
+    bulk-inserts them on a worker thread whenever ``batch_size`` entries are
+    pending or every ``flush_interval`` seconds. Entries submitted while the
+    writer is not running (scripts, shutdown) or while more than
+    ``max_pending`` are queued are written synchronously instead.
+
+    A batch rejected for its content (integrity or data errors) is retried
+    entry by entry so only the bad entries are dropped. Any other failure,
+    such as a lost connection, is treated as transient: unwritten entries go
+    back to the front of the queue and the flusher backs off before trying
+    again.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_backoff: float = 30.0,
+        sync_attempts: int = 3
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.max_backoff = max_backoff
+        # Tries for writes that cannot be requeued (no flusher running)
+        self.sync_attempts = sync_attempts
+
+        # Submitted from request threads, drained by the flusher
+        self.pending: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Seconds to wait before the next flush after a transient failure
+        self.backoff = 0.0
+
+        # Metrics
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.retries = 0
+        self.sync_writes = 0
+
+    def submit(self, entry: Dict[str, Any]):
+        """Queue a log entry (column values of Log) for the next batch"""
+        with self.lock:
+            buffered = self._loop is not None and len(self.pending) < self.max_pending
+            if buffered:
+                self.pending.append(entry)
+                wake = len(self.pending) >= self.batch_size
+
+        if not buffered:
+            self.sync_writes += 1
+            self._write_now([entry])
+        elif wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _write(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert entries in batches. Returns the entries left unwritten by a transient failure."""
+        db = self.session_factory()
+        try:
+            for start in range(0, len(entries), self.batch_size):
+                batch = entries[start:start + self.batch_size]
+                try:
+                    db.execute(insert(Log), batch)
+                    db.commit()
+                    self.written += len(batch)
+                    self.batches += 1
+                except POISON_ERRORS as e:
+                    db.rollback()
+                    logger.warning("Log batch rejected, retrying entries one by one: %r", e)
+                    unwritten = self._write_each(db, batch)
+                    if unwritten:
+                        return unwritten + entries[start + self.batch_size:]
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Writing %d log entries failed, will retry: %r", len(entries) - start, e)
+                    return entries[start:]
+            return []
+        finally:
+            db.close()
+
+    def _write_each(self, db: Session, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # One bad entry must not take the rest of its batch down with it
+        for index, entry in enumerate(batch):
+            try:
+                db.execute(insert(Log), [entry])
+                db.commit()
+                self.written += 1
+            except POISON_ERRORS as e:
+                db.rollback()
+                self.failed += 1
+                logger.error("Dropping log entry %r: %r", entry.get("message"), e)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Writing log entries failed, will retry: %r", e)
+                return batch[index:]
+        return []
+
+    def _write_now(self, entries: List[Dict[str, Any]]):
+        """Write without a flusher to requeue to, retrying transient failures a few times"""
+        delay = 0.1
+        for attempt in range(self.sync_attempts):
+            if attempt:
+                self.retries += 1
+                time.sleep(delay)
+                delay *= 2
+            entries = self._write(entries)
+            if not entries:
+                return
+        self.failed += len(entries)
+        logger.error("Dropping %d log entries after %d attempts", len(entries), self.sync_attempts)
+
+    async def flush(self) -> bool:
+        """Write everything pending. Returns False if a transient failure requeued entries."""
+        with self.lock:
+            entries, self.pending = self.pending, []
+        if not entries:
+            return True
+        unwritten = await asyncio.to_thread(self._write, entries)
+        if not unwritten:
+            self.backoff = 0.0
+            return True
+        with self.lock:
+            # Back in front of anything submitted meanwhile, so order is kept
+            self.pending[:0] = unwritten
+        self.retries += 1
+        self.backoff = min(max(self.backoff * 2, self.flush_interval), self.max_backoff)
+        return False
+
+    async def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop buffering and flush everything still pending"""
+        with self.lock:
+            self._loop = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self.lock:
+            entries, self.pending = self.pending, []
+        if entries:
+            await asyncio.to_thread(self._write_now, entries)
+
+    async def _run(self):
+        while True:
+            if self.backoff:
+                # Full batches do not cut a backoff short
+                await asyncio.sleep(self.backoff)
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Error flushing logs: %r", e)
+
+    def get_metrics(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "retries": self.retries,
+            "backoff_seconds": self.backoff,
+            "sync_writes": self.sync_writes
+        }
+
+log_writer = LogWriter(
+    batch_size=settings.log_writer_batch_size,
+    flush_interval=settings.log_writer_flush_ms / 1000,
+    max_pending=settings.log_writer_max_pending
+)
+
+def create_log(
     db: Session,
     log_type: str,
     message: str,
     user_id: Optional[int] = None,
     incident_id: Optional[int] = None,
     unit_id: Optional[int] = None,
-    details: Optional[Dict[str, Any]] = None
+    details: Optional[Dict[str, Any]] = None,
+    durable: bool = False
 ):
-    """Create a new log entry"""
+    """Create a new log entry.
+
+    Entries go through the buffered log writer and are committed within a
+    flush interval. Entries that must not be lost, such as notes a user
+    just typed, pass ``durable=True`` to be committed in ``db`` before this
+    returns; the Log is then returned and errors reach the caller.
+    """
+    entry = {
+        "type": LogType(log_type),
+        "message": message,
+        "user_id": user_id,
+        "incident_id": incident_id,
+        "unit_id": unit_id,
+        "details": details,
+        # Stamped now so entries keep event order however they are batched
+        "timestamp": datetime.utcnow()
+    }
+    if not durable:
+        log_writer.submit(entry)
+        return None
+
     try:
-        log = Log(
-            type=LogType(log_type),
-            message=message,
-            user_id=user_id,
-            incident_id=incident_id,
-            unit_id=unit_id,
-            details=details
-        )
+        log = Log(**entry)
         db.add(log)
         db.commit()
         db.refresh(log)
         return log
     except Exception as e:
         db.rollback()
-        raise e 
\ No newline at end of file
+        raise e
@@ -0,0 +1,406 @@
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from app.core.database import SessionLocal
+from app.models.dispatch import Dispatch
+from app.models.incident import Incident, IncidentPriority, IncidentStatus
+from app.models.rollup import IncidentRollup, ResponseTimeRollup, RollupWatermark
+from app.services.analytics import INTERVALS, PERCENTILES, epoch_seconds
+from app.services.jobs import single_runner
+
+BUCKET = timedelta(hours=1)
+BUCKET_SECONDS = 3600
+
+# Upper bin edges in seconds of the response-time histograms; the last bin is open-ended
+HISTOGRAM_EDGES = (15, 30, 45, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 3600)
+
+WATERMARK = "hourly_rollups"
+COMPACTION_LOCK = "rollup-compaction"
+# Changes are re-read from a little before the watermark so commits in flight are not missed
+OVERLAP = timedelta(minutes=1)
+
+# Response-time groupings the rollups can answer; per-unit stats need raw dispatches
+ROLLUP_GROUP_BY = (None, "priority", "type", "hour", "day")
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def is_hour_aligned(value: Optional[datetime]) -> bool:
+    return value is None or value == floor_hour(value)
+
+def _buckets(epochs: np.ndarray) -> List[datetime]:
+    return [
+        datetime.fromtimestamp(epoch - epoch % BUCKET_SECONDS, timezone.utc).replace(tzinfo=None)
+        for epoch in epochs
+    ]
+
+def _in_range(query, column, start: Optional[datetime], end: Optional[datetime]):
+    if start:
+        query = query.where(column >= start)
+    if end:
+        query = query.where(column < end)
+    return query
+
+def aggregate_incidents(db: Session, start: Optional[datetime], end: Optional[datetime]) -> Dict[Tuple, List]:
+    """Incident, arrival and dispatch totals from raw rows, keyed like IncidentRollup"""
+    dialect = db.get_bind().dialect.name
+    first_on_scene = (
+        select(func.min(epoch_seconds(Dispatch.on_scene_time, dialect)))
+        .where(Dispatch.incident_id == Incident.id)
+        .scalar_subquery()
+    )
+    dispatches = select(func.count(Dispatch.id)).where(Dispatch.incident_id == Incident.id).scalar_subquery()
+    query = select(
+        epoch_seconds(Incident.created_at, dialect),
+        Incident.type,
+        Incident.priority,
+        Incident.status,
+        first_on_scene,
+        dispatches
+    ).where(Incident.created_at.isnot(None))
+    rows = db.execute(_in_range(query, Incident.created_at, start, end)).all()
+
+    totals: Dict[Tuple, List] = defaultdict(lambda: [0, 0, 0.0, 0])
+    buckets = _buckets(np.asarray([row[0] for row in rows], dtype=float))
+    for bucket, (created, incident_type, priority, status, on_scene, dispatch_count) in zip(buckets, rows):
+        entry = totals[(bucket, incident_type, priority, status)]
+        entry[0] += 1
+        if on_scene is not None and on_scene >= created:
+            entry[1] += 1
+            entry[2] += on_scene - created
+        entry[3] += dispatch_count
+    return totals
+
+def aggregate_response_times(db: Session, start: Optional[datetime], end: Optional[datetime]) -> Dict[Tuple, List]:
+    """Response interval histograms from raw dispatches, keyed like ResponseTimeRollup"""
+    dialect = db.get_bind().dialect.name
+    query = (
+        select(
+            epoch_seconds(Incident.created_at, dialect),
+            epoch_seconds(Dispatch.dispatch_time, dialect),
+            epoch_seconds(Dispatch.en_route_time, dialect),
+            epoch_seconds(Dispatch.on_scene_time, dialect),
+            Incident.priority,
+            Incident.type
+        )
+        .select_from(Dispatch)
+        .join(Incident, Dispatch.incident_id == Incident.id)
+        .where(Incident.created_at.isnot(None))
+    )
+    rows = db.execute(_in_range(query, Incident.created_at, start, end)).all()
+    if not rows:
+        return {}
+
+    columns = list(zip(*rows))
+    times = {
+        name: np.asarray(columns[i], dtype=float)
+        for i, name in enumerate(("created", "dispatched", "en_route", "on_scene"))
+    }
+    buckets = _buckets(times["created"])
+    keys = [(bucket, priority, incident_type) for bucket, priority, incident_type in zip(buckets, columns[4], columns[5])]
+    positions = {key: i for i, key in enumerate(dict.fromkeys(keys))}
+    unique_keys = list(positions)
+    group = np.asarray([positions[key] for key in keys])
+
+    bins = len(HISTOGRAM_EDGES) + 1
+    totals: Dict[Tuple, List] = {}
+    for name, start_column, end_column in INTERVALS:
+        values = times[end_column] - times[start_column]
+        valid = ~np.isnan(values) & (values >= 0)
+        # One bincount per interval builds every group's histogram at once
+        bin_index = np.searchsorted(HISTOGRAM_EDGES, values[valid], side="right")
+        histograms = np.bincount(
+            group[valid] * bins + bin_index, minlength=len(unique_keys) * bins
+        ).reshape(len(unique_keys), bins)
+        sums = np.bincount(group[valid], weights=values[valid], minlength=len(unique_keys))
+        maxima = np.zeros(len(unique_keys))
+        np.maximum.at(maxima, group[valid], values[valid])
+        for i, key in enumerate(unique_keys):
+            count = int(histograms[i].sum())
+            if count:
+                totals[key + (name,)] = [count, float(sums[i]), histograms[i].tolist(), float(maxima[i])]
+    return totals
+
+def _changed_hours(db: Session, since: datetime) -> List[datetime]:
+    """Call hours of incidents that changed, or had a dispatch change, since ``since``"""
+    incidents = db.execute(select(Incident.created_at).where(Incident.updated_at >= since)).scalars().all()
+    dispatched = db.execute(
+        select(Incident.created_at)
+        .join(Dispatch, Dispatch.incident_id == Incident.id)
+        .where(or_(
+            Dispatch.dispatch_time >= since,
+            Dispatch.en_route_time >= since,
+            Dispatch.on_scene_time >= since,
+            Dispatch.cleared_time >= since
+        ))
+    ).scalars().all()
+    return sorted({floor_hour(created) for created in list(incidents) + list(dispatched) if created})
+
+def _contiguous_ranges(hours: List[datetime]) -> List[Tuple[datetime, datetime]]:
+    ranges: List[Tuple[datetime, datetime]] = []
+    for hour in hours:
+        if ranges and ranges[-1][1] == hour:
+            ranges[-1] = (ranges[-1][0], hour + BUCKET)
+        else:
+            ranges.append((hour, hour + BUCKET))
+    return ranges
+
+def _replace_range(db: Session, start: datetime, end: datetime):
+    for model in (IncidentRollup, ResponseTimeRollup):
+        db.execute(delete(model).where(model.bucket >= start, model.bucket < end))
+
+    incident_rows = [
+        {"bucket": bucket, "type": incident_type, "priority": priority, "status": status,
+         "count": count, "responded": responded, "response_seconds": response_seconds, "dispatches": dispatches}
+        for (bucket, incident_type, priority, status), (count, responded, response_seconds, dispatches)
+        in aggregate_incidents(db, start, end).items()
+    ]
+    response_rows = [
+        {"bucket": bucket, "priority": priority, "type": incident_type, "interval": interval,
+         "count": count, "total_seconds": total_seconds, "histogram": histogram, "max_seconds": max_seconds}
+        for (bucket, priority, incident_type, interval), (count, total_seconds, histogram, max_seconds)
+        in aggregate_response_times(db, start, end).items()
+    ]
+    if incident_rows:
+        db.execute(insert(IncidentRollup), incident_rows)
+    if response_rows:
+        db.execute(insert(ResponseTimeRollup), response_rows)
+
+def compact_rollups(db: Session) -> int:
+    """Bring the hourly rollups up to date and advance the watermark.
+
+    The first run backfills all history; later runs rebuild only the call
+    hours of incidents and dispatches that changed since the watermark.
+    Returns the number of hour ranges rebuilt.
+    """
+    started = datetime.utcnow()
+    watermark = db.get(RollupWatermark, WATERMARK)
+
+    if watermark is None:
+        first = db.execute(select(func.min(Incident.created_at))).scalar()
+        ranges = [(floor_hour(first), floor_hour(started) + BUCKET)] if first else []
+        watermark = RollupWatermark(name=WATERMARK, value=started)
+        db.add(watermark)
+    else:
+        ranges = _contiguous_ranges(_changed_hours(db, watermark.value - OVERLAP))
+
+    for start, end in ranges:
+        _replace_range(db, start, end)
+
+    watermark.value = started
+    db.commit()
+    return len(ranges)
+
+def rollup_coverage(db: Session) -> Optional[datetime]:
+    """Rollup buckets before this hour are complete as of the last compaction"""
+    watermark = db.get(RollupWatermark, WATERMARK)
+    return floor_hour(watermark.value) if watermark else None
+
+def _split_range(db: Session, start: Optional[datetime], end: Optional[datetime]):
+    """Split [start, end) into a rollup part and a raw tail, or None if rollups cannot serve it"""
+    if not (is_hour_aligned(start) and is_hour_aligned(end)):
+        return None
+    covered = rollup_coverage(db)
+    if covered is None:
+        return None
+    rollup_end = min(end, covered) if end else covered
+    tail_start = max(start, covered) if start else covered
+    tail = (tail_start, end) if end is None or end > tail_start else None
+    return rollup_end, tail
+
+def incident_totals(
+    db: Session,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    priority: Optional[IncidentPriority] = None
+) -> Optional[Dict[str, Any]]:
+    """Incident report numbers from rollups plus a raw tail, or None to fall back to raw queries"""
+    split = _split_range(db, start, end)
+    if split is None:
+        return None
+    rollup_end, tail = split
+
+    query = select(
+        func.coalesce(func.sum(IncidentRollup.count), 0),
+        func.coalesce(func.sum(IncidentRollup.count).filter(IncidentRollup.status == IncidentStatus.resolved), 0),
+        func.coalesce(func.sum(IncidentRollup.responded), 0),
+        func.coalesce(func.sum(IncidentRollup.response_seconds), 0.0)
+    ).where(IncidentRollup.bucket < rollup_end)
+    if start:
+        query = query.where(IncidentRollup.bucket >= start)
+    if priority:
+        query = query.where(IncidentRollup.priority == priority)
+    total, resolved, responded, response_seconds = db.execute(query).one()
+
+    if tail:
+        for (_, _, row_priority, status), (count, row_responded, row_seconds, _) in aggregate_incidents(db, *tail).items():
+            if priority and row_priority != priority:
+                continue
+            total += count
+            resolved += count if status == IncidentStatus.resolved else 0
+            responded += row_responded
+            response_seconds += row_seconds
+
+    return {
+        "total": total,
+        "resolved": resolved,
+        "avg_response_time": round(response_seconds / responded, 1) if responded else None
+    }
+
+def histogram_stats(count: int, total: float, histogram: List[int], maximum: float) -> Dict[str, Any]:
+    """Exact mean and histogram-interpolated percentiles, in the shape of analytics.interval_stats.
+
+    Within a bin values are taken as evenly spread; the largest value seen
+    caps the bin it falls in, which also closes the open-ended top bin.
+    """
+    if not count:
+        return {"count": 0, "mean": None, **{f"p{pct}": None for pct in PERCENTILES}}
+
+    def percentile(pct: float) -> float:
+        target = pct / 100 * count
+        cumulative = 0
+        for i, n in enumerate(histogram):
+            if n and cumulative + n >= target:
+                lower = HISTOGRAM_EDGES[i - 1] if i else 0
+                upper = min(HISTOGRAM_EDGES[i], maximum) if i < len(HISTOGRAM_EDGES) else maximum
+                return lower + (upper - lower) * (target - cumulative) / n
+            cumulative += n
+        return float(maximum)
+
+    return {
+        "count": count,
+        "mean": round(total / count, 1),
+        **{f"p{pct}": round(percentile(pct), 1) for pct in PERCENTILES}
+    }
+
+def _group_key(group_by: Optional[str], bucket: datetime, priority, incident_type):
+    if group_by == "priority":
+        return priority.value
+    if group_by == "type":
+        return incident_type.value
+    if group_by == "hour":
+        return bucket.hour
+    if group_by == "day":
+        return bucket.date().isoformat()
+    return None
+
+def response_time_totals(
+    db: Session,
+    group_by: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    priority: Optional[IncidentPriority] = None
+) -> Optional[Dict[str, Any]]:
+    """Response-time report from histogram rollups plus a raw tail, or None to fall back to raw"""
+    if group_by not in ROLLUP_GROUP_BY:
+        return None
+    split = _split_range(db, start, end)
+    if split is None:
+        return None
+    rollup_end, tail = split
+
+    query = select(
+        ResponseTimeRollup.bucket,
+        ResponseTimeRollup.priority,
+        ResponseTimeRollup.type,
+        ResponseTimeRollup.interval,
+        ResponseTimeRollup.count,
+        ResponseTimeRollup.total_seconds,
+        ResponseTimeRollup.histogram,
+        ResponseTimeRollup.max_seconds
+    ).where(ResponseTimeRollup.bucket < rollup_end)
+    # Dispatch rows, valid intervals or not, like the raw report counts them
+    dispatch_query = select(
+        IncidentRollup.bucket,
+        IncidentRollup.priority,
+        IncidentRollup.type,
+        func.sum(IncidentRollup.dispatches)
+    ).where(IncidentRollup.bucket < rollup_end).group_by(IncidentRollup.bucket, IncidentRollup.priority, IncidentRollup.type)
+    if start:
+        query = query.where(ResponseTimeRollup.bucket >= start)
+        dispatch_query = dispatch_query.where(IncidentRollup.bucket >= start)
+    if priority:
+        query = query.where(ResponseTimeRollup.priority == priority)
+        dispatch_query = dispatch_query.where(IncidentRollup.priority == priority)
+    rows = [(row[:4], row[4:]) for row in db.execute(query).all()]
+    dispatch_rows = [(row[:3], row[3]) for row in db.execute(dispatch_query).all()]
+    if tail:
+        rows.extend(
+            (key, value) for key, value in aggregate_response_times(db, *tail).items()
+            if not priority or key[1] == priority
+        )
+        dispatch_rows.extend(
+            ((bucket, row_priority, incident_type), value[3])
+            for (bucket, incident_type, row_priority, _), value in aggregate_incidents(db, *tail).items()
+            if not priority or row_priority == priority
+        )
+
+    bins = len(HISTOGRAM_EDGES) + 1
+    # Group key -> interval -> [count, total seconds, histogram, max seconds]
+    merged: Dict[Any, Dict[str, List]] = defaultdict(
+        lambda: {name: [0, 0.0, np.zeros(bins, dtype=np.int64), 0.0] for name, _, _ in INTERVALS}
+    )
+    for (bucket, row_priority, incident_type, interval), (count, total_seconds, histogram, max_seconds) in rows:
+        entry = merged[_group_key(group_by, bucket, row_priority, incident_type)][interval]
+        entry[0] += count
+        entry[1] += total_seconds
+        entry[2] += np.asarray(histogram, dtype=np.int64)
+        entry[3] = max(entry[3], max_seconds)
+
+    dispatches: Dict[Any, int] = defaultdict(int)
+    for (bucket, row_priority, incident_type), count in dispatch_rows:
+        if count:
+            dispatches[_group_key(group_by, bucket, row_priority, incident_type)] += count
+
+    def stats(intervals: Dict[str, List]) -> Dict[str, Any]:
+        return {
+            name: histogram_stats(count, total, histogram.tolist(), maximum)
+            for name, (count, total, histogram, maximum) in intervals.items()
+        }
+
+    if group_by is None:
+        overall = merged[None]
+    else:
+        overall = {name: [0, 0.0, np.zeros(bins, dtype=np.int64), 0.0] for name, _, _ in INTERVALS}
+        for intervals in merged.values():
+            for name, (count, total, histogram, maximum) in intervals.items():
+                overall[name][0] += count
+                overall[name][1] += total
+                overall[name][2] += histogram
+                overall[name][3] = max(overall[name][3], maximum)
+
+    report = {
+        "source": "rollup",
+        "dispatches": sum(dispatches.values()),
+        "overall": stats(overall),
+    }
+    if group_by is not None:
+        report["group_by"] = group_by
+        report["groups"] = [
+            {"key": key, "dispatches": dispatches[key], **stats(merged[key])}
+            for key in sorted(set(merged) | set(dispatches))
+        ]
+    return report
+
+def run_compaction(session_factory: Callable[[], Session] = SessionLocal) -> Optional[int]:
+    """Compact the rollups in a session of its own, for the background job.
+
+    Only one worker compacts at a time: concurrent runs would rebuild the
+    same buckets twice and race to create the watermark. Returns None when
+    another worker holds the lock.
+    """
+    db = session_factory()
+    try:
+        with single_runner(db.get_bind(), COMPACTION_LOCK) as acquired:
+            if not acquired:
+                return None
+            return compact_rollups(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,314 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+class EventBus:
+    """Carries published events to the ConnectionManager of every worker.
+
+    ``publish`` hands an event to the bus; the bus then calls the handler in
+    each worker process (including the publishing one) exactly once.
+    """
+
+    name = "base"
+
+    def __init__(self, handler: EventHandler):
+        self.handler = handler
+        self.published = 0
+        self.received = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, event: dict):
+        raise NotImplementedError
+
+    async def _deliver(self, event: dict):
+        self.received += 1
+        try:
+            await self.handler(event)
+        except Exception as e:
+            logger.exception("Error delivering event from %s bus: %r", self.name, e)
+
+    def get_metrics(self) -> dict:
+        return {"backend": self.name, "published": self.published, "received": self.received}
+
+class InProcessBus(EventBus):
+    """Single-process bus: events go straight to the local handler"""
+
+    name = "memory"
+
+    async def publish(self, event: dict):
+        self.published += 1
+        await self._deliver(event)
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, bus: "UnixSocketBus"):
+        self.bus = bus
+
+    def datagram_received(self, data, addr):
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        self.bus._spawn(self.bus._deliver(event))
+
+    def error_received(self, exc):
+        logger.warning("Unix socket bus error: %r", exc)
+
+class UnixSocketBus(EventBus):
+    """Bus for workers on one host.
+
+    Each worker binds a datagram socket in a shared directory; publishing
+    delivers locally and sends one datagram to every other worker's socket.
+    Sends go through a plain non-blocking socket rather than the transport,
+    which would report failures to ``error_received`` without the peer, so
+    sockets left behind by dead workers are removed on the first failed send.
+    """
+
+    name = "unix"
+
+    def __init__(self, handler: EventHandler, socket_dir: str):
+        super().__init__(handler)
+        self.socket_dir = Path(socket_dir)
+        self.path = self.socket_dir / f"worker-{os.getpid()}.sock"
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.sender: Optional[socket.socket] = None
+        self._tasks = set()
+        self.dropped = 0
+        self.peers_removed = 0
+        self.send_errors = 0
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def start(self):
+        self.socket_dir.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self),
+            local_addr=str(self.path),
+            family=socket.AF_UNIX
+        )
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.setblocking(False)
+
+    async def stop(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        if self.sender:
+            self.sender.close()
+            self.sender = None
+        if self.path.exists():
+            self.path.unlink()
+
+    async def publish(self, event: dict):
+        self.published += 1
+        if self.sender:
+            data = json.dumps(event).encode()
+            for peer in self.socket_dir.glob("worker-*.sock"):
+                if peer == self.path:
+                    continue
+                try:
+                    self.sender.sendto(data, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # No worker bound to it any more
+                    peer.unlink(missing_ok=True)
+                    self.peers_removed += 1
+                except BlockingIOError:
+                    # The peer's receive buffer is full; it is behind, not dead
+                    self.dropped += 1
+                except OSError as e:
+                    # e.g. EMSGSIZE for an event larger than a datagram; this
+                    # worker's own clients still get it below
+                    logger.warning("Sending %s event to %s failed: %r", event.get("type"), peer.name, e)
+                    self.send_errors += 1
+        await self._deliver(event)
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics.update({"dropped": self.dropped, "peers_removed": self.peers_removed, "send_errors": self.send_errors})
+        return metrics
+
+class PostgresNotifyBus(EventBus):
+    """Bus across hosts using PostgreSQL LISTEN/NOTIFY (requires asyncpg).
+
+    Every worker, including the publisher, LISTENs on the channel, so events
+    are delivered locally through the notification like everywhere else.
+    NOTIFY payloads are limited to 8000 bytes; larger events are split into
+    chunks sent in one transaction, which PostgreSQL delivers together and
+    in order, and reassembled by each listener.
+
+    If the LISTEN connection drops it is re-established with backoff;
+    events published while it is down are not seen by this worker.
+    """
+
+    name = "postgres"
+    max_payload = 7999
+    # Chunks are "#<message id>:<index>:<count>:<data>"
+    chunk_prefix = "#"
+    chunk_size = max_payload - 64
+    # Partial messages older than this are discarded
+    chunk_timeout = 30.0
+    reconnect_delay = 1.0
+    max_reconnect_delay = 30.0
+
+    def __init__(self, handler: EventHandler, dsn: str, channel: str):
+        super().__init__(handler)
+        self.dsn = dsn
+        self.channel = channel
+        self.listen_conn = None
+        self.notify_conn = None
+        self._tasks = set()
+        self._supervisor: Optional[asyncio.Task] = None
+        # message id -> (first seen, chunks by index)
+        self._partial: Dict[str, tuple] = {}
+        self.chunked = 0
+        self.reconnects = 0
+
+    async def _connect(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _listen(self) -> asyncio.Event:
+        """Open the LISTEN connection; the returned event is set when it is lost"""
+        conn = await self._connect()
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _: lost.set())
+        await conn.add_listener(self.channel, self._on_notify)
+        self.listen_conn = conn
+        return lost
+
+    async def _supervise(self, lost: asyncio.Event):
+        while True:
+            await lost.wait()
+            self.listen_conn = None
+            logger.warning("Lost the LISTEN connection on %s, reconnecting", self.channel)
+            delay = self.reconnect_delay
+            while True:
+                try:
+                    lost = await self._listen()
+                    break
+                except Exception as e:
+                    logger.warning("Reconnecting LISTEN on %s failed: %r; retrying in %.0fs", self.channel, e, delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    async def start(self):
+        lost = await self._listen()
+        self.notify_conn = await self._connect()
+        self._supervisor = asyncio.create_task(self._supervise(lost))
+
+    async def stop(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        for conn in (self.listen_conn, self.notify_conn):
+            if conn is not None:
+                await conn.close()
+        self.listen_conn = self.notify_conn = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        if payload.startswith(self.chunk_prefix):
+            event = self._reassemble(payload)
+            if event is None:
+                return
+        else:
+            event = json.loads(payload)
+        task = asyncio.create_task(self._deliver(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _reassemble(self, payload: str) -> Optional[dict]:
+        """Collect one chunk; returns the event once all of its chunks have arrived"""
+        message_id, index, count, data = payload[len(self.chunk_prefix):].split(":", 3)
+        now = time.monotonic()
+        for stale in [key for key, (seen, _) in self._partial.items() if now - seen > self.chunk_timeout]:
+            logger.warning("Discarding incomplete chunked event %s", stale)
+            del self._partial[stale]
+
+        _, chunks = self._partial.setdefault(message_id, (now, {}))
+        chunks[int(index)] = data
+        if len(chunks) < int(count):
+            return None
+        del self._partial[message_id]
+        return json.loads("".join(chunks[i] for i in range(int(count))))
+
+    def _chunks(self, payload: str) -> List[str]:
+        message_id = uuid.uuid4().hex
+        parts = [payload[i:i + self.chunk_size] for i in range(0, len(payload), self.chunk_size)]
+        return [f"{self.chunk_prefix}{message_id}:{i}:{len(parts)}:{part}" for i, part in enumerate(parts)]
+
+    async def _notify(self, payloads: List[str]):
+        # One retry on a fresh connection if the notify connection has dropped
+        for attempt in range(2):
+            try:
+                if self.notify_conn is None or self.notify_conn.is_closed():
+                    self.notify_conn = await self._connect()
+                async with self.notify_conn.transaction():
+                    for payload in payloads:
+                        await self.notify_conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+                return
+            except Exception:
+                if attempt:
+                    raise
+                self.notify_conn = None
+
+    async def publish(self, event: dict):
+        self.published += 1
+        # ASCII-only JSON, so characters and bytes line up when chunking
+        payload = json.dumps(event)
+        payloads = [payload]
+        if len(payload) > self.max_payload:
+            payloads = self._chunks(payload)
+            self.chunked += 1
+        try:
+            await self._notify(payloads)
+        except Exception as e:
+            logger.error("Publishing %s event on %s failed, delivering locally only: %r", event.get("type"), self.channel, e)
+            await self._deliver(event)
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics.update({
+            "chunked": self.chunked,
+            "partial": len(self._partial),
+            "reconnects": self.reconnects,
+            "listening": self.listen_conn is not None
+        })
+        return metrics
+
+def create_event_bus(backend: str, handler: EventHandler, settings) -> EventBus:
+    """Build the event bus configured by ``event_bus_backend``"""
+    if backend == "memory":
+        return InProcessBus(handler)
+    if backend == "unix":
+        return UnixSocketBus(handler, settings.event_bus_socket_dir)
+    if backend == "postgres":
+        # asyncpg takes a plain libpq-style URL without the SQLAlchemy driver suffix
+        scheme, sep, rest = settings.DATABASE_URL.partition("://")
+        return PostgresNotifyBus(handler, f"{scheme.split('+')[0]}{sep}{rest}", settings.event_bus_channel)
+    raise ValueError(f"Unknown event bus backend '{backend}'")
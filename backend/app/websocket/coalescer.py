@@ -0,0 +1,68 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PositionCoalescer:
+    """Keeps only the latest position per unit and flushes them once per tick.
+
+    Outbound position traffic then scales with the tick rate rather than
+    with fleet size times GPS report rate.
+    """
+
+    def __init__(self, tick: float, flush: Callable[[List[dict]], Awaitable[None]]):
+        self.tick = tick
+        self.flush = flush
+        self.pending: Dict[int, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.received = 0
+        self.flushed = 0
+        self.batches = 0
+
+    def update(self, position: dict):
+        """Record a unit position, replacing any not yet flushed for the same unit"""
+        self.received += 1
+        self.pending[position["id"]] = position
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush_pending()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self._flush_pending()
+            except Exception as e:
+                logger.exception("Error flushing unit positions: %r", e)
+
+    async def _flush_pending(self):
+        if not self.pending:
+            return
+        batch = list(self.pending.values())
+        self.pending = {}
+        self.flushed += len(batch)
+        self.batches += 1
+        await self.flush(batch)
+
+    def get_metrics(self) -> dict:
+        return {
+            "tick_ms": int(self.tick * 1000),
+            "pending": len(self.pending),
+            "positions_received": self.received,
+            "positions_flushed": self.flushed,
+            "batches": self.batches
+        }
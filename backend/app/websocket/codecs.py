@@ -0,0 +1,81 @@
+from typing import Dict, Union
+from datetime import datetime, timezone
+import json
+import msgpack
+
+Payload = Union[str, bytes]
+
+# Positional layout of rows in a compact unit_positions frame
+POSITION_FIELDS = ("id", "latitude", "longitude", "status", "incident_id", "timestamp")
+
+def _epoch_ms(value):
+    """ISO timestamps become integer epoch milliseconds in binary frames"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        # Server timestamps are naive UTC (datetime.utcnow)
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+class JsonCodec:
+    """Default text framing, used by every client that does not negotiate"""
+
+    name = "json"
+    binary = False
+
+    def encode(self, message: dict) -> Payload:
+        return json.dumps(message)
+
+    def decode(self, data: Payload) -> dict:
+        return json.loads(data)
+
+class MsgpackCodec:
+    """Binary MessagePack framing.
+
+    Timestamps are sent as epoch milliseconds, and unit_positions batches use
+    a positional schema: ``fields`` names the columns once and each position
+    is a plain array in ``rows``.
+    """
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: dict) -> Payload:
+        frame = dict(message)
+        if "timestamp" in frame:
+            frame["timestamp"] = _epoch_ms(frame["timestamp"])
+
+        if frame.get("type") == "unit_positions" and isinstance(frame.get("data"), dict):
+            frame["data"] = {
+                "fields": POSITION_FIELDS,
+                "rows": [
+                    [
+                        _epoch_ms(position.get(field)) if field == "timestamp" else position.get(field)
+                        for field in POSITION_FIELDS
+                    ]
+                    for position in frame["data"]["positions"]
+                ]
+            }
+
+        return msgpack.packb(frame, use_bin_type=True, default=str)
+
+    def decode(self, data: Payload) -> dict:
+        if isinstance(data, str):
+            return json.loads(data)
+        return msgpack.unpackb(data, raw=False)
+
+CODECS: Dict[str, Union[JsonCodec, MsgpackCodec]] = {
+    JsonCodec.name: JsonCodec(),
+    MsgpackCodec.name: MsgpackCodec()
+}
+
+def get_codec(name: str):
+    """Look up a frame codec by the name a client negotiated"""
+    codec = CODECS.get(name or JsonCodec.name)
+    if codec is None:
+        raise ValueError(f"Unsupported encoding '{name}', expected one of {', '.join(CODECS)}")
+    return codec
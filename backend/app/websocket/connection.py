@@ -0,0 +1,145 @@
+from fastapi import WebSocket
+from typing import Callable, Deque, Dict, Hashable, List, Optional
+from collections import deque
+import asyncio
+import enum
+
+from app.websocket.codecs import Payload, get_codec
+
+class OverflowPolicy(str, enum.Enum):
+    """What to do when a connection's outbound queue is full"""
+    drop_oldest = "drop_oldest"
+    coalesce = "coalesce"
+    disconnect = "disconnect"
+
+class ClientConnection:
+    """A WebSocket with its own bounded outbound queue and writer task.
+
+    Broadcasters only ever enqueue, so a slow consumer never blocks them;
+    the writer task drains the queue at whatever pace the socket allows.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int,
+        policy: OverflowPolicy,
+        send_timeout: float,
+        on_failure: Callable[["ClientConnection", str], None],
+        codec=None,
+        role: str = ""
+    ):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        # Frame encoding negotiated at connect time
+        self.codec = codec or get_codec("json")
+        self.role = role
+
+        # Each entry is a mutable [key, payload] pair. Coalescing blanks the
+        # superseded entry's payload and queues the newer one at the tail,
+        # so frames still leave in the order they were sequenced
+        self.queue: Deque[List] = deque()
+        self.pending_keys: Dict[Hashable, List] = {}
+        self.stale = 0  # blanked entries still in the queue
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Metrics
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue) - self.stale
+
+    def start(self):
+        self._writer = asyncio.create_task(self._drain())
+
+    def enqueue(self, payload: Payload, key: Optional[Hashable] = None) -> bool:
+        """Queue a payload for sending. Returns False if the connection must be evicted."""
+        if self.closed:
+            return False
+
+        if key is not None and self.policy == OverflowPolicy.coalesce:
+            entry = self.pending_keys.pop(key, None)
+            if entry is not None:
+                entry[1] = None
+                self.stale += 1
+                self.coalesced += 1
+                if self.stale > self.max_queue:
+                    self._purge_stale()
+
+        if self.depth >= self.max_queue:
+            if self.policy == OverflowPolicy.disconnect:
+                return False
+            self._pop_oldest()
+            self.dropped += 1
+
+        entry = [key, payload]
+        self.queue.append(entry)
+        if key is not None and self.policy == OverflowPolicy.coalesce:
+            self.pending_keys[key] = entry
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self._ready.set()
+        return True
+
+    def _pop_oldest(self) -> Optional[List]:
+        """Remove and return the oldest live entry, discarding blanked ones before it"""
+        while self.queue:
+            entry = self.queue.popleft()
+            if entry[1] is None:
+                self.stale -= 1
+                continue
+            if entry[0] is not None:
+                self.pending_keys.pop(entry[0], None)
+            return entry
+        return None
+
+    def _purge_stale(self):
+        # Bounds the queue while a stalled consumer keeps getting coalesced updates
+        self.queue = deque(entry for entry in self.queue if entry[1] is not None)
+        self.stale = 0
+
+    async def _drain(self):
+        while not self.closed:
+            entry = self._pop_oldest()
+            if entry is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            payload = entry[1]
+
+            try:
+                if isinstance(payload, bytes):
+                    send = self.websocket.send_bytes(payload)
+                else:
+                    send = self.websocket.send_text(payload)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.on_failure(self, repr(e))
+                return
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        """Stop the writer and close the underlying socket"""
+        self.stop()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.closed = True
+        self.queue.clear()
+        self.pending_keys.clear()
+        self.stale = 0
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
@@ -0,0 +1,86 @@
+from fastapi import WebSocket
+from typing import Dict, Optional, Sequence, Set, Tuple
+from collections import defaultdict
+import math
+
+# (south, west, north, east) in decimal degrees
+BoundingBox = Tuple[float, float, float, float]
+
+def parse_bbox(bbox: Sequence) -> BoundingBox:
+    """Validate a [south, west, north, east] viewport"""
+    try:
+        south, west, north, east = (float(v) for v in bbox)
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be [south, west, north, east]")
+    if not (-90 <= south <= north <= 90) or not (-180 <= west <= east <= 180):
+        raise ValueError("bbox must satisfy south <= north and west <= east within valid coordinates")
+    return south, west, north, east
+
+def event_point(data: dict) -> Optional[Tuple[float, float]]:
+    """Location of an event payload, if it carries one"""
+    if not isinstance(data, dict):
+        return None
+    for lat_field, lng_field in (("latitude", "longitude"), ("current_latitude", "current_longitude")):
+        lat, lng = data.get(lat_field), data.get(lng_field)
+        if lat is not None and lng is not None:
+            return float(lat), float(lng)
+    return None
+
+class ViewportIndex:
+    """Uniform grid index of subscriber viewports.
+
+    Each viewport is registered in every grid cell it overlaps, so finding the
+    viewports that contain a point only inspects the subscribers of one cell.
+    Viewports spanning more than ``max_cells`` cells (e.g. a whole-region view)
+    are kept in a small overflow set that is checked for every point instead.
+    """
+
+    def __init__(self, cell_size: float = 0.05, max_cells: int = 4096):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells: Dict[Tuple[int, int], Set[WebSocket]] = defaultdict(set)
+        self.oversized: Set[WebSocket] = set()
+        self.viewports: Dict[WebSocket, BoundingBox] = {}
+        self._cells_by_connection: Dict[WebSocket, list] = {}
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lng / self.cell_size)
+
+    def set_viewport(self, websocket: WebSocket, bbox: BoundingBox):
+        self.clear(websocket)
+        south, west, north, east = bbox
+        row_min, col_min = self._cell(south, west)
+        row_max, col_max = self._cell(north, east)
+
+        self.viewports[websocket] = bbox
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > self.max_cells:
+            self.oversized.add(websocket)
+            return
+
+        keys = [(row, col) for row in range(row_min, row_max + 1) for col in range(col_min, col_max + 1)]
+        for key in keys:
+            self.cells[key].add(websocket)
+        self._cells_by_connection[websocket] = keys
+
+    def clear(self, websocket: WebSocket):
+        self.viewports.pop(websocket, None)
+        self.oversized.discard(websocket)
+        for key in self._cells_by_connection.pop(websocket, ()):
+            subscribers = self.cells.get(key)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.cells[key]
+
+    def has_viewport(self, websocket: WebSocket) -> bool:
+        return websocket in self.viewports
+
+    def subscribers_at(self, lat: float, lng: float) -> Set[WebSocket]:
+        """Connections whose viewport contains the point"""
+        candidates = self.cells.get(self._cell(lat, lng), set()) | self.oversized
+        recipients = set()
+        for websocket in candidates:
+            south, west, north, east = self.viewports[websocket]
+            if south <= lat <= north and west <= lng <= east:
+                recipients.add(websocket)
+        return recipients
@@ -0,0 +1,91 @@
+from fastapi import WebSocket
+from typing import Callable, Dict, List, Optional, Set
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class HeartbeatWheel:
+    """Server-driven heartbeats for every connection from a single timer task.
+
+    Connections are hashed into ``slots`` buckets of a timing wheel that
+    advances one slot per tick, so each connection is visited once per
+    ``interval`` without a task or timer of its own. On its visit a
+    connection that has been silent for ``interval`` gets a heartbeat, and
+    one silent for ``timeout`` (dead or half-open) is reaped.
+
+    Heartbeats are application frames, because the ASGI server answers
+    protocol-level pings itself without telling the application. Clients
+    must reply to them, or a listen-only client is reaped after ``timeout``.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        timeout: float,
+        on_ping: Callable[[WebSocket], None],
+        on_reap: Callable[[WebSocket], None],
+        slots: int = 32,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.on_ping = on_ping
+        self.on_reap = on_reap
+        self.clock = clock
+        self.wheel: List[Set[WebSocket]] = [set() for _ in range(slots)]
+        self.slot_of: Dict[WebSocket, int] = {}
+        self.last_seen: Dict[WebSocket, float] = {}
+        self.cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, websocket: WebSocket):
+        # The slot just behind the cursor is next visited a full turn from now
+        slot = (self.cursor - 1) % len(self.wheel)
+        self.wheel[slot].add(websocket)
+        self.slot_of[websocket] = slot
+        self.last_seen[websocket] = self.clock()
+
+    def remove(self, websocket: WebSocket):
+        slot = self.slot_of.pop(websocket, None)
+        if slot is not None:
+            self.wheel[slot].discard(websocket)
+        self.last_seen.pop(websocket, None)
+
+    def touch(self, websocket: WebSocket):
+        """Record activity from the client"""
+        if websocket in self.last_seen:
+            self.last_seen[websocket] = self.clock()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        tick = self.interval / len(self.wheel)
+        while True:
+            await asyncio.sleep(tick)
+            self.cursor = (self.cursor + 1) % len(self.wheel)
+            try:
+                self.check_slot(self.cursor)
+            except Exception as e:
+                logger.exception("Error running heartbeat: %r", e)
+
+    def check_slot(self, slot: int):
+        now = self.clock()
+        for websocket in list(self.wheel[slot]):
+            idle = now - self.last_seen.get(websocket, now)
+            if idle >= self.timeout:
+                self.on_reap(websocket)
+            elif idle >= self.interval:
+                self.on_ping(websocket)
@@ -0,0 +1,140 @@
+from typing import Deque, List, Optional
+from collections import deque
+from pathlib import Path
+import json
+import logging
+import queue
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class EventLog:
+    """Bounded, sequenced history of delivered events for reconnect catch-up.
+
+    Every event gets the next sequence number. Sequence numbers are only
+    meaningful together with the log's ``epoch``: a client resuming against a
+    different epoch (another worker, or a restart without persistence) must
+    reload a full snapshot.
+
+    If ``path`` is set the log is appended to a JSON lines file and the tail
+    is reloaded on startup, so sequence numbers survive a restart. File
+    writes and compactions run on a writer thread that keeps the file open,
+    so ``append`` never blocks the event loop on disk I/O.
+    """
+
+    def __init__(self, capacity: int = 10000, path: Optional[str] = None):
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.events: Deque[dict] = deque(maxlen=capacity)
+        self._lines_written = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def load(self):
+        """Reload the persisted tail of the log, adopting its epoch and sequence.
+
+        Blocking; call it before the first append, off the event loop.
+        """
+        if not self.path or not self.path.exists():
+            return
+        records: Deque[dict] = deque(maxlen=self.capacity)
+        with self.path.open() as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        if records:
+            self.epoch = records[-1]["epoch"]
+            self.seq = records[-1]["seq"]
+            self.events.extend(r["event"] for r in records if r["epoch"] == self.epoch)
+        self._rewrite(self.epoch, list(self.events))
+        self._lines_written = len(self.events)
+
+    def append(self, event: dict) -> int:
+        """Assign the next sequence number to an event and record it"""
+        self.seq += 1
+        event["seq"] = self.seq
+        self.events.append(event)
+        if self.path:
+            self._enqueue(("append", {"epoch": self.epoch, "seq": self.seq, "event": event}))
+            self._lines_written += 1
+            if self._lines_written > 2 * self.capacity:
+                # The snapshot is taken here so it lines up with the queued appends
+                self._enqueue(("compact", self.epoch, list(self.events)))
+                self._lines_written = len(self.events)
+        return self.seq
+
+    def since(self, last_seq: int, epoch: Optional[str] = None) -> Optional[List[dict]]:
+        """Events after ``last_seq``, or None if the client must reload a snapshot"""
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        oldest = self.events[0]["seq"] if self.events else self.seq + 1
+        if last_seq + 1 < oldest:
+            return None
+        return [event for event in self.events if event["seq"] > last_seq]
+
+    def _enqueue(self, item):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(item)
+
+    def _write_loop(self):
+        f = None
+        while True:
+            # Write whatever has queued up, then flush once
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in items:
+                if item is _STOP:
+                    if f:
+                        f.close()
+                    return
+                try:
+                    if item[0] == "append":
+                        if f is None:
+                            self.path.parent.mkdir(parents=True, exist_ok=True)
+                            f = self.path.open("a")
+                        f.write(json.dumps(item[1]) + "\n")
+                    else:
+                        if f:
+                            f.close()
+                            f = None
+                        self._rewrite(item[1], item[2])
+                except Exception as e:
+                    logger.exception("Error persisting the event log to %s: %r", self.path, e)
+            if f:
+                try:
+                    f.flush()
+                except Exception as e:
+                    logger.exception("Error flushing the event log to %s: %r", self.path, e)
+
+    def close(self):
+        """Write out everything queued and stop the writer thread (blocking)"""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def _rewrite(self, epoch: str, events: List[dict]):
+        """Rewrite the persisted file so it only holds the given buffer"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            for event in events:
+                f.write(json.dumps({"epoch": epoch, "seq": event["seq"], "event": event}) + "\n")
+        tmp.replace(self.path)
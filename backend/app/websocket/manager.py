@@ -1,9 +1,23 @@
 from fastapi import WebSocket
-from typing import Dict, List, Set
-import json
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+from collections import defaultdict
 import asyncio
+import logging
 from datetime import datetime
 
+from app.core.config import settings
+from app.websocket.connection import ClientConnection, OverflowPolicy
+from app.websocket.subscriptions import ROLE_TOPIC_KINDS, SubscriptionRegistry, event_topics
+from app.websocket.geo import ViewportIndex, event_point, parse_bbox
+from app.websocket.bus import create_event_bus
+from app.websocket.history import EventLog
+from app.websocket.coalescer import PositionCoalescer
+from app.websocket.codecs import Payload, get_codec
+from app.websocket.heartbeat import HeartbeatWheel
+from app.websocket.metrics import ConnectionMetrics
+
+logger = logging.getLogger(__name__)
+
 class ConnectionManager:
     def __init__(self):
         # Store active connections by user role
@@ -15,8 +29,58 @@ class ConnectionManager:
         }
         # Store user info for each connection
         self.connection_users: Dict[WebSocket, dict] = {}
+        # Topic subscriptions (incident, unit, event type, jurisdiction)
+        self.subscriptions = SubscriptionRegistry()
+        # Connections without topic subscriptions get their role's whole feed:
+        # all of it without a viewport, located events only inside one with it
+        self.role_feeds: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self.viewport_feeds: Dict[str, Set[WebSocket]] = defaultdict(set)
+        # Map viewport subscriptions, indexed by grid cell
+        self.viewports = ViewportIndex(cell_size=settings.websocket_geo_cell_degrees)
+        # Sequenced history of delivered events for reconnect catch-up
+        self.event_log = EventLog(
+            capacity=settings.websocket_event_log_size,
+            path=settings.websocket_event_log_path
+        )
+        # Carries published events to the manager in every worker process
+        self.bus = create_event_bus(settings.event_bus_backend, self.deliver_event, settings)
+        # Server-side consumers of internal bus events, by event type
+        self.internal_handlers: Dict[str, Callable[[dict], Awaitable[None]]] = {}
+        # Batches high-frequency unit positions into one frame per tick
+        self.position_coalescer = PositionCoalescer(
+            tick=settings.websocket_position_tick_ms / 1000,
+            flush=self._publish_positions
+        )
+        # Outbound queue and writer task for each connection
+        self.client_connections: Dict[WebSocket, ClientConnection] = {}
+        
+        self.overflow_policy = OverflowPolicy(settings.websocket_overflow_policy)
+        self.evicted_total = 0
+        # Counters from connections that have since closed
+        self.retired_totals = {"sent": 0, "dropped": 0, "coalesced": 0}
+        self._background_tasks: Set[asyncio.Task] = set()
+        
+        # Lifecycle counters and server-driven heartbeats
+        self.metrics = ConnectionMetrics()
+        self.heartbeat = HeartbeatWheel(
+            interval=settings.websocket_heartbeat_interval,
+            timeout=settings.websocket_idle_timeout,
+            on_ping=self._send_heartbeat,
+            on_reap=self._reap
+        )
     
-    async def connect(self, websocket: WebSocket, user_role: str, user_id: int, username: str):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_role: str,
+        user_id: int,
+        username: str,
+        last_seq: Optional[int] = None,
+        epoch: Optional[str] = None,
+        encoding: str = "json"
+    ):
+        # Raises before accepting if the client asked for an unknown encoding
+        codec = get_codec(encoding)
         await websocket.accept()
         
         # Add to appropriate role group
@@ -31,6 +95,21 @@ class ConnectionManager:
             "connected_at": datetime.utcnow()
         }
         
+        client = ClientConnection(
+            websocket,
+            max_queue=settings.websocket_queue_size,
+            policy=self.overflow_policy,
+            send_timeout=settings.websocket_send_timeout,
+            on_failure=self._on_send_failure,
+            codec=codec,
+            role=user_role
+        )
+        self.client_connections[websocket] = client
+        self._update_feeds(websocket)
+        client.start()
+        self.heartbeat.add(websocket)
+        self.metrics.connects += 1
+        
         # Send welcome message
         await self.send_personal_message(
             {
@@ -40,98 +119,383 @@ class ConnectionManager:
                     "id": user_id,
                     "username": username,
                     "role": user_role
-                }
+                },
+                "epoch": self.event_log.epoch,
+                "seq": self.event_log.seq,
+                "encoding": codec.name
             },
             websocket
         )
+        
+        # Catch up a reconnecting client before any further live events
+        if last_seq is not None:
+            self.resume(websocket, last_seq, epoch)
     
     def disconnect(self, websocket: WebSocket):
         # Remove from role group
         user_info = self.connection_users.get(websocket)
+        if user_info:
+            self.metrics.disconnects += 1
         if user_info and user_info["role"] in self.active_connections:
             self.active_connections[user_info["role"]].discard(websocket)
         
         # Remove user info
         self.connection_users.pop(websocket, None)
+        
+        self.subscriptions.unsubscribe(websocket)
+        self.viewports.clear(websocket)
+        if user_info:
+            self._leave_feeds(websocket, user_info["role"])
+        self.heartbeat.remove(websocket)
+        
+        # Stop the writer task and drop anything still queued
+        client = self.client_connections.pop(websocket, None)
+        if client:
+            client.stop()
+            self.retired_totals["sent"] += client.sent
+            self.retired_totals["dropped"] += client.dropped
+            self.retired_totals["coalesced"] += client.coalesced
+    
+    def _on_send_failure(self, client: ClientConnection, error: str):
+        username = self.connection_users.get(client.websocket, {}).get("username")
+        logger.warning("Error sending to %s: %s", username, error)
+        self.disconnect(client.websocket)
+    
+    def _evict(self, client: ClientConnection):
+        """Disconnect a consumer whose queue overflowed under the disconnect policy"""
+        username = self.connection_users.get(client.websocket, {}).get("username")
+        logger.warning("Evicting slow consumer %s: %d messages queued", username, client.depth)
+        self.evicted_total += 1
+        self.disconnect(client.websocket)
+        # 1013 = try again later
+        self._close_later(client, 1013, "Slow consumer")
+    
+    def _reap(self, websocket: WebSocket):
+        """Drop a connection that has been silent past the idle timeout"""
+        client = self.client_connections.get(websocket)
+        self.metrics.reaps += 1
+        self.disconnect(websocket)
+        if client:
+            # 1001 = going away
+            self._close_later(client, 1001, "Heartbeat timeout")
+    
+    def _close_later(self, client: ClientConnection, code: int, reason: str):
+        task = asyncio.create_task(client.close(code=code, reason=reason))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def _send_heartbeat(self, websocket: WebSocket):
+        self.metrics.heartbeats_sent += 1
+        # Clients answer with a heartbeat_ack frame; see the /ws endpoint
+        self._send(websocket, {"type": "heartbeat", "reply": "heartbeat_ack", "timestamp": datetime.utcnow().isoformat()})
+    
+    def touch(self, websocket: WebSocket):
+        """Record a frame received from the client; any frame counts as a heartbeat reply"""
+        self.heartbeat.touch(websocket)
+        client = self.client_connections.get(websocket)
+        if client:
+            self.metrics.messages_in[client.role].add()
+    
+    def _enqueue(self, client: ClientConnection, payload: Payload, key: Optional[Hashable] = None):
+        if client.enqueue(payload, key):
+            self.metrics.messages_out[client.role].add()
+        else:
+            self._evict(client)
+    
+    def _send(self, websocket: WebSocket, message: dict):
+        """Encode a message in the connection's negotiated codec and queue it"""
+        client = self.client_connections.get(websocket)
+        if client:
+            self._enqueue(client, client.codec.encode(message))
+    
+    @staticmethod
+    def _coalesce_key(message: dict) -> Optional[Hashable]:
+        """Messages about the same entity may replace each other while queued"""
+        data = message.get("data")
+        if isinstance(data, dict) and data.get("id") is not None:
+            return (message.get("type"), data["id"])
+        return None
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            print(f"Error sending personal message: {e}")
-            self.disconnect(websocket)
+        self._send(websocket, message)
+    
+    async def fan_out(self, message: dict, connections: Iterable[WebSocket]):
+        """Encode a message once per negotiated codec and queue it for every connection.
+        
+        Enqueueing never waits on a socket, so one slow consumer cannot hold
+        up delivery to the others; each connection's writer task applies the
+        send timeout and the overflow policy handles consumers that fall behind.
+        """
+        payloads: Dict[str, Payload] = {}
+        key = self._coalesce_key(message)
+        # Snapshot: evicting an overflowing consumer removes it from its role set
+        for connection in list(connections):
+            client = self.client_connections.get(connection)
+            if client is None:
+                continue
+            payload = payloads.get(client.codec.name)
+            if payload is None:
+                payload = payloads[client.codec.name] = client.codec.encode(message)
+            self._enqueue(client, payload, key)
     
     async def broadcast_to_role(self, message: dict, role: str):
         """Send message to all connections of a specific role"""
         if role in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[role]:
-                try:
-                    await connection.send_text(json.dumps(message))
-                except Exception as e:
-                    print(f"Error broadcasting to {role}: {e}")
-                    disconnected.add(connection)
-            
-            # Clean up disconnected connections
-            for connection in disconnected:
-                self.disconnect(connection)
+            await self.fan_out(message, self.active_connections[role])
+    
+    async def broadcast_to_roles(self, message: dict, roles: Iterable[str]):
+        """Send message once to every connection in any of the given roles"""
+        recipients = set()
+        for role in roles:
+            recipients.update(self.active_connections.get(role, ()))
+        await self.fan_out(message, recipients)
     
     async def broadcast_to_all(self, message: dict):
         """Send message to all active connections"""
-        disconnected = set()
-        for role_connections in self.active_connections.values():
-            for connection in role_connections:
-                try:
-                    await connection.send_text(json.dumps(message))
-                except Exception as e:
-                    print(f"Error broadcasting to all: {e}")
-                    disconnected.add(connection)
-        
-        # Clean up disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        await self.broadcast_to_roles(message, self.active_connections.keys())
     
-    async def send_incident_update(self, incident_data: dict, roles: List[str] = None):
-        """Send incident update to relevant roles"""
-        message = {
-            "type": "incident_update",
-            "data": incident_data,
+    async def start(self):
+        """Load the persisted event log and connect to the event bus (called on application startup)"""
+        await asyncio.to_thread(self.event_log.load)
+        await self.bus.start()
+        await self.position_coalescer.start()
+        await self.heartbeat.start()
+    
+    async def stop(self):
+        await self.heartbeat.stop()
+        await self.position_coalescer.stop()
+        await self.bus.stop()
+        await asyncio.to_thread(self.event_log.close)
+    
+    async def publish_event(self, event_type: str, data: dict, roles: List[str] = None):
+        """Publish an event on the bus so every worker delivers it to its own connections"""
+        await self.bus.publish({
+            "type": event_type,
+            "data": data,
+            "roles": roles or ["dispatcher"],
             "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        if roles:
-            for role in roles:
-                await self.broadcast_to_role(message, role)
-        else:
-            await self.broadcast_to_role(message, "dispatcher")
+        })
     
-    async def send_unit_update(self, unit_data: dict, roles: List[str] = None):
-        """Send unit update to relevant roles"""
-        message = {
-            "type": "unit_update",
-            "data": unit_data,
+    def add_internal_handler(self, event_type: str, handler: Callable[[dict], Awaitable[None]]):
+        """Route bus events of ``event_type`` to ``handler`` instead of to clients"""
+        self.internal_handlers[event_type] = handler
+    
+    async def publish_internal(self, event_type: str, data: dict):
+        """Publish a worker-to-worker event that is never delivered to clients"""
+        await self.bus.publish({
+            "type": event_type,
+            "data": data,
+            "roles": [],
             "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    async def deliver_event(self, event: dict):
+        """Deliver a bus event to its subscribers and to unfiltered members of the target roles.
+        
+        Connections that have subscribed to topics only receive events matching
+        those topics, and only if the event targets their role. Connections with a map viewport only receive located
+        events (unit and incident positions) that fall inside the viewport,
+        again only for events targeting their role.
+        Connections without subscriptions keep receiving the role-wide feed.
+        """
+        handler = self.internal_handlers.get(event["type"])
+        if handler is not None:
+            await handler(event)
+            return
+        
+        self.event_log.append(event)
+        if event["type"] == "unit_positions":
+            await self._deliver_positions(event)
+            return
+        
+        event_type, data, roles = event["type"], event["data"], event["roles"]
+        recipients = self._in_roles(self.subscriptions.subscribers_for(event_topics(event_type, data)), roles)
+        point = event_point(data)
+        if point is not None:
+            recipients.update(self._in_roles(self.viewports.subscribers_at(*point), roles))
+        
+        for role in roles:
+            recipients.update(self.role_feeds.get(role, ()))
+            if point is None:
+                recipients.update(self.viewport_feeds.get(role, ()))
+        
+        await self.fan_out(self._event_message(event), recipients)
+    
+    async def _deliver_positions(self, event: dict):
+        """Deliver a coalesced position batch, trimmed to what each connection may see.
+        
+        Role-feed connections without a viewport all share the full batch;
+        every other recipient gets one frame with just its matching positions,
+        encoded once per distinct subset.
+        """
+        positions, roles = event["data"]["positions"], event["roles"]
+        everything: Set[WebSocket] = set()
+        unlocated: Set[WebSocket] = set()
+        for role in roles:
+            everything.update(self.role_feeds.get(role, ()))
+            unlocated.update(self.viewport_feeds.get(role, ()))
+        
+        selected: Dict[WebSocket, List[int]] = defaultdict(list)
+        for index, position in enumerate(positions):
+            targets = self._in_roles(self.subscriptions.subscribers_for(event_topics("unit_positions", position)), roles)
+            point = event_point(position)
+            if point is not None:
+                targets.update(self._in_roles(self.viewports.subscribers_at(*point), roles))
+            else:
+                targets.update(unlocated)
+            for connection in targets - everything:
+                selected[connection].append(index)
+        
+        await self.fan_out(self._event_message(event), everything)
+        
+        groups: Dict[tuple, List[WebSocket]] = defaultdict(list)
+        for connection, indexes in selected.items():
+            groups[tuple(indexes)].append(connection)
+        for indexes, connections in groups.items():
+            subset = [positions[i] for i in indexes]
+            await self.fan_out(self._event_message(event, {"positions": subset}), connections)
+    
+    def _in_roles(self, connections: Set[WebSocket], roles: List[str]) -> Set[WebSocket]:
+        """The subset of matched subscribers whose role the event targets"""
+        return {
+            connection for connection in connections
+            if self.connection_users.get(connection, {}).get("role") in roles
         }
+    
+    def _update_feeds(self, websocket: WebSocket):
+        """Move a connection to the feed set matching its subscriptions and viewport"""
+        role = self.connection_users.get(websocket, {}).get("role")
+        if role is None:
+            return
+        self._leave_feeds(websocket, role)
+        if self.subscriptions.is_filtered(websocket):
+            return
+        feeds = self.viewport_feeds if self.viewports.has_viewport(websocket) else self.role_feeds
+        feeds[role].add(websocket)
+    
+    def _leave_feeds(self, websocket: WebSocket, role: str):
+        for feeds in (self.role_feeds, self.viewport_feeds):
+            members = feeds.get(role)
+            if members is not None:
+                members.discard(websocket)
+                if not members:
+                    del feeds[role]
+    
+    @staticmethod
+    def _event_message(event: dict, data: Optional[dict] = None) -> dict:
+        return {
+            "type": event["type"],
+            "seq": event["seq"],
+            "data": event["data"] if data is None else data,
+            "timestamp": event["timestamp"]
+        }
+    
+    def _accepts(self, websocket: WebSocket, event_type: str, data: dict, roles: List[str]) -> bool:
+        """Whether deliver_event would route this event payload to the connection"""
+        role = self.connection_users.get(websocket, {}).get("role")
+        if role not in roles:
+            return False
+        topics = self.subscriptions.topics_by_connection.get(websocket)
+        if topics and topics & event_topics(event_type, data):
+            return True
         
-        if roles:
-            for role in roles:
-                await self.broadcast_to_role(message, role)
-        else:
-            await self.broadcast_to_role(message, "dispatcher")
+        point = event_point(data)
+        viewport = self.viewports.viewports.get(websocket)
+        if point is not None and viewport is not None:
+            south, west, north, east = viewport
+            if south <= point[0] <= north and west <= point[1] <= east:
+                return True
+        
+        return not topics and not (point is not None and viewport is not None)
+    
+    def _replay_message(self, websocket: WebSocket, event: dict) -> Optional[dict]:
+        """The frame a connection would have received for a logged event, if any"""
+        if event["type"] == "unit_positions":
+            subset = [
+                position for position in event["data"]["positions"]
+                if self._accepts(websocket, "unit_positions", position, event["roles"])
+            ]
+            return self._event_message(event, {"positions": subset}) if subset else None
+        if self._accepts(websocket, event["type"], event["data"], event["roles"]):
+            return self._event_message(event)
+        return None
+    
+    def resume(self, websocket: WebSocket, last_seq: int, epoch: Optional[str] = None):
+        """Replay the events a reconnecting client missed after ``last_seq``.
+        
+        Replayed frames are queued ahead of any later live event. If the
+        client has fallen off the end of the event log (or resumes against a
+        different epoch) it is told to reload a full snapshot instead.
+        Clients should ignore frames whose seq they have already seen.
+        """
+        missed = self.event_log.since(last_seq, epoch)
+        if missed is None:
+            self._send(websocket, {
+                "type": "resync_required",
+                "epoch": self.event_log.epoch,
+                "seq": self.event_log.seq
+            })
+            return
+        
+        for event in missed:
+            message = self._replay_message(websocket, event)
+            if message is not None:
+                self._send(websocket, message)
+        self._send(websocket, {
+            "type": "resumed",
+            "epoch": self.event_log.epoch,
+            "seq": self.event_log.seq
+        })
+    
+    def send_unit_position(self, position: dict):
+        """Queue a unit GPS position for the next coalesced ``unit_positions`` batch.
+        
+        ``position`` must carry the unit ``id``; only the latest position per
+        unit within a tick is broadcast.
+        """
+        self.position_coalescer.update(position)
+    
+    async def _publish_positions(self, positions: List[dict]):
+        await self.publish_event("unit_positions", {"positions": positions})
+    
+    async def send_incident_update(self, incident_data: dict, roles: List[str] = None):
+        """Send incident update to relevant roles and subscribers"""
+        await self.publish_event("incident_update", incident_data, roles)
+    
+    async def send_unit_update(self, unit_data: dict, roles: List[str] = None):
+        """Send unit update to relevant roles and subscribers"""
+        await self.publish_event("unit_update", unit_data, roles)
     
     async def send_dispatch_update(self, dispatch_data: dict, roles: List[str] = None):
-        """Send dispatch update to relevant roles"""
-        message = {
-            "type": "dispatch_update",
-            "data": dispatch_data,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        """Send dispatch update to relevant roles and subscribers"""
+        await self.publish_event("dispatch_update", dispatch_data, roles)
+    
+    def subscribe(self, websocket: WebSocket, channels: List[str]):
+        """Subscribe a connection to topics such as incident:12 or unit:4.
         
-        if roles:
-            for role in roles:
-                await self.broadcast_to_role(message, role)
-        else:
-            await self.broadcast_to_role(message, "dispatcher")
+        Topic kinds the connection's role may not follow are rejected.
+        """
+        role = self.connection_users.get(websocket, {}).get("role")
+        result = self.subscriptions.subscribe(websocket, channels, ROLE_TOPIC_KINDS.get(role, ()))
+        self._update_feeds(websocket)
+        return result
+    
+    def unsubscribe(self, websocket: WebSocket, channels: Optional[List[str]] = None):
+        """Unsubscribe a connection from topics, or from all topics if none are given"""
+        removed = self.subscriptions.unsubscribe(websocket, channels)
+        self._update_feeds(websocket)
+        return removed
+    
+    def set_viewport(self, websocket: WebSocket, bbox: List[float]):
+        """Limit located events for a connection to a [south, west, north, east] viewport"""
+        viewport = parse_bbox(bbox)
+        self.viewports.set_viewport(websocket, viewport)
+        self._update_feeds(websocket)
+        return viewport
+    
+    def clear_viewport(self, websocket: WebSocket):
+        self.viewports.clear(websocket)
+        self._update_feeds(websocket)
     
     def get_connection_count(self) -> Dict[str, int]:
         """Get count of active connections by role"""
@@ -140,6 +504,20 @@ class ConnectionManager:
             for role, connections in self.active_connections.items()
         }
     
+    def get_queue_metrics(self) -> dict:
+        """Get outbound queue depth and drop counters across all connections"""
+        clients = list(self.client_connections.values())
+        return {
+            "overflow_policy": self.overflow_policy.value,
+            "queue_limit": settings.websocket_queue_size,
+            "queued_messages": sum(client.depth for client in clients),
+            "max_queue_depth": max((client.depth for client in clients), default=0),
+            "sent_total": self.retired_totals["sent"] + sum(client.sent for client in clients),
+            "dropped_total": self.retired_totals["dropped"] + sum(client.dropped for client in clients),
+            "coalesced_total": self.retired_totals["coalesced"] + sum(client.coalesced for client in clients),
+            "evicted_total": self.evicted_total
+        }
+    
     def get_user_info(self, websocket: WebSocket) -> dict:
         """Get user info for a specific connection"""
         return self.connection_users.get(websocket, {})
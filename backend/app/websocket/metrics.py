@@ -0,0 +1,55 @@
+from typing import Deque, Dict, List
+from collections import defaultdict, deque
+import time
+
+class RateCounter:
+    """Event count over a sliding window of one-second buckets"""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.total = 0
+        self.buckets: Deque[List[int]] = deque()
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        self.total += count
+        if self.buckets and self.buckets[-1][0] == now:
+            self.buckets[-1][1] += count
+        else:
+            self.buckets.append([now, count])
+        self._expire(now)
+
+    def _expire(self, now: int):
+        while self.buckets and self.buckets[0][0] <= now - self.window:
+            self.buckets.popleft()
+
+    def per_second(self) -> float:
+        self._expire(int(time.monotonic()))
+        return round(sum(count for _, count in self.buckets) / self.window, 2)
+
+class ConnectionMetrics:
+    """Connection lifecycle counters and per-role message rates"""
+
+    def __init__(self):
+        self.connects = 0
+        self.disconnects = 0
+        self.reaps = 0
+        self.heartbeats_sent = 0
+        self.messages_in: Dict[str, RateCounter] = defaultdict(RateCounter)
+        self.messages_out: Dict[str, RateCounter] = defaultdict(RateCounter)
+
+    def snapshot(self) -> dict:
+        return {
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "reaps": self.reaps,
+            "heartbeats_sent": self.heartbeats_sent,
+            "messages_in": {
+                role: {"total": counter.total, "per_second": counter.per_second()}
+                for role, counter in self.messages_in.items()
+            },
+            "messages_out": {
+                role: {"total": counter.total, "per_second": counter.per_second()}
+                for role, counter in self.messages_out.items()
+            }
+        }
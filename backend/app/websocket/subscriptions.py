@@ -0,0 +1,111 @@
+from fastapi import WebSocket
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import defaultdict
+
+# Topics are "<kind>:<value>" strings, e.g. "incident:42" or "event:unit_update"
+TOPIC_KINDS = ("incident", "unit", "event", "jurisdiction")
+
+# Topic kinds each role may subscribe to. Subscriptions only narrow a
+# connection's feed: events are still delivered to their target roles only.
+ROLE_TOPIC_KINDS = {
+    "dispatcher": TOPIC_KINDS,
+    "supervisor": TOPIC_KINDS,
+    "admin": TOPIC_KINDS,
+    # Responders follow their own incidents and units, not whole event streams
+    "responder": ("incident", "unit"),
+}
+
+def parse_topic(channel: str) -> Tuple[str, str]:
+    """Split a channel string into (kind, value), validating the kind"""
+    kind, sep, value = str(channel).partition(":")
+    if not sep or not value or kind not in TOPIC_KINDS:
+        raise ValueError(f"Invalid channel '{channel}', expected one of {', '.join(k + ':<id>' for k in TOPIC_KINDS)}")
+    return kind, value
+
+def event_topics(event_type: str, data: dict) -> Set[str]:
+    """Topics an event is published under, derived from its payload"""
+    topics = {f"event:{event_type}"}
+    if not isinstance(data, dict):
+        return topics
+
+    entity_id = data.get("id")
+    if entity_id is not None:
+        if event_type == "incident_update":
+            topics.add(f"incident:{entity_id}")
+        elif event_type in ("unit_update", "unit_positions"):
+            topics.add(f"unit:{entity_id}")
+
+    for field in ("incident_id", "assigned_incident_id"):
+        if data.get(field) is not None:
+            topics.add(f"incident:{data[field]}")
+    if data.get("unit_id") is not None:
+        topics.add(f"unit:{data['unit_id']}")
+    if data.get("jurisdiction"):
+        topics.add(f"jurisdiction:{data['jurisdiction']}")
+
+    return topics
+
+class SubscriptionRegistry:
+    """Topic -> subscriber index with a reverse index for cheap cleanup"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self.topics_by_connection: Dict[WebSocket, Set[str]] = {}
+
+    def subscribe(
+        self,
+        websocket: WebSocket,
+        channels: Iterable[str],
+        allowed_kinds: Iterable[str] = TOPIC_KINDS
+    ) -> Tuple[List[str], List[str]]:
+        """Subscribe to channels of the allowed kinds. Returns (accepted, rejected) channel lists."""
+        allowed_kinds = set(allowed_kinds)
+        accepted, rejected = [], []
+        for channel in channels:
+            try:
+                kind, value = parse_topic(channel)
+            except ValueError:
+                rejected.append(channel)
+                continue
+            if kind not in allowed_kinds:
+                rejected.append(channel)
+                continue
+            topic = f"{kind}:{value}"
+            self.subscribers[topic].add(websocket)
+            self.topics_by_connection.setdefault(websocket, set()).add(topic)
+            accepted.append(topic)
+        return accepted, rejected
+
+    def unsubscribe(self, websocket: WebSocket, channels: Optional[Iterable[str]] = None) -> List[str]:
+        """Unsubscribe from the given channels, or from everything if none are given"""
+        topics = self.topics_by_connection.get(websocket)
+        if not topics:
+            return []
+
+        removed = list(topics) if channels is None else [c for c in channels if c in topics]
+        for topic in removed:
+            topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+        if not topics:
+            del self.topics_by_connection[websocket]
+        return removed
+
+    def is_filtered(self, websocket: WebSocket) -> bool:
+        """True if the connection has opted into topic filtering"""
+        return websocket in self.topics_by_connection
+
+    def subscribers_for(self, topics: Iterable[str]) -> Set[WebSocket]:
+        recipients: Set[WebSocket] = set()
+        for topic in topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers:
+                recipients.update(subscribers)
+        return recipients
+
+    def get_topics(self, websocket: WebSocket) -> List[str]:
+        return sorted(self.topics_by_connection.get(websocket, ()))
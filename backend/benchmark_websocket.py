@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+WebSocket load test and latency benchmark for CommandFlex
+
+Starts the API in-process on a throwaway SQLite database, opens simulated
+dispatcher and responder consoles against /api/ws/{token}, drives incident
+and unit events through the ConnectionManager and reports end-to-end
+delivery latency percentiles and throughput.
+
+Clients run in the same event loop as the server, so the numbers include
+client-side decoding and are a conservative bound for sizing hardware.
+
+Usage:
+    python benchmark_websocket.py --dispatchers 200 --responders 800 --events 500 --rate 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import tempfile
+import time
+
+# Point the app at a scratch database before anything imports the engine
+_db_dir = tempfile.mkdtemp(prefix="commandflex-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import msgpack
+import uvicorn
+import websockets
+from datetime import timedelta
+
+from main import app
+from app.api.auth import create_access_token
+from app.core.database import SessionLocal
+from app.models.user import User, UserRole
+from app.websocket.manager import manager
+
+def create_bench_users(count: int, role: UserRole, prefix: str) -> list:
+    """Create users directly in the database and return access tokens"""
+    db = SessionLocal()
+    try:
+        users = [
+            User(
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@bench.local",
+                full_name=f"Bench {prefix} {i}",
+                password_hash="x",
+                role=role
+            )
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [
+            create_access_token({"sub": user.username}, expires_delta=timedelta(hours=1))
+            for user in users
+        ]
+    finally:
+        db.close()
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class BenchClient:
+    """One simulated console collecting delivery latencies"""
+
+    def __init__(self, url: str, channels: list, encoding: str, latencies: list):
+        self.url = url
+        self.channels = channels
+        self.encoding = encoding
+        self.latencies = latencies
+        self.received = 0
+        self.ready = asyncio.Event()
+
+    def _decode(self, frame):
+        if isinstance(frame, bytes):
+            return msgpack.unpackb(frame, raw=False)
+        return json.loads(frame)
+
+    async def run(self, stop: asyncio.Event):
+        try:
+            await self._run(stop)
+        finally:
+            # Never leave the connect phase waiting on a client that failed
+            self.ready.set()
+
+    async def _run(self, stop: asyncio.Event):
+        async with websockets.connect(f"{self.url}?encoding={self.encoding}", max_queue=None) as ws:
+            self._decode(await ws.recv())  # connection_established
+            if self.channels:
+                await ws.send(json.dumps({"type": "subscribe", "channels": self.channels}))
+                self._decode(await ws.recv())  # subscribed
+            self.ready.set()
+
+            while not stop.is_set():
+                try:
+                    frame = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                message = self._decode(frame)
+                if message.get("type") == "heartbeat":
+                    await ws.send(json.dumps({"type": "heartbeat_ack"}))
+                    continue
+                sent_at = (message.get("data") or {}).get("sent_at")
+                if sent_at is not None:
+                    self.latencies.append(time.perf_counter() - sent_at)
+                    self.received += 1
+
+async def drive_events(count: int, rate: float, incidents: int):
+    """Publish a mix of incident and unit events at a fixed rate"""
+    interval = 1 / rate
+    start = time.perf_counter()
+    for i in range(count):
+        incident_id = random.randrange(incidents)
+        data = {"id": incident_id, "status": "dispatched", "sent_at": time.perf_counter()}
+        if i % 2:
+            await manager.send_incident_update(data)
+        else:
+            await manager.send_unit_update({
+                "id": random.randrange(1000),
+                "status": "en_route",
+                "assigned_incident_id": incident_id,
+                "sent_at": time.perf_counter()
+            })
+        delay = start + (i + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def run_benchmark(args):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_queue=1024))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    dispatcher_tokens = create_bench_users(args.dispatchers, UserRole.dispatcher, "bench-dispatcher-")
+    responder_tokens = create_bench_users(args.responders, UserRole.responder, "bench-responder-")
+
+    latencies: list = []
+    clients = [
+        BenchClient(f"ws://127.0.0.1:{port}/api/ws/{token}", [], args.encoding, latencies)
+        for token in dispatcher_tokens
+    ] + [
+        # Each responder follows the traffic of one incident
+        BenchClient(f"ws://127.0.0.1:{port}/api/ws/{token}", [f"incident:{random.randrange(args.incidents)}"], args.encoding, latencies)
+        for token in responder_tokens
+    ]
+
+    stop = asyncio.Event()
+    connect_start = time.perf_counter()
+    client_tasks = []
+    for i in range(0, len(clients), args.connect_batch):
+        batch = clients[i:i + args.connect_batch]
+        client_tasks.extend(asyncio.create_task(client.run(stop)) for client in batch)
+        await asyncio.gather(*(client.ready.wait() for client in batch))
+    connect_time = time.perf_counter() - connect_start
+
+    failed = [task for task in client_tasks if task.done()]
+    if failed:
+        stop.set()
+        server.should_exit = True
+        await server_task
+        raise SystemExit(f"❌ {len(failed)} clients failed to connect: {failed[0].exception()!r}")
+
+    drive_start = time.perf_counter()
+    await drive_events(args.events, args.rate, args.incidents)
+    # Let queues drain
+    await asyncio.sleep(args.drain)
+    elapsed = time.perf_counter() - drive_start
+
+    stop.set()
+    await asyncio.gather(*client_tasks, return_exceptions=True)
+    server.should_exit = True
+    await server_task
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    queues = manager.get_queue_metrics()
+    print(f"\n📡 Consoles: {args.dispatchers} dispatchers, {args.responders} responders ({args.encoding})")
+    print(f"🔌 Connected in {connect_time:.2f}s")
+    print(f"📨 Events published: {args.events} at {args.rate}/s")
+    print(f"📬 Deliveries: {len(ms)} ({len(ms) / elapsed:.0f}/s)")
+    print(f"⏱️  Latency ms: p50={percentile(ms, 50):.2f} p99={percentile(ms, 99):.2f} "
+          f"p99.9={percentile(ms, 99.9):.2f} max={ms[-1] if ms else float('nan'):.2f}")
+    print(f"🗑️  Dropped: {queues['dropped_total']}, evicted: {queues['evicted_total']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="CommandFlex WebSocket load test")
+    parser.add_argument("--dispatchers", type=int, default=200)
+    parser.add_argument("--responders", type=int, default=800)
+    parser.add_argument("--incidents", type=int, default=50, help="Distinct incident ids events are spread over")
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="Events published per second")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--connect-batch", type=int, default=100)
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for delivery after the last event")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
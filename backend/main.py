@@ -1,11 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
+from app.core.auth import principal_cache
+from app.core.config import settings
+from app.core.database import engine, async_engine, Base, create_missing_indexes
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.passwords import password_executor
+from app.core.pool import get_pool_metrics
 from app.api import api_router
+from app.services.change_journal import prune_journal
+from app.services.jobs import PeriodicJob
+from app.services.live_state import LIVE_VERSION_HEADER, live_state
+from app.services.log_archive import archive_dir, create_partitioned_logs_table, run_log_maintenance
+from app.services.logging import log_writer
+from app.services.rollups import run_compaction
+from app.websocket.manager import manager
 import uvicorn
 
-# Create database tables
+# Create database tables, with logs partitioned by month on PostgreSQL
+create_partitioned_logs_table(engine)
 Base.metadata.create_all(bind=engine)
+create_missing_indexes(engine)
 
 app = FastAPI(
     title="CommandFlex PD API",
@@ -13,6 +27,17 @@ app = FastAPI(
     version="1.0.0"
 )
 
+journal_prune_job = PeriodicJob("change journal pruning", settings.sync_journal_prune_interval_seconds, prune_journal)
+rollup_job = PeriodicJob("rollup compaction", settings.rollup_interval_seconds, run_compaction)
+log_archive_job = PeriodicJob("log archival", settings.log_archive_interval_seconds, run_log_maintenance)
+# The live state is loaded on startup; the job only resyncs it afterwards
+live_state_job = PeriodicJob(
+    "live state resync",
+    settings.live_state_resync_seconds,
+    live_state.load,
+    initial_delay=settings.live_state_resync_seconds
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -20,11 +45,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, LIVE_VERSION_HEADER, "ETag"],
 )
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def startup():
+    await log_writer.start()
+    await manager.start()
+    await live_state.start()
+    await live_state_job.start()
+    await journal_prune_job.start()
+    await rollup_job.start()
+    if settings.log_archive_interval_seconds > 0:
+        # Fail at startup rather than on the first archival run
+        archive_dir()
+    await log_archive_job.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await log_archive_job.stop()
+    await rollup_job.stop()
+    await journal_prune_job.stop()
+    await live_state_job.stop()
+    await live_state.stop()
+    await manager.stop()
+    password_executor.shutdown()
+    # Last, so entries logged during shutdown are flushed too
+    await log_writer.stop()
+
 @app.get("/")
 async def root():
     return {"message": "CommandFlex PD API is running"}
@@ -33,6 +84,18 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/db")
+async def database_health():
+    """Connection pool saturation, checkout wait times, the log writer backlog and auth load"""
+    return {
+        "sync_pool": get_pool_metrics(engine),
+        "async_pool": get_pool_metrics(async_engine),
+        "log_writer": log_writer.get_metrics(),
+        "auth_cache": principal_cache.get_metrics(),
+        "password_executor": password_executor.get_metrics(),
+        "live_state": live_state.get_metrics()
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
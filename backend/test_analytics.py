@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Check the raw response-time report
+
+Seeds a scratch SQLite database with dispatches whose timestamps are
+partly missing and checks the columnar report for every group_by option
+against hand-computed intervals.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Dispatch, Incident
+from app.models.incident import IncidentPriority, IncidentStatus, IncidentType
+from app.services.analytics import response_time_report
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "analytics.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def seed():
+    db = TestingSessionLocal()
+    try:
+        def incident(number, created_at, priority, incident_type):
+            row = Incident(
+                incident_number=f"INC-ANALYTICS-{number}",
+                type=incident_type,
+                priority=priority,
+                status=IncidentStatus.new,
+                address="1 Main St",
+                description="Analytics",
+                created_by=1,
+                created_at=created_at
+            )
+            db.add(row)
+            db.flush()
+            return row
+
+        def dispatch(row, unit_id, dispatched=None, en_route=None, on_scene=None):
+            """Times are seconds after the call; None leaves the timestamp unset"""
+            at = lambda seconds: None if seconds is None else row.created_at + timedelta(seconds=seconds)
+            db.add(Dispatch(
+                incident_id=row.id,
+                unit_id=unit_id,
+                dispatched_by=1,
+                dispatch_time=at(dispatched),
+                en_route_time=at(en_route),
+                on_scene_time=at(on_scene)
+            ))
+
+        morning = incident(1, datetime(2026, 3, 1, 8, 10), IncidentPriority.HIGH, IncidentType.FIRE)
+        dispatch(morning, 1, 60, 120, 360)
+        dispatch(morning, 2, 90)
+        afternoon = incident(2, datetime(2026, 3, 1, 14, 20), IncidentPriority.LOW, IncidentType.MEDICAL)
+        dispatch(afternoon, 1, 30, 60, 300)
+        next_day = incident(3, datetime(2026, 3, 2, 8, 40), IncidentPriority.HIGH, IncidentType.FIRE)
+        # Dispatched, but no timestamp was ever recorded
+        dispatch(next_day, 2)
+        # No call time at all: every interval and time bucket is missing
+        unknown = incident(4, datetime(2026, 3, 3), IncidentPriority.LOW, IncidentType.MEDICAL)
+        db.add(Dispatch(incident_id=unknown.id, unit_id=3, dispatched_by=1, dispatch_time=datetime(2026, 3, 3)))
+        db.flush()
+        # Column defaults replace None on insert, so clear these afterwards
+        db.execute(update(Dispatch).where(Dispatch.incident_id == next_day.id).values(dispatch_time=None))
+        db.execute(update(Incident).where(Incident.id == unknown.id).values(created_at=None))
+        db.commit()
+    finally:
+        db.close()
+
+seed()
+
+def report(group_by):
+    db = TestingSessionLocal()
+    try:
+        return response_time_report(db, group_by)
+    finally:
+        db.close()
+
+def summary(result):
+    """(key, dispatches, call_to_dispatch count, call_to_dispatch mean) per group"""
+    return [
+        (group["key"], group["dispatches"], group["call_to_dispatch"]["count"], group["call_to_dispatch"]["mean"])
+        for group in result["groups"]
+    ]
+
+def test_overall_ignores_missing_timestamps():
+    result = report(None)
+    assert result["dispatches"] == 5 and "groups" not in result
+    assert result["overall"]["call_to_dispatch"] == {"count": 3, "mean": 60.0, "p50": 60.0, "p90": 84.0, "p99": 89.4}
+    assert result["overall"]["call_to_scene"]["count"] == 2
+    assert result["overall"]["call_to_scene"]["mean"] == 330.0
+
+def test_group_by_priority_and_type():
+    assert summary(report("priority")) == [
+        (IncidentPriority.HIGH.value, 3, 2, 75.0),
+        (IncidentPriority.LOW.value, 2, 1, 30.0),
+    ]
+    assert summary(report("type")) == [
+        (IncidentType.FIRE.value, 3, 2, 75.0),
+        (IncidentType.MEDICAL.value, 2, 1, 30.0),
+    ]
+
+def test_group_by_unit():
+    result = report("unit")
+    assert summary(result) == [(1, 2, 2, 45.0), (2, 2, 1, 90.0), (3, 1, 0, None)]
+    unit_three = result["groups"][-1]
+    assert all(unit_three[name]["p99"] is None for name in ("call_to_dispatch", "call_to_scene"))
+
+def test_group_by_hour_of_day():
+    # Both 08:xx calls share a bucket across days; no call time has no hour
+    assert summary(report("hour")) == [(None, 1, 0, None), (8, 3, 2, 75.0), (14, 1, 1, 30.0)]
+
+def test_group_by_day():
+    assert summary(report("day")) == [
+        ("2026-03-01", 3, 3, 60.0),
+        ("2026-03-02", 1, 0, None),
+        (None, 1, 0, None),
+    ]
+
+def test_unknown_group_by_is_rejected():
+    with pytest.raises(ValueError):
+        report("weekday")
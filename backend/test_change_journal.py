@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Check the change journal behind delta sync
+
+Commits changes to a scratch SQLite database and reads them back through
+changes_since to verify settling, resets, pruning and the coalescing of
+GPS updates.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models import Base, ChangeJournal, Unit
+from app.models.unit import UnitStatus, UnitType
+from app.services.change_journal import changes_since, prune_journal
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "change_journal.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+AsyncTestingSessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{db_path}"), expire_on_commit=False)
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    with engine.begin() as conn:
+        for table in ("change_journal", "change_journal_watermarks", "units"):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+def sync(since, limit=100):
+    async def read():
+        async with AsyncTestingSessionLocal() as db:
+            return await changes_since(db, since, limit)
+    return asyncio.run(read())
+
+def add_unit(number):
+    db = TestingSessionLocal()
+    try:
+        unit = Unit(unit_number=number, type=UnitType.FIRE, status=UnitStatus.available)
+        db.add(unit)
+        db.commit()
+        return unit.id
+    finally:
+        db.close()
+
+def move_unit(unit_id, latitude):
+    db = TestingSessionLocal()
+    try:
+        unit = db.get(Unit, unit_id)
+        unit.current_latitude = latitude
+        unit.current_longitude = -74.0
+        unit.last_location_update = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+def journal():
+    db = TestingSessionLocal()
+    try:
+        return db.execute(select(ChangeJournal.id, ChangeJournal.row_id).order_by(ChangeJournal.id)).all()
+    finally:
+        db.close()
+
+def test_version_only_advances_past_settled_entries(monkeypatch):
+    monkeypatch.setattr(settings, "sync_settle_seconds", 60)
+    unit_id = add_unit("J1")
+
+    result = sync(0)
+    # The change is sent, but the version stays put until it settles
+    assert [unit.id for unit in result["units"]] == [unit_id]
+    assert result["version"] == 0 and not result["reset"]
+
+    monkeypatch.setattr(settings, "sync_settle_seconds", 0)
+    result = sync(0)
+    assert result["version"] == journal()[-1][0]
+
+def test_unknown_versions_reset(monkeypatch):
+    monkeypatch.setattr(settings, "sync_settle_seconds", 0)
+    add_unit("J2")
+    newest = journal()[-1][0]
+
+    assert sync(None)["reset"]
+    assert sync(newest + 1)["reset"]
+    assert not sync(newest)["reset"]
+
+def test_pruning_resets_clients_behind_the_watermark(monkeypatch):
+    monkeypatch.setattr(settings, "sync_settle_seconds", 0)
+    for number in ("P1", "P2", "P3"):
+        add_unit(number)
+    first, second, newest = [entry_id for entry_id, _ in journal()]
+
+    removed = prune_journal(datetime.utcnow() + timedelta(days=365), session_factory=TestingSessionLocal)
+    # The newest entry is kept so its id is never reused
+    assert removed == 2
+    assert [entry_id for entry_id, _ in journal()] == [newest]
+
+    assert sync(first)["reset"]
+    # A client at the watermark has seen everything that was pruned
+    result = sync(second)
+    assert not result["reset"] and [unit.unit_number for unit in result["units"]] == ["P3"]
+
+def test_gps_updates_coalesce_within_the_settle_window(monkeypatch):
+    monkeypatch.setattr(settings, "sync_settle_seconds", 60)
+    unit_id = add_unit("G1")
+    for step in range(5):
+        move_unit(unit_id, 40.0 + step / 100)
+    # Still covered by the unit's unsettled insert entry
+    assert len(journal()) == 1
+    assert sync(0)["units"][0].current_latitude == pytest.approx(40.04)
+
+    monkeypatch.setattr(settings, "sync_settle_seconds", 0)
+    move_unit(unit_id, 41.0)
+    assert len(journal()) == 2
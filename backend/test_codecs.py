@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Check the WebSocket frame codecs
+
+Round-trips messages through the JSON and MessagePack codecs, including
+the epoch-millisecond timestamps and the positional unit_positions layout
+of binary frames.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.websocket.codecs import POSITION_FIELDS, get_codec
+
+MESSAGE = {
+    "type": "incident_update",
+    "seq": 12,
+    "data": {"id": 7, "status": "dispatched", "latitude": 40.5, "notes": None, "unit_ids": [3, 4]},
+    "timestamp": "2026-03-01T12:30:00.250000"
+}
+EPOCH_MS = int(datetime(2026, 3, 1, 12, 30, 0, 250000, tzinfo=timezone.utc).timestamp() * 1000)
+
+def test_json_round_trip():
+    codec = get_codec("json")
+    payload = codec.encode(MESSAGE)
+    assert isinstance(payload, str)
+    assert codec.decode(payload) == MESSAGE
+
+def test_msgpack_round_trip():
+    codec = get_codec("msgpack")
+    payload = codec.encode(MESSAGE)
+    assert isinstance(payload, bytes)
+    assert len(payload) < len(get_codec("json").encode(MESSAGE))
+    # Only the timestamp changes form
+    assert codec.decode(payload) == {**MESSAGE, "timestamp": EPOCH_MS}
+
+def test_msgpack_positions_use_rows():
+    codec = get_codec("msgpack")
+    positions = [
+        {"id": 1, "latitude": 40.1, "longitude": -74.1, "status": "en_route", "incident_id": 7,
+         "timestamp": "2026-03-01T12:30:00.250000"},
+        {"id": 2, "latitude": 40.2, "longitude": -74.2},
+    ]
+    frame = codec.decode(codec.encode({"type": "unit_positions", "seq": 3, "data": {"positions": positions}}))
+
+    assert frame["data"]["fields"] == list(POSITION_FIELDS)
+    assert frame["data"]["rows"] == [
+        [1, 40.1, -74.1, "en_route", 7, EPOCH_MS],
+        [2, 40.2, -74.2, None, None, None],
+    ]
+    # Rows map back onto the named fields
+    assert dict(zip(frame["data"]["fields"], frame["data"]["rows"][0]))["id"] == 1
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        get_codec("xml")
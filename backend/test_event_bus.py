@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Check the worker-to-worker event buses
+
+Runs Unix socket buses in a scratch directory to verify that events reach
+every live worker and that sockets left by dead workers are cleaned up.
+"""
+
+import asyncio
+import socket
+import tempfile
+from pathlib import Path
+
+from app.websocket.bus import PostgresNotifyBus, UnixSocketBus
+
+class FakeConnection:
+    """Stands in for an asyncpg connection, echoing NOTIFYs to every listener"""
+
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        self.on_terminate = []
+
+    def is_closed(self):
+        return self.closed
+
+    def add_termination_listener(self, callback):
+        self.on_terminate.append(callback)
+
+    async def add_listener(self, channel, callback):
+        self.server.listeners.append(callback)
+
+    def transaction(self):
+        return self.server
+
+    async def execute(self, query, channel, payload):
+        assert len(payload.encode()) <= PostgresNotifyBus.max_payload
+        self.server.pending.append((channel, payload))
+
+    async def close(self):
+        self.closed = True
+        for callback in self.on_terminate:
+            callback(self)
+
+class FakeServer:
+    """Delivers a transaction's notifications when it commits"""
+
+    def __init__(self):
+        self.listeners = []
+        self.pending = []
+        self.connections = []
+
+    async def connect(self):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        for channel, payload in self.pending:
+            for listener in self.listeners:
+                listener(None, 0, channel, payload)
+        self.pending.clear()
+
+def test_unix_bus_delivers_and_removes_dead_peers():
+    async def scenario():
+        socket_dir = Path(tempfile.mkdtemp(prefix="commandflex-bus-"))
+        # A socket file whose worker has exited: bound once, never listened on again
+        dead = socket_dir / "worker-0.sock"
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(str(dead))
+        stale.close()
+
+        received = []
+        async def handler(event):
+            received.append(event["type"])
+
+        publisher = UnixSocketBus(handler, str(socket_dir))
+        peer = UnixSocketBus(handler, str(socket_dir))
+        peer.path = socket_dir / "worker-1.sock"
+        await publisher.start()
+        await peer.start()
+        try:
+            await publisher.publish({"type": "notice"})
+            await asyncio.sleep(0.05)
+        finally:
+            await peer.stop()
+            await publisher.stop()
+
+        assert received == ["notice", "notice"]
+        assert not dead.exists()
+        assert publisher.get_metrics()["peers_removed"] == 1
+
+    asyncio.run(scenario())
+
+def test_unix_bus_delivers_oversized_events_locally():
+    async def scenario():
+        socket_dir = Path(tempfile.mkdtemp(prefix="commandflex-bus-"))
+        received = []
+        async def handler(event):
+            received.append(event["type"])
+
+        publisher = UnixSocketBus(handler, str(socket_dir))
+        peer = UnixSocketBus(handler, str(socket_dir))
+        peer.path = socket_dir / "worker-1.sock"
+        await publisher.start()
+        await peer.start()
+        try:
+            # Larger than any datagram the kernel accepts (EMSGSIZE)
+            await publisher.publish({"type": "huge", "data": "x" * 4_000_000})
+            await publisher.publish({"type": "small"})
+            await asyncio.sleep(0.05)
+        finally:
+            await peer.stop()
+            await publisher.stop()
+
+        assert sorted(received) == ["huge", "small", "small"]
+        metrics = publisher.get_metrics()
+        assert metrics["send_errors"] == 1 and metrics["peers_removed"] == 0
+
+    asyncio.run(scenario())
+
+def test_postgres_bus_chunks_large_events_and_relistens():
+    async def scenario():
+        server = FakeServer()
+        received = []
+        async def handler(event):
+            received.append(event)
+
+        bus = PostgresNotifyBus(handler, "postgresql://unused", "events")
+        bus._connect = server.connect
+        bus.reconnect_delay = 0.01
+        await bus.start()
+        try:
+            large = {"type": "notice", "data": {"text": "x" * 20000}}
+            await bus.publish(large)
+            await asyncio.sleep(0.01)
+            assert received == [large]
+            assert bus.get_metrics()["chunked"] == 1
+
+            # Drop the LISTEN connection; the bus listens again on a new one
+            server.listeners.clear()
+            await bus.listen_conn.close()
+            await asyncio.sleep(0.05)
+            assert bus.get_metrics()["reconnects"] == 1
+            await bus.publish({"type": "small"})
+            await asyncio.sleep(0.01)
+            assert [event["type"] for event in received] == ["notice", "small"]
+        finally:
+            await bus.stop()
+
+    asyncio.run(scenario())
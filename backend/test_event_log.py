@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Check the persisted WebSocket event log
+
+Appends events to a log backed by a scratch file and reloads it, to verify
+that the writer thread persists and compacts the history.
+"""
+
+import os
+import tempfile
+
+from app.websocket.history import EventLog
+
+def test_events_survive_a_reload_and_compaction():
+    path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "events.jsonl")
+    log = EventLog(capacity=3, path=path)
+    for i in range(10):
+        log.append({"type": "notice", "data": {"n": i}})
+    log.close()
+
+    # More than twice the capacity was written, so the file was compacted
+    with open(path) as f:
+        assert len(f.readlines()) <= 2 * 3
+
+    reloaded = EventLog(capacity=3, path=path)
+    reloaded.load()
+    assert (reloaded.epoch, reloaded.seq) == (log.epoch, 10)
+    assert [event["data"]["n"] for event in reloaded.since(7)] == [7, 8, 9]
+    assert reloaded.since(6) is None
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Check conditional GET handling
+
+Serves a small route through the validators helper and replays its
+ETag and Last-Modified to get 304s.
+"""
+
+from datetime import datetime
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.core.http_cache import conditional_response, make_etag
+
+UPDATED_AT = datetime(2024, 7, 3, 12, 30, 15, 250000)
+
+app = FastAPI()
+
+@app.get("/item")
+def get_item(request: Request, response: Response, collection: bool = False):
+    etag = make_etag("item", 1, UPDATED_AT)
+    return conditional_response(request, response, etag, UPDATED_AT, collection=collection) or {"id": 1}
+
+client = TestClient(app)
+
+def test_matching_etag_returns_empty_304():
+    first = client.get("/item")
+    assert first.status_code == 200 and first.headers["ETag"].startswith('W/"')
+    second = client.get("/item", headers={"If-None-Match": f'"other", {first.headers["ETag"]}'})
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/item", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_if_modified_since_only_for_single_resources():
+    last_modified = client.get("/item").headers["Last-Modified"]
+    assert last_modified == "Wed, 03 Jul 2024 12:30:15 GMT"
+    assert client.get("/item", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/item?collection=true", headers={"If-Modified-Since": last_modified}).status_code == 200
+    assert client.get("/item", headers={"If-Modified-Since": "Wed, 03 Jul 2024 12:30:14 GMT"}).status_code == 200
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Check that the incident timeline costs a fixed number of queries
+
+Serves the incidents router against a scratch SQLite database and counts the
+statements executed per timeline request as the number of entries grows.
+"""
+
+import os
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api import incidents
+from app.core.auth import get_current_active_user
+from app.core.database import get_async_db
+from app.models import Base, Incident, Log, Unit, User
+from app.models.incident import IncidentPriority, IncidentType
+from app.models.unit import UnitType
+from app.models.user import UserRole
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "timeline.db")
+engine = create_engine(f"sqlite:///{db_path}")
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+Base.metadata.create_all(bind=engine)
+
+statements = []
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app = FastAPI()
+app.include_router(incidents.router, prefix="/api/incidents")
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_current_active_user] = lambda: User(id=1, username="dispatcher", role=UserRole.dispatcher)
+client = TestClient(app)
+
+def create_incident(entries: int) -> int:
+    """Create an incident whose timeline has ``entries`` logs, each from its own unit"""
+    db = sessionmaker(bind=engine)()
+    try:
+        incident = Incident(
+            incident_number=f"INC-TEST-{entries}",
+            type=IncidentType.FIRE,
+            priority=IncidentPriority.HIGH,
+            address="1 Main St",
+            description="Timeline query count",
+            created_by=1
+        )
+        db.add(incident)
+        db.flush()
+        for i in range(entries):
+            unit = Unit(unit_number=f"T{entries}-{i}", type=UnitType.FIRE)
+            db.add(unit)
+            db.flush()
+            db.add(Log(incident_id=incident.id, unit_id=unit.id, message=f"Entry {i}"))
+        db.commit()
+        return incident.id
+    finally:
+        db.close()
+
+def timeline_query_count(incident_id: int) -> int:
+    statements.clear()
+    response = client.get(f"/api/incidents/{incident_id}/timeline")
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+def test_timeline_resolves_unit_names():
+    incident_id = create_incident(3)
+    response = client.get(f"/api/incidents/{incident_id}/timeline")
+    assert [entry["unit_name"] for entry in response.json()] == ["T3-0", "T3-1", "T3-2"]
+
+def test_timeline_query_count_is_constant():
+    small = timeline_query_count(create_incident(1))
+    large = timeline_query_count(create_incident(50))
+    assert large == small
+    # Incident lookup plus the joined timeline query
+    assert large <= 2
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Check the in-memory live state read model
+
+Loads the store from a scratch SQLite database, then verifies that ORM
+commits keep it current and that pages match the database's keyset order.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.pagination import decode_cursor
+from app.models import Base, Incident, Unit
+from app.models.incident import IncidentPriority, IncidentStatus, IncidentType
+from app.models.unit import UnitStatus, UnitType
+from app.schemas.unit import UnitResponse
+from app.services.live_state import live_state
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "live_state.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def seed():
+    db = TestingSessionLocal()
+    try:
+        for i in range(5):
+            db.add(Incident(
+                incident_number=f"INC-LIVE-{i}",
+                type=IncidentType.FIRE,
+                priority=IncidentPriority.HIGH,
+                status=IncidentStatus.new,
+                address="1 Main St",
+                description="Live state",
+                created_by=1
+            ))
+        for i in range(3):
+            db.add(Unit(unit_number=f"L{i}", type=UnitType.FIRE, status=UnitStatus.available))
+        db.commit()
+    finally:
+        db.close()
+
+seed()
+
+def test_incident_pages_follow_keyset_order():
+    # Other test modules may have loaded the store from their own database
+    live_state.load(TestingSessionLocal)
+    first, cursor = live_state.list_incidents(IncidentStatus.new, None, None, 3)
+    second, last = live_state.list_incidents(IncidentStatus.new, None, cursor, 3)
+    ids = [incident.id for incident in first + second]
+    assert ids == sorted(ids, reverse=True) and len(ids) == 5
+    assert decode_cursor(cursor)[1] == first[-1].id
+    assert last is None
+
+def test_commits_update_the_store():
+    live_state.load(TestingSessionLocal)
+    version = live_state.version
+    db = TestingSessionLocal()
+    try:
+        incident = db.query(Incident).filter(Incident.incident_number == "INC-LIVE-0").one()
+        incident.status = IncidentStatus.resolved
+        unit = db.query(Unit).filter(Unit.unit_number == "L1").one()
+        unit.status = UnitStatus.en_route
+        db.commit()
+        resolved_id = incident.id
+    finally:
+        db.close()
+
+    assert live_state.version > version
+    incidents, _ = live_state.list_incidents(IncidentStatus.new, None, None, 100)
+    assert resolved_id not in [incident.id for incident in incidents]
+    available, total, _ = live_state.list_units(UnitStatus.available, None, None, 100)
+    assert [unit.unit_number for unit in available] == ["L0", "L2"] and total == 2
+
+def test_rolled_back_changes_are_not_applied():
+    live_state.load(TestingSessionLocal)
+    db = TestingSessionLocal()
+    try:
+        unit = db.query(Unit).filter(Unit.unit_number == "L2").one()
+        unit.status = UnitStatus.unavailable
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+
+    available, _, _ = live_state.list_units(UnitStatus.available, None, None, 100)
+    assert "L2" in [unit.unit_number for unit in available]
+
+class BrokenUnitResponse(UnitResponse):
+    @classmethod
+    def model_validate(cls, obj, **kwargs):
+        raise ValueError("cannot snapshot")
+
+def test_failed_snapshots_reload_the_store(monkeypatch):
+    live_state.load(TestingSessionLocal)
+    monkeypatch.setattr(live_state.tables["units"], "schema", BrokenUnitResponse)
+    errors, reloads = live_state.snapshot_errors, live_state.reloads
+
+    async def scenario():
+        monkeypatch.setattr(live_state, "_loop", asyncio.get_running_loop())
+        db = TestingSessionLocal()
+        try:
+            unit = db.query(Unit).filter(Unit.unit_number == "L0").one()
+            unit.status = UnitStatus.unavailable
+            # The write itself still succeeds
+            db.commit()
+        finally:
+            db.close()
+        for _ in range(100):
+            if live_state.reloads > reloads:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert live_state.snapshot_errors == errors + 1
+    assert live_state.reloads == reloads + 1
+    available, _, _ = live_state.list_units(UnitStatus.available, None, None, 100)
+    assert "L0" not in [unit.unit_number for unit in available]
+
+def test_overlapping_loads_run_one_at_a_time():
+    live_state.load(TestingSessionLocal)
+    reloads = live_state.reloads
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_session():
+        entered.set()
+        release.wait()
+        return TestingSessionLocal()
+
+    errors = []
+    def load(session_factory):
+        try:
+            live_state.load(session_factory)
+        except Exception as e:
+            errors.append(e)
+
+    # The periodic resync is still reading when an on-demand reload starts
+    first = threading.Thread(target=load, args=(slow_session,))
+    first.start()
+    entered.wait()
+    second = threading.Thread(target=load, args=(TestingSessionLocal,))
+    second.start()
+
+    db = TestingSessionLocal()
+    try:
+        unit = db.query(Unit).filter(Unit.unit_number == "L2").one()
+        unit.status = UnitStatus.on_scene
+        db.commit()
+    finally:
+        db.close()
+
+    release.set()
+    first.join()
+    second.join()
+    assert errors == []
+    assert live_state.reloads == reloads + 2
+    available, _, _ = live_state.list_units(UnitStatus.available, None, None, 100)
+    assert "L2" not in [unit.unit_number for unit in available]
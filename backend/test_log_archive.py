@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Check activity log archival
+
+Archives closed months from a scratch SQLite database into a temporary
+directory, and walks the PostgreSQL path with the partition catalog and
+DDL stubbed out, since no PostgreSQL server is available to the tests.
+"""
+
+import os
+import tempfile
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.logs import get_log_summary
+from app.core.config import settings
+from app.models import Base, Log
+from app.models.log import LogType
+from app.services import log_archive
+from app.services.jobs import single_runner
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "log_archive.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+NOW = datetime(2026, 6, 15)  # hot window: April through June
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "log_hot_months", 3)
+    monkeypatch.setattr(settings, "log_archive_dir", tempfile.mkdtemp(prefix="commandflex-archive-"))
+    session = TestingSessionLocal()
+    session.execute(text("DELETE FROM logs"))
+    session.execute(insert(Log), [
+        {"type": LogType.note, "message": f"entry {i}", "incident_id": 1 + i % 2, "timestamp": timestamp}
+        for i, timestamp in enumerate([
+            datetime(2026, 1, 3), datetime(2026, 1, 20), datetime(2026, 2, 28, 23, 59),
+            datetime(2026, 4, 1), datetime(2026, 6, 10)
+        ])
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def test_archival_requires_an_absolute_directory(db, monkeypatch):
+    for path in ("", "log_archive"):
+        monkeypatch.setattr(settings, "log_archive_dir", path)
+        with pytest.raises(ValueError):
+            log_archive.archive_closed_months(db, NOW)
+    assert db.scalar(select(func.count(Log.id))) == 5
+
+def test_closed_months_are_exported_then_deleted(db):
+    archived = log_archive.archive_closed_months(db, NOW)
+
+    # Every month from the oldest row up to the hot window, empty ones included
+    assert archived == {"logs_2026_01": 2, "logs_2026_02": 1, "logs_2026_03": 0}
+    assert log_archive.archived_months() == [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+    remaining = db.execute(select(Log.timestamp).order_by(Log.timestamp)).scalars().all()
+    assert remaining == [datetime(2026, 4, 1), datetime(2026, 6, 10)]
+
+    records = log_archive.archived_incident_logs(1)
+    assert [record["message"] for record in records] == ["entry 0", "entry 2"]
+    assert records[0]["type"] == "note" and records[0]["timestamp"] == "2026-01-03T00:00:00"
+
+class RecordingConnection:
+    """Runs queries on the real connection but records partition DDL instead"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith(("ALTER", "DROP", "DELETE FROM logs_default")):
+            self.statements.append((sql, params))
+            return None
+        return self.conn.execute(statement, params)
+
+def test_partitions_are_dropped_and_default_partition_rows_archived(db, monkeypatch):
+    recorder = RecordingConnection(db.connection())
+    monkeypatch.setattr(db, "connection", lambda: recorder)
+    monkeypatch.setattr(log_archive, "is_partitioned", lambda conn: True)
+    # February has its own partition; January's rows sit in the default partition
+    monkeypatch.setattr(log_archive, "list_log_partitions", lambda conn: [date(2026, 2, 1), date(2026, 4, 1)])
+    monkeypatch.setattr(log_archive, "default_partition_months", lambda conn, before=None: [date(2026, 1, 1)])
+
+    archived = log_archive.archive_closed_months(db, NOW)
+
+    assert archived == {"logs_2026_01": 2, "logs_2026_02": 1}
+    ddl = [sql for sql, _ in recorder.statements if not sql.startswith("DELETE")]
+    assert ddl == ["ALTER TABLE logs DETACH PARTITION logs_2026_02", "DROP TABLE logs_2026_02"]
+    deletes = [params for sql, params in recorder.statements if sql.startswith("DELETE")]
+    assert deletes[0] == {"start": datetime(2026, 1, 1), "end": datetime(2026, 2, 1)}
+
+def test_rows_are_kept_when_the_archive_does_not_read_back(db, monkeypatch):
+    # As if another writer had truncated the file
+    monkeypatch.setattr(log_archive, "count_archived_records", lambda path: 1)
+
+    with pytest.raises(ValueError):
+        log_archive.archive_closed_months(db, NOW)
+    db.rollback()
+
+    assert db.scalar(select(func.count(Log.id))) == 5
+    assert os.listdir(settings.log_archive_dir) == []
+
+def test_only_one_worker_archives_at_a_time(db):
+    with single_runner(engine, log_archive.ARCHIVE_LOCK) as acquired:
+        assert acquired
+        assert log_archive.run_log_maintenance(TestingSessionLocal) is None
+    assert db.scalar(select(func.count(Log.id))) == 5
+    assert log_archive.archived_months() == []
+
+def test_log_summary_range_is_half_open(db):
+    # Like the reports: the entry at exactly 2026-04-01 belongs to the next range
+    first = get_log_summary(start_date=datetime(2026, 1, 1), end_date=datetime(2026, 4, 1), db=db)
+    second = get_log_summary(start_date=datetime(2026, 4, 1), end_date=datetime(2026, 7, 1), db=db)
+    assert (first["total_logs"], second["total_logs"]) == (3, 2)
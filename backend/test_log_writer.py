@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Check the buffered activity log writer
+
+Runs a LogWriter against a scratch SQLite database to verify batching,
+the flush on shutdown, and how it separates bad entries from transient
+database failures.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Log
+from app.models.log import LogType
+from app.services.logging import LogWriter
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "log_writer.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+def entry(message):
+    return {"type": LogType.note, "message": message, "incident_id": 1, "timestamp": datetime.utcnow()}
+
+def stored_messages():
+    db = TestingSessionLocal()
+    try:
+        return db.execute(select(Log.message).order_by(Log.id)).scalars().all()
+    finally:
+        db.close()
+
+def clear():
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM logs"))
+
+def test_full_batches_flush_early_and_stop_flushes_the_rest():
+    clear()
+
+    async def scenario():
+        writer = LogWriter(batch_size=3, flush_interval=60, max_pending=100, session_factory=TestingSessionLocal)
+        await writer.start()
+        for i in range(7):
+            writer.submit(entry(f"batched {i}"))
+        await asyncio.sleep(0.2)
+        # A full batch woke the flusher long before the flush interval
+        assert writer.written == 7 and writer.batches == 3
+
+        writer.submit(entry("on shutdown"))
+        assert writer.get_metrics()["pending"] == 1
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert stored_messages() == [f"batched {i}" for i in range(7)] + ["on shutdown"]
+    assert writer.sync_writes == 0
+
+class FlakySession:
+    """A session whose first few statements fail as if the database were unreachable"""
+
+    failures = 0
+
+    def __init__(self):
+        self.session = TestingSessionLocal()
+
+    def execute(self, *args, **kwargs):
+        if FlakySession.failures:
+            FlakySession.failures -= 1
+            raise OperationalError("INSERT INTO logs", {}, Exception("database is locked"))
+        return self.session.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+def test_bad_entries_are_dropped_and_transient_failures_requeued():
+    clear()
+
+    async def scenario():
+        writer = LogWriter(batch_size=10, flush_interval=0.05, max_pending=100, session_factory=FlakySession)
+        writer.pending = [entry("first"), {**entry("bad"), "message": None}, entry("second")]
+
+        # NOT NULL violation: only the bad entry is dropped
+        assert await writer.flush()
+        assert writer.failed == 1 and writer.written == 2
+
+        FlakySession.failures = 1
+        writer.pending = [entry("third"), entry("fourth")]
+        assert not await writer.flush()
+        # Requeued in order, nothing dropped, and the flusher backs off
+        assert [e["message"] for e in writer.pending] == ["third", "fourth"]
+        assert writer.failed == 1 and writer.backoff > 0
+
+        assert await writer.flush()
+        assert writer.backoff == 0 and writer.pending == []
+
+    asyncio.run(scenario())
+    assert stored_messages() == ["first", "second", "third", "fourth"]
@@ -67,8 +67,10 @@ def test_incidents():
         # Test get incidents
         response = requests.get(f"{BASE_URL}/api/incidents", headers=headers)
         if response.status_code == 200:
+            # A page of up to 100 incidents; X-Next-Cursor points at the next one
             incidents = response.json()
-            print(f"✅ Retrieved {len(incidents.get('incidents', []))} incidents")
+            more = " (more pages)" if response.headers.get("X-Next-Cursor") else ""
+            print(f"✅ Retrieved {len(incidents)} incidents{more}")
             return True
         else:
             print(f"❌ Get incidents failed: {response.status_code}")
@@ -90,7 +92,8 @@ def test_units():
         response = requests.get(f"{BASE_URL}/api/units", headers=headers)
         if response.status_code == 200:
             units = response.json()
-            print(f"✅ Retrieved {len(units.get('units', []))} units")
+            more = " (more pages)" if units.get("next_cursor") else ""
+            print(f"✅ Retrieved {len(units.get('units', []))} units{more}")
             return True
         else:
             print(f"❌ Get units failed: {response.status_code}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Check keyset pagination over nullable sort columns
+
+Walks every page of dispatches in a scratch SQLite database, some of them
+without a dispatch time, in both directions and at several page sizes.
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.pagination import encode_cursor, page_results, paginate
+from app.models import Base, Dispatch, Unit
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "pagination.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+START = datetime(2026, 3, 1, 12, 0)
+# Ties and NULLs interleaved by id
+TIMES = [START, None, START + timedelta(minutes=5), None, START, START + timedelta(minutes=1), None]
+
+with engine.begin() as conn:
+    conn.execute(insert(Dispatch), [
+        {"incident_id": 1, "unit_id": 1, "dispatched_by": 1, "dispatch_time": time} for time in TIMES
+    ])
+
+def walk(limit, descending):
+    db = TestingSessionLocal()
+    try:
+        seen, cursor = [], None
+        while True:
+            query = paginate(select(Dispatch), Dispatch.dispatch_time, Dispatch.id, cursor, limit, descending)
+            rows, cursor = page_results(db.execute(query).scalars().all(), limit, "dispatch_time")
+            seen += [row.id for row in rows]
+            if cursor is None:
+                return seen
+    finally:
+        db.close()
+
+def expected(descending):
+    db = TestingSessionLocal()
+    try:
+        rows = db.execute(select(Dispatch.id, Dispatch.dispatch_time)).all()
+    finally:
+        db.close()
+    key = lambda row: (row.dispatch_time is not None, row.dispatch_time or START, row.id)
+    return [row.id for row in sorted(rows, key=key, reverse=descending)]
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+def test_rows_with_null_sort_keys_are_paged_once(limit, descending):
+    assert walk(limit, descending) == expected(descending)
+    assert len(expected(descending)) == len(TIMES)
+
+def test_null_cursor_on_a_required_column_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        paginate(select(Unit), Unit.unit_number, Unit.id, encode_cursor(None, 1), 10, descending=False)
+    assert error.value.status_code == 400
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Check the bounded password hashing pool
+
+Fills a small PasswordExecutor with blocked work to verify that requests
+beyond its workers and queue are rejected with 503 and Retry-After, and
+that capacity comes back once the work finishes.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.passwords import PasswordExecutor
+
+def test_saturated_pool_rejects_with_retry_after():
+    executor = PasswordExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        # One running, one queued
+        admitted = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.get_metrics()["running"] == 1 and executor.get_metrics()["queued"] == 1
+
+        with pytest.raises(HTTPException) as error:
+            await executor.run(release.wait)
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+        assert executor.rejected == 1
+
+        release.set()
+        assert await asyncio.gather(*admitted) == [True, True]
+        # Room again once the admitted work is done
+        assert await executor.run(lambda: "hashed") == "hashed"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+    metrics = executor.get_metrics()
+    assert metrics["completed"] == 3 and metrics["rejected"] == 1
+    assert metrics["peak_in_flight"] == 2 and metrics["queued"] == 0
+
+def test_rejection_reaches_the_client_as_503():
+    executor = PasswordExecutor(workers=1, max_queue=0)
+    release = threading.Event()
+    app = FastAPI()
+
+    @app.get("/hash")
+    async def hash_password():
+        return {"hash": await executor.run(lambda: "hashed")}
+
+    # Occupy the only worker from outside any request
+    blocker = threading.Thread(target=asyncio.run, args=(executor.run(release.wait),))
+    blocker.start()
+    try:
+        while executor.in_flight == 0:
+            time.sleep(0.01)
+        client = TestClient(app)
+        response = client.get("/hash")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+        release.set()
+        blocker.join()
+        assert client.get("/hash").json() == {"hash": "hashed"}
+    finally:
+        release.set()
+        blocker.join()
+        executor.shutdown()
+    assert executor.rejected == 1
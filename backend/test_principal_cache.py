@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Check the principal cache behind get_current_user
+
+Tokens resolve without a database round-trip once cached, and entries are
+dropped as soon as the user changes.
+"""
+
+import time
+
+from app.core.auth import Principal, PrincipalCache
+from app.models.user import UserRole
+
+def test_cached_principal_expires_after_ttl():
+    cache = PrincipalCache(ttl=0.05)
+    cache.put(Principal(id=1, username="dispatcher", role=UserRole.dispatcher), cache.generation)
+    assert cache.get("dispatcher").role == UserRole.dispatcher
+    time.sleep(0.06)
+    assert cache.get("dispatcher") is None
+
+def test_invalidation_drops_entry_and_stale_lookups():
+    cache = PrincipalCache(ttl=60)
+    cache.put(Principal(id=1, username="dispatcher", role=UserRole.dispatcher), cache.generation)
+
+    # A lookup that started before the user changed must not be cached
+    generation = cache.generation
+    cache.invalidate("dispatcher")
+    cache.put(Principal(id=1, username="dispatcher", role=UserRole.dispatcher), generation)
+    assert cache.get("dispatcher") is None
+
+def test_token_subject_ends_with_token_expiry():
+    cache = PrincipalCache(ttl=60)
+    cache.put_subject("live", "dispatcher", time.time() + 60)
+    cache.put_subject("expired", "dispatcher", time.time() - 1)
+    assert cache.get_subject("live") == "dispatcher"
+    assert cache.get_subject("expired") is None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Check that the hot read queries are served by indexes rather than table scans
+
+Builds the schema in an in-memory SQLite database and runs EXPLAIN QUERY PLAN
+on the queries behind the timeline, log, dispatch, unit and incident endpoints.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, text
+
+from app.api.incidents import timeline_query
+from app.core.pagination import encode_cursor, paginate
+from app.models import Base, Dispatch, Incident, Log, Unit
+from app.models.dispatch import DispatchStatus
+from app.models.incident import IncidentStatus
+from app.models.unit import UnitStatus
+
+engine = create_engine("sqlite://")
+# Listing endpoints are keyset paginated, so check plans from a mid-history cursor
+cursor = encode_cursor(datetime(2024, 1, 1), 1000)
+Base.metadata.create_all(bind=engine)
+
+def query_plan(statement) -> str:
+    """EXPLAIN QUERY PLAN output for a statement, with literal parameters"""
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+def assert_uses_index(statement, index: str):
+    plan = query_plan(statement)
+    assert f"INDEX {index}" in plan, plan
+    # The index must also provide the sort order
+    assert "TEMP B-TREE" not in plan, plan
+
+def test_incident_timeline():
+    statement = timeline_query(1)
+    assert_uses_index(statement, "ix_logs_incident_id_timestamp")
+    # Unit names come from primary key lookups, not a scan per entry
+    assert "SCAN units" not in query_plan(statement)
+
+def test_incident_logs_page():
+    assert_uses_index(
+        paginate(select(Log).where(Log.incident_id == 1), Log.timestamp, Log.id, cursor, 100, descending=False),
+        "ix_logs_incident_id_timestamp"
+    )
+
+def test_unit_logs():
+    assert_uses_index(
+        paginate(select(Log).where(Log.unit_id == 1), Log.timestamp, Log.id, cursor, 100),
+        "ix_logs_unit_id_timestamp"
+    )
+
+def test_user_logs():
+    assert_uses_index(
+        paginate(select(Log).where(Log.user_id == 1), Log.timestamp, Log.id, cursor, 100),
+        "ix_logs_user_id_timestamp"
+    )
+
+def test_recent_logs():
+    cutoff = datetime(2024, 1, 1) - timedelta(hours=24)
+    assert_uses_index(
+        select(Log).where(Log.timestamp >= cutoff).order_by(Log.timestamp.desc()).limit(100),
+        "ix_logs_timestamp"
+    )
+
+def test_incident_dispatches():
+    assert_uses_index(
+        select(Dispatch).where(Dispatch.incident_id == 1),
+        "ix_dispatches_incident_id_unit_id_status"
+    )
+
+def test_active_dispatch_check():
+    assert_uses_index(
+        select(Dispatch).where(
+            Dispatch.incident_id == 1,
+            Dispatch.unit_id == 2,
+            Dispatch.status.in_([DispatchStatus.DISPATCHED, DispatchStatus.EN_ROUTE, DispatchStatus.ON_SCENE])
+        ),
+        "ix_dispatches_incident_id_unit_id_status"
+    )
+
+def test_unit_dispatches():
+    assert_uses_index(
+        select(Dispatch).where(Dispatch.unit_id == 1),
+        "ix_dispatches_unit_id_status"
+    )
+
+def test_available_units():
+    assert_uses_index(
+        select(Unit).where(Unit.status == UnitStatus.available).order_by(Unit.unit_number),
+        "ix_units_status_unit_number"
+    )
+
+def test_incidents_by_status():
+    assert_uses_index(
+        paginate(select(Incident).where(Incident.status == IncidentStatus.new), Incident.created_at, Incident.id, cursor, 100),
+        "ix_incidents_status_created_at"
+    )
+
+def test_incidents_newest_first():
+    assert_uses_index(
+        paginate(select(Incident), Incident.created_at, Incident.id, cursor, 100),
+        "ix_incidents_created_at"
+    )
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Check that the hourly rollups answer reports like the raw queries
+
+Seeds a scratch SQLite database with incidents and dispatches, compacts the
+rollups, and compares the rollup-backed report numbers with the raw ones
+for the same half-open range, including changes picked up through the
+watermark overlap.
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Dispatch, Incident
+from app.models.incident import IncidentPriority, IncidentStatus, IncidentType
+from app.models.rollup import IncidentRollup, RollupWatermark
+from app.services import rollups
+from app.services.analytics import average_response_time, response_time_report
+from app.services.rollups import HISTOGRAM_EDGES, WATERMARK, compact_rollups, floor_hour, incident_totals, response_time_totals, run_compaction
+
+db_path = os.path.join(tempfile.mkdtemp(prefix="commandflex-test-"), "rollups.db")
+engine = create_engine(f"sqlite:///{db_path}")
+TestingSessionLocal = sessionmaker(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+START = floor_hour(datetime.utcnow()) - timedelta(hours=10)
+END = START + timedelta(hours=5)
+
+def add_incident(db, number, created_at, priority=IncidentPriority.HIGH, status=IncidentStatus.new):
+    incident = Incident(
+        incident_number=f"INC-ROLLUP-{number}",
+        type=IncidentType.FIRE,
+        priority=priority,
+        status=status,
+        address="1 Main St",
+        description="Rollups",
+        created_by=1,
+        created_at=created_at
+    )
+    db.add(incident)
+    db.flush()
+    return incident
+
+def add_dispatch(db, incident, dispatched, en_route=None, on_scene=None):
+    """Times are seconds after the call; None leaves the timestamp unset"""
+    at = lambda seconds: None if seconds is None else incident.created_at + timedelta(seconds=seconds)
+    db.add(Dispatch(
+        incident_id=incident.id,
+        unit_id=1,
+        dispatched_by=1,
+        dispatch_time=at(dispatched),
+        en_route_time=at(en_route),
+        on_scene_time=at(on_scene)
+    ))
+
+def seed(db):
+    first = add_incident(db, 1, START + timedelta(minutes=5), status=IncidentStatus.resolved)
+    add_dispatch(db, first, 40, 100, 400)
+    add_dispatch(db, first, 70, 130)
+    second = add_incident(db, 2, START + timedelta(hours=1, minutes=30), IncidentPriority.CRITICAL)
+    add_dispatch(db, second, 20, 50, 250)
+    # Dispatch recorded before the call: counted, but no valid intervals
+    add_dispatch(db, second, -30)
+    # Arrives after more than an hour, in the open-ended top histogram bin
+    slow = add_incident(db, 3, START + timedelta(hours=2, minutes=10), IncidentPriority.LOW)
+    add_dispatch(db, slow, 300, 600, 5000)
+    # On the exclusive end of the range, so excluded everywhere
+    edge = add_incident(db, 4, END)
+    add_dispatch(db, edge, 10, 20, 30)
+    db.commit()
+
+def assert_reports_match(db):
+    rollup = response_time_totals(db, "priority", START, END)
+    raw = response_time_report(db, "priority", START, END)
+    assert rollup["source"] == "rollup"
+    assert rollup["dispatches"] == raw["dispatches"] == 5
+
+    for name, stats in raw["overall"].items():
+        assert rollup["overall"][name]["count"] == stats["count"]
+        assert rollup["overall"][name]["mean"] == stats["mean"]
+    assert [(g["key"], g["dispatches"]) for g in rollup["groups"]] == [(g["key"], g["dispatches"]) for g in raw["groups"]]
+
+    totals = incident_totals(db, START, END)
+    raw_total = db.scalar(select(func.count(Incident.id)).where(Incident.created_at >= START, Incident.created_at < END))
+    assert totals["total"] == raw_total == 3
+    assert totals["resolved"] == 1
+    assert totals["avg_response_time"] == average_response_time(db, START, END)
+    return rollup, raw
+
+def test_rollups_match_raw_reports():
+    db = TestingSessionLocal()
+    try:
+        seed(db)
+        compact_rollups(db)
+        rollup, raw = assert_reports_match(db)
+
+        # The top bin is interpolated up to the slowest arrival, not pinned to its lower edge
+        slow = next(group for group in rollup["groups"] if group["key"] == IncidentPriority.LOW.value)
+        raw_slow = next(group for group in raw["groups"] if group["key"] == IncidentPriority.LOW.value)
+        assert HISTOGRAM_EDGES[-1] < slow["call_to_scene"]["p99"] <= 5000
+        assert abs(slow["call_to_scene"]["p99"] - raw_slow["call_to_scene"]["p99"]) < 50
+
+        # A dispatch committed just before the watermark is picked up through the overlap
+        watermark = db.get(RollupWatermark, WATERMARK).value
+        incident = db.scalar(select(Incident).where(Incident.incident_number == "INC-ROLLUP-1"))
+        late = (watermark - timedelta(seconds=30) - incident.created_at).total_seconds()
+        add_dispatch(db, incident, late)
+        db.commit()
+        compact_rollups(db)
+
+        rollup = response_time_totals(db, None, START, END)
+        raw = response_time_report(db, None, START, END)
+        assert rollup["dispatches"] == raw["dispatches"] == 6
+        assert rollup["overall"]["call_to_dispatch"]["count"] == raw["overall"]["call_to_dispatch"]["count"] == 5
+        assert rollup["overall"]["call_to_dispatch"]["mean"] == raw["overall"]["call_to_dispatch"]["mean"]
+    finally:
+        db.close()
+
+def test_concurrent_compactions_run_once(monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+    compact = rollups.compact_rollups
+
+    def slow_compact(db):
+        entered.set()
+        release.wait(timeout=5)
+        return compact(db)
+
+    db = TestingSessionLocal()
+    try:
+        if db.scalar(select(func.count(Incident.id))) == 0:
+            seed(db)
+    finally:
+        db.close()
+
+    monkeypatch.setattr(rollups, "compact_rollups", slow_compact)
+    results = []
+    # Two workers' jobs fire together over the same hours
+    first = threading.Thread(target=lambda: results.append(run_compaction(TestingSessionLocal)))
+    first.start()
+    assert entered.wait(timeout=10)
+    second = run_compaction(TestingSessionLocal)
+    release.set()
+    first.join()
+
+    assert second is None
+    assert results[0] is not None
+    db = TestingSessionLocal()
+    try:
+        buckets = db.execute(
+            select(IncidentRollup.bucket, IncidentRollup.type, IncidentRollup.priority, IncidentRollup.status)
+        ).all()
+        assert len(buckets) == len(set(buckets))
+        # Not double-counted
+        assert response_time_totals(db, None, START, END)["dispatches"] == response_time_report(db, None, START, END)["dispatches"]
+        assert incident_totals(db, START, END)["total"] == 3
+    finally:
+        db.close()
+    # The lock is released once the run ends
+    monkeypatch.setattr(rollups, "compact_rollups", compact)
+    assert run_compaction(TestingSessionLocal) is not None
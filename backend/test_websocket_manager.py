@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Check WebSocket fan-out in the connection manager
+
+Drives a ConnectionManager with in-memory sockets, without a server, to
+verify eviction during broadcasts and that role targeting holds for
+topic and viewport subscribers.
+"""
+
+import asyncio
+import json
+
+from app.websocket.codecs import CODECS, get_codec
+from app.websocket.connection import ClientConnection, OverflowPolicy
+from app.websocket.manager import ConnectionManager
+
+class FakeWebSocket:
+    """Records sent frames; a stalled socket never completes a send"""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.frames = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.frames.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        self.frames.append(get_codec("msgpack").decode(data))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+    def received(self, event_type: str):
+        return [frame for frame in self.frames if frame["type"] == event_type]
+
+async def connect(
+    manager: ConnectionManager, role: str, user_id: int, stalled: bool = False, encoding: str = "json"
+) -> FakeWebSocket:
+    websocket = FakeWebSocket(stalled)
+    await manager.connect(websocket, role, user_id, f"{role}{user_id}", encoding=encoding)
+    return websocket
+
+async def settle():
+    # Let writer tasks drain their queues
+    await asyncio.sleep(0.05)
+
+def run(scenario):
+    async def main():
+        manager = ConnectionManager()
+        try:
+            await scenario(manager)
+        finally:
+            for websocket in list(manager.client_connections):
+                manager.disconnect(websocket)
+            await settle()
+    asyncio.run(main())
+
+def test_eviction_during_role_broadcast():
+    async def scenario(manager):
+        manager.overflow_policy = OverflowPolicy.disconnect
+        fast = [await connect(manager, "dispatcher", i) for i in range(3)]
+        slow = await connect(manager, "dispatcher", 99, stalled=True)
+        manager.client_connections[slow].max_queue = 1
+        await settle()
+
+        for n in range(3):
+            await manager.broadcast_to_role({"type": "notice", "data": {"n": n}}, "dispatcher")
+        await settle()
+
+        assert slow not in manager.active_connections["dispatcher"]
+        assert manager.evicted_total == 1
+        for websocket in fast:
+            assert [frame["data"]["n"] for frame in websocket.received("notice")] == [0, 1, 2]
+
+    run(scenario)
+
+def test_topic_subscribers_only_get_events_for_their_role():
+    async def scenario(manager):
+        responder = await connect(manager, "responder", 1)
+        dispatcher = await connect(manager, "dispatcher", 2)
+        for websocket in (responder, dispatcher):
+            accepted, rejected = manager.subscribe(websocket, ["incident:7"])
+            assert accepted == ["incident:7"] and rejected == []
+
+        # Responders may not follow whole event streams or jurisdictions
+        assert manager.subscribe(responder, ["event:incident_update", "jurisdiction:north"]) == (
+            [], ["event:incident_update", "jurisdiction:north"]
+        )
+
+        await manager.deliver_event({
+            "type": "incident_update", "seq": 1, "roles": ["dispatcher"],
+            "data": {"id": 7}, "timestamp": "2026-01-01T00:00:00"
+        })
+        await settle()
+
+        assert len(dispatcher.received("incident_update")) == 1
+        assert responder.received("incident_update") == []
+        # Nor is it replayed on resume
+        manager.resume(responder, 0)
+        await settle()
+        assert responder.received("incident_update") == []
+
+    run(scenario)
+
+def test_viewport_subscribers_only_get_events_for_their_role():
+    async def scenario(manager):
+        responder = await connect(manager, "responder", 1)
+        dispatcher = await connect(manager, "dispatcher", 2)
+        for websocket in (responder, dispatcher):
+            manager.set_viewport(websocket, [40.0, -75.0, 41.0, -74.0])
+
+        await manager.deliver_event({
+            "type": "incident_update", "seq": 1, "roles": ["dispatcher"],
+            "data": {"id": 7, "latitude": 40.5, "longitude": -74.5}, "timestamp": "2026-01-01T00:00:00"
+        })
+        await manager.deliver_event({
+            "type": "unit_positions", "seq": 2, "roles": ["dispatcher"],
+            "data": {"positions": [{"id": 3, "latitude": 40.5, "longitude": -74.5}]},
+            "timestamp": "2026-01-01T00:00:00"
+        })
+        await settle()
+
+        assert len(dispatcher.received("incident_update")) == 1
+        assert len(dispatcher.received("unit_positions")) == 1
+        assert responder.received("incident_update") == []
+        assert responder.received("unit_positions") == []
+
+    run(scenario)
+
+def test_coalescing_keeps_frames_in_seq_order():
+    async def scenario():
+        websocket = FakeWebSocket()
+        client = ClientConnection(websocket, 3, OverflowPolicy.coalesce, 1.0, lambda client, error: None)
+        # Queued while the writer is not running yet, as behind a slow socket
+        for seq, incident_id in [(1, 7), (2, 8), (3, 7), (4, 9), (5, 7)]:
+            message = {"type": "incident_update", "seq": seq, "data": {"id": incident_id}}
+            assert client.enqueue(json.dumps(message), ("incident_update", incident_id))
+        assert client.coalesced == 2 and client.depth == 3 and client.dropped == 0
+
+        client.start()
+        await settle()
+        client.stop()
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    # Only the latest update for incident 7, sent after the frames it superseded
+    assert [(frame["seq"], frame["data"]["id"]) for frame in websocket.frames] == [(2, 8), (4, 9), (5, 7)]
+
+def test_repeated_coalescing_does_not_grow_the_queue():
+    async def scenario():
+        client = ClientConnection(FakeWebSocket(), 2, OverflowPolicy.coalesce, 1.0, lambda client, error: None)
+        for seq in range(50):
+            client.enqueue(json.dumps({"seq": seq}), ("unit_update", 1))
+        assert client.depth == 1 and len(client.queue) <= 2 * client.max_queue + 1
+        client.stop()
+
+    asyncio.run(scenario())
+
+def test_role_feeds_follow_subscriptions_and_viewports():
+    async def scenario(manager):
+        dispatcher = await connect(manager, "dispatcher", 1)
+        mapper = await connect(manager, "dispatcher", 2)
+        assert manager.role_feeds["dispatcher"] == {dispatcher, mapper}
+
+        manager.subscribe(dispatcher, ["incident:7"])
+        manager.set_viewport(mapper, [40.0, -75.0, 41.0, -74.0])
+        assert "dispatcher" not in manager.role_feeds
+        assert manager.viewport_feeds["dispatcher"] == {mapper}
+
+        # Delivery reads the maintained feeds, never the whole role
+        manager.active_connections = None
+        await manager.deliver_event({
+            "type": "notice", "seq": 1, "roles": ["dispatcher"], "data": {}, "timestamp": "2026-01-01T00:00:00"
+        })
+        await settle()
+        assert mapper.received("notice") and not dispatcher.received("notice")
+
+        manager.unsubscribe(dispatcher)
+        manager.clear_viewport(mapper)
+        assert manager.role_feeds["dispatcher"] == {dispatcher, mapper}
+        assert "dispatcher" not in manager.viewport_feeds
+
+    async def without_roles(manager):
+        roles = manager.active_connections
+        try:
+            await scenario(manager)
+        finally:
+            manager.active_connections = roles
+        for websocket in list(manager.client_connections):
+            manager.disconnect(websocket)
+        assert not manager.role_feeds and not manager.viewport_feeds
+
+    run(without_roles)
+
+def test_positions_coalesce_to_one_frame_per_tick():
+    async def scenario(manager):
+        dispatcher = await connect(manager, "dispatcher", 1)
+        coalescer = manager.position_coalescer
+        coalescer.tick = 0.05
+        await coalescer.start()
+        try:
+            for step in range(5):
+                for unit_id in (1, 2):
+                    manager.send_unit_position({"id": unit_id, "latitude": 40.0 + step, "longitude": -74.0})
+            await asyncio.sleep(0.08)
+            await settle()
+
+            frames = dispatcher.received("unit_positions")
+            assert len(frames) == 1
+            # The latest position of each unit, once
+            assert sorted((p["id"], p["latitude"]) for p in frames[0]["data"]["positions"]) == [(1, 44.0), (2, 44.0)]
+            assert coalescer.get_metrics()["positions_received"] == 10
+            assert coalescer.get_metrics()["positions_flushed"] == 2
+
+            # Positions still pending when the coalescer stops are flushed, not lost
+            coalescer.tick = 60
+            # Let the tick already in progress pass
+            await asyncio.sleep(0.1)
+            manager.send_unit_position({"id": 3, "latitude": 41.0, "longitude": -74.0})
+        finally:
+            await coalescer.stop()
+        await settle()
+
+        frames = dispatcher.received("unit_positions")
+        assert len(frames) == 2 and frames[1]["data"]["positions"][0]["id"] == 3
+
+    run(scenario)
+
+def test_fan_out_encodes_once_per_codec(monkeypatch):
+    encoded = []
+    for codec in CODECS.values():
+        def counting(message, codec=codec, encode=codec.encode):
+            encoded.append(codec.name)
+            return encode(message)
+        monkeypatch.setattr(codec, "encode", counting)
+
+    async def scenario(manager):
+        text = [await connect(manager, "dispatcher", i) for i in range(3)]
+        binary = [await connect(manager, "dispatcher", 10 + i, encoding="msgpack") for i in range(2)]
+        await settle()
+        encoded.clear()
+
+        await manager.broadcast_to_role({"type": "notice", "data": {"n": 1}, "timestamp": "2026-01-01T00:00:00"}, "dispatcher")
+        await settle()
+
+        assert sorted(encoded) == ["json", "msgpack"]
+        for websocket in text:
+            assert websocket.received("notice")[0]["timestamp"] == "2026-01-01T00:00:00"
+        for websocket in binary:
+            assert websocket.received("notice")[0]["timestamp"] == 1767225600000
+
+    run(scenario)
+
+def test_heartbeat_wheel_reaps_silent_connections():
+    now = [1000.0]
+
+    async def scenario(manager):
+        wheel = manager.heartbeat
+        wheel.interval, wheel.timeout, wheel.clock = 10.0, 25.0, lambda: now[0]
+        silent = await connect(manager, "responder", 1)
+        acking = await connect(manager, "responder", 2)
+
+        def turn(seconds):
+            # One full turn of the wheel visits every connection once
+            now[0] += seconds
+            for _ in range(len(wheel.wheel)):
+                wheel.cursor = (wheel.cursor + 1) % len(wheel.wheel)
+                wheel.check_slot(wheel.cursor)
+
+        turn(5)
+        await settle()
+        assert silent.received("heartbeat") == [] and acking.received("heartbeat") == []
+
+        for _ in range(3):
+            turn(10)
+            await settle()
+            if acking.received("heartbeat"):
+                manager.touch(acking)  # the client's heartbeat_ack
+        await settle()
+
+        assert silent.closed_with == 1001
+        assert silent not in manager.client_connections
+        assert acking in manager.client_connections and acking.closed_with is None
+        # Pinged once when it went quiet, reaped a turn later
+        assert len(silent.received("heartbeat")) == 1
+        assert len(acking.received("heartbeat")) == 3
+        assert manager.metrics.reaps == 1
+
+    run(scenario)
@@ -124,6 +124,18 @@ export interface WebSocketMessage {
   timestamp?: string
 }
 
+// Sent by the server after a quiet spell; answer with a HeartbeatAck or the
+// connection is closed once WEBSOCKET_IDLE_TIMEOUT passes
+export interface HeartbeatMessage {
+  type: 'heartbeat'
+  reply: 'heartbeat_ack'
+  timestamp: string
+}
+
+export interface HeartbeatAck {
+  type: 'heartbeat_ack'
+}
+
 export interface WebSocketConnection {
   user_id: number
   username: string